@@ -0,0 +1,175 @@
+import bisect
+from array import array
+
+
+class Clasificacion():
+    """
+    Clasificación en vivo (leaderboard) de ids por un contador.
+
+    Los ids se agrupan en cubetas por valor del contador y los valores distintos
+    se mantienen ordenados, así que cambiar un contador cuesta mover el id de
+    cubeta, y los primeros N se obtienen recorriendo las cubetas más altas sin
+    ordenar todos los ids. Dentro de una cubeta, primero va el id que llegó antes
+    a ese valor.
+    """
+    def __init__(self):
+        self._conteos = {}
+        self._cubetas = {}
+        self._orden = []
+
+    def build(self, conteos):
+        """
+        Reconstruye la clasificación.
+
+        Parámetros:
+            conteos (iterable): Pares (id, valor del contador).
+        """
+        self._conteos = {}
+        self._cubetas = {}
+        for id, conteo in conteos:
+            self._conteos[id] = conteo
+            self._cubetas.setdefault(conteo, {})[id] = None
+        self._orden = sorted(self._cubetas)
+
+    def increment(self, id, delta):
+        """
+        Suma delta al contador de un id (que empieza en 0 si no estaba).
+        """
+        conteo = self._conteos.get(id, 0)
+        if id in self._conteos:
+            self._discard(id, conteo)
+        self._insert(id, conteo + delta)
+
+    def _insert(self, id, conteo):
+        cubeta = self._cubetas.get(conteo)
+        if cubeta is None:
+            cubeta = self._cubetas[conteo] = {}
+            bisect.insort(self._orden, conteo)
+        cubeta[id] = None
+        self._conteos[id] = conteo
+
+    def _discard(self, id, conteo):
+        cubeta = self._cubetas[conteo]
+        del cubeta[id]
+        if not cubeta:
+            del self._cubetas[conteo]
+            del self._orden[bisect.bisect_left(self._orden, conteo)]
+
+    def descending(self):
+        """
+        Devuelve los pares (id, valor) de mayor a menor valor, a medida que se piden.
+        """
+        for conteo in reversed(self._orden):
+            for id in self._cubetas[conteo]:
+                yield id, conteo
+
+
+class AgregadosReproducciones():
+    """
+    Totales de reproducciones por álbum y por artista, materializados, y
+    clasificaciones en vivo de canciones, álbumes y artistas por reproducciones,
+    y de las canciones de cada artista.
+
+    Se reconstruyen a partir de los álbumes y las canciones con rebuild(), y
+    después cada reproducción los actualiza con record_play() sin recorrer nada:
+    se suma a los álbumes que contienen la canción y a sus artistas. Si una
+    canción aparece más de una vez en un tracklist, cuenta una vez por aparición,
+    igual que al sumar las canciones del álbum; en la clasificación de canciones
+    de un artista, en cambio, cada canción está una vez con sus reproducciones.
+
+    Atributos
+    ----------
+    version : tuple
+        la versión de las tablas de álbumes y canciones con la que se construyeron,
+        o None si todavía no se construyeron
+    por_album : dict
+        id del álbum -> total de reproducciones
+    por_artista : dict
+        id del artista -> total de reproducciones de sus álbumes
+    clasificaciones : dict
+        'canciones', 'albums' y 'usuarios' (artistas) -> Clasificacion
+    canciones_de_artista : dict
+        id del artista -> Clasificacion de las canciones de sus álbumes
+    albumes : list
+        los álbumes, en el orden en que se sumaron
+    pistas_album : array
+        por cada canción de cada tracklist que está en la tabla, la posición de
+        su álbum en 'albumes'
+    pistas_fila : array
+        por cada una de esas canciones, su fila en las columnas (ver
+        ColumnasCanciones), para sumar por álbum recorriendo arrays
+    """
+    def __init__(self):
+        self.version = None
+        self.por_album = {}
+        self.por_artista = {}
+        self._albumes_de_cancion = {}
+        self._artista_de_album = {}
+        self._artistas_de_cancion = {}
+        self.canciones_de_artista = {}
+        self.albumes = []
+        self.pistas_album = array("q")
+        self.pistas_fila = array("q")
+        self.clasificaciones = {tabla: Clasificacion() for tabla in ("canciones", "albums", "usuarios")}
+
+    def rebuild(self, albums, canciones, columnas, version):
+        """
+        Recalcula todos los totales, leyendo las reproducciones de las columnas.
+
+        Parámetros:
+            albums (iterable): Todas las instancias de Album.
+            canciones (dict): El mapa id -> instancia de Cancion (para la fila de cada id).
+            columnas (ColumnasCanciones): Los contadores de esas canciones.
+            version (tuple): La versión de las tablas con la que se calculan.
+        """
+        self.por_album = {}
+        self.por_artista = {}
+        self._albumes_de_cancion = {}
+        self._artista_de_album = {}
+        self._artistas_de_cancion = {}
+        por_artista_y_cancion = {}
+        self.albumes = []
+        self.pistas_album = array("q")
+        self.pistas_fila = array("q")
+        reproducciones = columnas.column("played")
+        for album in albums:
+            posicion = len(self.albumes)
+            self.albumes.append(album)
+            total = 0
+            del_artista = por_artista_y_cancion.setdefault(album.artist, {})
+            for song_id in album.tracklist:
+                cancion = canciones.get(song_id)
+                if cancion is not None:
+                    total += reproducciones[cancion._fila]
+                    self._albumes_de_cancion.setdefault(song_id, []).append(album.id)
+                    self.pistas_album.append(posicion)
+                    self.pistas_fila.append(cancion._fila)
+                    if song_id not in del_artista:
+                        del_artista[song_id] = reproducciones[cancion._fila]
+                        self._artistas_de_cancion.setdefault(song_id, []).append(album.artist)
+            self.por_album[album.id] = total
+            self._artista_de_album[album.id] = album.artist
+            self.por_artista[album.artist] = self.por_artista.get(album.artist, 0) + total
+        self.clasificaciones["canciones"].build(columnas.items("played"))
+        self.clasificaciones["albums"].build(self.por_album.items())
+        self.clasificaciones["usuarios"].build(self.por_artista.items())
+        self.canciones_de_artista = {}
+        for artista, conteos in por_artista_y_cancion.items():
+            self.canciones_de_artista[artista] = clasificacion = Clasificacion()
+            clasificacion.build(conteos.items())
+        self.version = version
+
+    def record_play(self, cancion_id, delta):
+        """
+        Suma delta reproducciones de una canción a sus álbumes y a sus artistas, y
+        a sus posiciones en las clasificaciones.
+        """
+        self.clasificaciones["canciones"].increment(cancion_id, delta)
+        for album_id in self._albumes_de_cancion.get(cancion_id, ()):
+            artista = self._artista_de_album[album_id]
+            self.por_album[album_id] += delta
+            self.por_artista[artista] += delta
+            self.clasificaciones["albums"].increment(album_id, delta)
+            self.clasificaciones["usuarios"].increment(artista, delta)
+        for artista in self._artistas_de_cancion.get(cancion_id, ()):
+            self.canciones_de_artista[artista].increment(cancion_id, delta)
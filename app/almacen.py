@@ -0,0 +1,647 @@
+"""
+Backends de almacenamiento para el repositorio.
+
+Por defecto los datos se guardan en los archivos JSON de 'db/'. Con la variable
+de entorno METROTIFY_ALMACEN=sqlite se usa en cambio la base de datos SQLite
+'db/metrotify.sqlite3', que se crea a partir de los JSON con:
+
+    python -m app.almacen
+
+Con METROTIFY_SNAPSHOT=1, el backend JSON guarda además un snapshot binario de
+cada tabla (ver app/snapshot.py) para acelerar la carga inicial.
+
+La tabla de canciones, la que más se escribe, se guarda repartida en varios
+archivos (fragmentos) dentro de 'db/canciones/', según el hash de cada id, con
+un 'manifest.json' que los enumera: escribir una canción solo reemplaza su
+fragmento. El manifiesto guarda también el orden original de los registros
+(el fragmento de cada uno, un carácter por registro), así que la tabla se lee
+en el mismo orden que tenía el archivo sin repartir. Si aparece un 'db/canciones.json' (por ejemplo, después de restaurar
+los datos desde la API), se reparte en fragmentos y se elimina.
+
+El backend JSON lee los archivos a través de la cache de app/cache.py: un archivo
+solo se vuelve a parsear si cambió en disco desde la última lectura o escritura
+de este proceso.
+"""
+import os
+import sqlite3
+import sys
+import zlib
+
+from .archivos import BloqueoArchivo, write_json_atomic
+from .cache import cache
+from .eventos import RegistroEventos
+from .snapshot import read_snapshot, signature, write_snapshot
+
+
+ARCHIVOS = {
+    "usuarios": "usuarios.json",
+    "albums": "albums.json",
+    "canciones": "canciones.json",
+    "playlists": "playlists.json",
+}
+
+# Para cada tabla: las columnas simples y, por cada campo de tipo lista, la tabla
+# de relación (muchos a muchos) donde se guardan sus elementos.
+ESQUEMA = {
+    "usuarios": {
+        "columnas": ["id", "name", "email", "username", "type"],
+        "listas": {
+            "liked_albums": "usuario_albums",
+            "songs_liked": "usuario_canciones",
+            "playlists": "usuario_playlists",
+            "artists_liked": "usuario_artistas",
+        },
+    },
+    "albums": {
+        "columnas": ["id", "name", "description", "cover", "published", "genre", "artist"],
+        "listas": {"tracklist": "album_canciones"},
+    },
+    "canciones": {
+        "columnas": ["id", "name", "duration", "link", "played", "liked"],
+        "listas": {},
+    },
+    "playlists": {
+        "columnas": ["id", "name", "description", "creator"],
+        "listas": {"tracks": "playlist_canciones"},
+    },
+}
+
+# Tablas guardadas en fragmentos, con la cantidad de fragmentos que se crean al
+# repartir su archivo JSON.
+FRAGMENTOS = {
+    "canciones": 8,
+}
+
+# Un carácter por fragmento en el orden del manifiesto (hasta 36 fragmentos).
+DIGITOS = "0123456789abcdefghijklmnopqrstuvwxyz"
+_FRAGMENTO = {caracter: numero for numero, caracter in enumerate(DIGITOS)}
+
+# Columnas con índice, además de la clave primaria 'id'.
+INDICES = {
+    "usuarios": ["username"],
+    "albums": ["artist"],
+    "playlists": ["creator"],
+}
+
+
+def fields(tabla):
+    """
+    Devuelve los campos de una tabla en el orden de los parámetros del constructor
+    de su modelo (las columnas simples y después las listas).
+    """
+    return ESQUEMA[tabla]["columnas"] + list(ESQUEMA[tabla]["listas"])
+
+
+class AlmacenJSON():
+    """
+    Guarda cada tabla en su archivo JSON y los contadores de las canciones en el
+    registro de eventos.
+
+    Varios procesos pueden usar la misma carpeta a la vez: las lecturas y
+    escrituras se hacen con el bloqueo 'db/.lock', cada escritura combina los
+    registros modificados con el contenido actual del archivo (así no se pierden
+    los cambios de los demás procesos) y el archivo se reemplaza de forma
+    atómica.
+
+    Las tablas de FRAGMENTOS se leen y escriben por fragmento: una escritura
+    solo reemplaza los fragmentos de los registros modificados.
+
+    Atributos
+    ----------
+    directorio : str
+        la carpeta donde se encuentran los archivos JSON
+    bloqueo : BloqueoArchivo
+        el bloqueo entre procesos de la carpeta
+    eventos : RegistroEventos
+        el registro de eventos de los contadores de las canciones
+    snapshot : bool
+        si se usa (y regenera) el snapshot binario de cada tabla al cargarla
+    """
+    def __init__(self, directorio="db", snapshot=False):
+        self.directorio = directorio
+        self.snapshot = snapshot
+        self.bloqueo = BloqueoArchivo(f"{directorio}/.lock")
+        self.eventos = RegistroEventos(f"{directorio}/eventos.log", self.bloqueo)
+
+    def path(self, tabla):
+        """
+        Devuelve la ruta del archivo JSON de una tabla (para una tabla en
+        fragmentos, el archivo desde donde se reparte).
+        """
+        return f"{self.directorio}/{ARCHIVOS[tabla]}"
+
+    def manifest_path(self, tabla):
+        """
+        Devuelve la ruta del manifiesto de una tabla en fragmentos.
+        """
+        return f"{self.directorio}/{tabla}/manifest.json"
+
+    def paths(self, tabla):
+        """
+        Devuelve las rutas de los archivos JSON de una tabla: uno solo, o sus
+        fragmentos en el orden del manifiesto. Reparte antes el archivo JSON de
+        la tabla si hace falta.
+        """
+        if tabla not in FRAGMENTOS:
+            return [self.path(tabla)]
+        if os.path.exists(self.path(tabla)):
+            self.split(tabla)
+        manifiesto = cache.load_json(self.manifest_path(tabla))
+        return [f"{self.directorio}/{tabla}/{archivo}" for archivo in manifiesto["archivos"]]
+
+    def order(self, tabla):
+        """
+        Devuelve el orden original de una tabla en fragmentos (el fragmento de cada
+        registro, un carácter de DIGITOS por registro), o None si la tabla no está
+        en fragmentos o su manifiesto no lo guarda.
+        """
+        if tabla not in FRAGMENTOS:
+            return None
+        return cache.load_json(self.manifest_path(tabla)).get("orden")
+
+    def split(self, tabla, cantidad=None):
+        """
+        Reparte el archivo JSON de una tabla en fragmentos según el hash del id,
+        escribe el manifiesto y elimina el archivo original.
+
+        Parámetros:
+            tabla (str): El nombre de la tabla.
+            cantidad (int, optional): La cantidad de fragmentos. Por defecto, la de FRAGMENTOS.
+        """
+        cantidad = cantidad or FRAGMENTOS[tabla]
+        with self.bloqueo:
+            if not os.path.exists(self.path(tabla)):
+                return
+            os.makedirs(f"{self.directorio}/{tabla}", exist_ok=True)
+            archivos = [f"{tabla}-{numero}.json" for numero in range(cantidad)]
+            fragmentos = [[] for _ in archivos]
+            orden = []
+            for registro in cache.load_json(self.path(tabla)):
+                fragmento = _shard(registro["id"], cantidad)
+                fragmentos[fragmento].append(registro)
+                orden.append(DIGITOS[fragmento])
+            for archivo, registros in zip(archivos, fragmentos):
+                path = f"{self.directorio}/{tabla}/{archivo}"
+                write_json_atomic(path, registros)
+                cache.store(path, registros)
+            manifiesto = {"tabla": tabla, "hash": "crc32", "archivos": archivos, "orden": "".join(orden)}
+            write_json_atomic(self.manifest_path(tabla), manifiesto)
+            cache.store(self.manifest_path(tabla), manifiesto)
+            cache.invalidate(self.path(tabla))
+            os.remove(self.path(tabla))
+
+    def load(self, tabla):
+        """
+        Lee todos los registros de una tabla, con los eventos pendientes ya aplicados.
+
+        Devuelve:
+            list: Una lista de diccionarios, en el orden del archivo (o de los
+            fragmentos, uno después del otro).
+        """
+        if self.snapshot:
+            campos = fields(tabla)
+            return [dict(zip(campos, fila)) for fila in self.load_rows(tabla)]
+
+        with self.bloqueo:
+            partes = [cache.load_json(path) for path in self.paths(tabla)]
+            orden = self.order(tabla)
+            deltas = self.eventos.replay() if tabla == "canciones" else {}
+        return [_apply(registro, deltas.get(registro["id"])) for registro in _interleave(partes, orden)]
+
+    def load_rows(self, tabla):
+        """
+        Lee una tabla desde su snapshot binario, regenerándolo desde el JSON si no
+        existe o si el JSON cambió, con los eventos pendientes ya aplicados.
+
+        Devuelve:
+            list: Una tupla por registro con los campos en el orden de fields(tabla),
+            o None si este almacén no usa snapshots.
+        """
+        if not self.snapshot:
+            return None
+
+        campos = fields(tabla)
+        partes = []
+        with self.bloqueo:
+            for path in self.paths(tabla):
+                parte = read_snapshot(self.snapshot_path(path), signature(path))
+                if parte is None:
+                    registros = cache.load_json(path)
+                    self._write_snapshot(tabla, path, registros)
+                    parte = {campo: [registro[campo] for registro in registros] for campo in campos}
+                partes.append(zip(*(parte[campo] for campo in campos)))
+            filas = list(_interleave(partes, self.order(tabla)))
+
+            if tabla == "canciones":
+                deltas = self.eventos.replay()
+                if deltas:
+                    posiciones = {fila[0]: numero for numero, fila in enumerate(filas)}
+                    for id, contadores in deltas.items():
+                        if id in posiciones:
+                            fila = list(filas[posiciones[id]])
+                            for campo, delta in contadores.items():
+                                fila[campos.index(campo)] += delta
+                            filas[posiciones[id]] = tuple(fila)
+        return filas
+
+    def snapshot_path(self, path):
+        """
+        Devuelve la ruta del snapshot binario de un archivo JSON de una tabla.
+        """
+        return path[:-len(".json")] + ".snap"
+
+    def _write_snapshot(self, tabla, path, registros):
+        esquema = ESQUEMA[tabla]
+        try:
+            write_snapshot(
+                self.snapshot_path(path),
+                registros,
+                signature(path),
+                esquema["columnas"],
+                list(esquema["listas"]),
+            )
+        except ValueError:
+            # Algún texto contiene '\0': la tabla se sigue leyendo desde el JSON.
+            pass
+
+    def stream(self, tabla):
+        """
+        Devuelve los registros de una tabla uno por uno, desde la cache o leyendo el
+        archivo a medida que se piden, con los eventos pendientes ya aplicados.
+
+        Devuelve:
+            Un generador de diccionarios, en el orden del archivo.
+        """
+        deltas = self.eventos.replay() if tabla == "canciones" else {}
+        partes = [cache.stream_json(path) for path in self.paths(tabla)]
+        for registro in _interleave(partes, self.order(tabla)):
+            yield _apply(registro, deltas.get(registro["id"]))
+
+    def write(self, tabla, entidades, sucias):
+        """
+        Combina los registros modificados con el archivo JSON actual y lo reemplaza.
+        En una tabla en fragmentos, solo se reemplazan los fragmentos que tienen
+        registros modificados.
+
+        Los registros que no están en 'sucias' se toman del archivo, tal como los
+        dejó el último proceso que lo escribió. En las canciones los contadores
+        siempre salen del archivo más el registro de eventos, que se vacía al
+        terminar.
+
+        Parámetros:
+            tabla (str): El nombre de la tabla.
+            entidades (dict): El mapa id -> instancia con todos los registros.
+            sucias (set): Los ids modificados o eliminados desde la última escritura.
+        """
+        with self.bloqueo:
+            paths = self.paths(tabla)
+            deltas = self.eventos.replay() if tabla == "canciones" else {}
+            cambios = {}
+            for id in list(sucias) + list(deltas):
+                cambios.setdefault(_shard(id, len(paths)), set()).add(id)
+
+            borrados = {}
+            agregados = set()
+            for fragmento, ids in cambios.items():
+                path = paths[fragmento]
+                registros = {registro["id"]: registro for registro in cache.load_json(path)}
+                posiciones = None
+                for id in ids & sucias:
+                    if id not in entidades:
+                        if id in registros:
+                            if posiciones is None:
+                                posiciones = {clave: numero for numero, clave in enumerate(registros)}
+                            borrados.setdefault(fragmento, set()).add(posiciones[id])
+                            del registros[id]
+                        continue
+                    if id not in registros:
+                        agregados.add(id)
+                    # Las listas se copian: el registro queda en la cache y no debe
+                    # cambiar cuando cambie la instancia.
+                    registro = {
+                        campo: list(valor) if isinstance(valor, list) else valor
+                        for campo, valor in entidades[id].to_dict().items()
+                    }
+                    if tabla == "canciones":
+                        anterior = registros.get(id, {"played": 0, "liked": 0})
+                        registro["played"] = anterior["played"]
+                        registro["liked"] = anterior["liked"]
+                    registros[id] = registro
+
+                for id in ids:
+                    if id in deltas and id in registros:
+                        registros[id] = _apply(registros[id], deltas.pop(id))
+
+                datos = list(registros.values())
+                write_json_atomic(path, datos)
+                cache.store(path, datos)
+
+            if (borrados or agregados) and self.order(tabla) is not None:
+                self._write_order(tabla, len(paths), borrados, agregados, entidades)
+
+            if tabla == "canciones":
+                # Los eventos de canciones que este proceso todavía no conoce
+                # (creadas por otro proceso y aún sin escribir) quedan en el registro.
+                self.eventos.truncate(deltas)
+
+    def _write_order(self, tabla, cantidad, borrados, agregados, entidades):
+        # Quita del orden las posiciones borradas de cada fragmento y agrega al
+        # final los registros nuevos, en el orden en que se crearon.
+        manifiesto = dict(cache.load_json(self.manifest_path(tabla)))
+        orden = manifiesto["orden"]
+        if borrados:
+            vistos = [0] * cantidad
+            conservados = []
+            for caracter in orden:
+                fragmento = _FRAGMENTO[caracter]
+                if vistos[fragmento] not in borrados.get(fragmento, ()):
+                    conservados.append(caracter)
+                vistos[fragmento] += 1
+            orden = "".join(conservados)
+        if agregados:
+            # Los registros nuevos están al final del mapa de identidad.
+            nuevos = []
+            for id in reversed(entidades):
+                if len(nuevos) == len(agregados):
+                    break
+                if id in agregados:
+                    nuevos.append(id)
+            orden += "".join(DIGITOS[_shard(id, cantidad)] for id in reversed(nuevos))
+        manifiesto["orden"] = orden
+        write_json_atomic(self.manifest_path(tabla), manifiesto)
+        cache.store(self.manifest_path(tabla), manifiesto)
+
+    def record_event(self, cancion, campo, delta):
+        """
+        Agrega el cambio de un contador al registro de eventos.
+        """
+        self.eventos.append(campo, delta, cancion.id)
+
+    def needs_compaction(self):
+        """
+        Devuelve True si hay eventos que todavía no están en los archivos de canciones.
+        """
+        return self.eventos.size() > 0
+
+    def reset(self):
+        """
+        Descarta los eventos pendientes, después de restaurar los archivos JSON.
+        """
+        self.eventos.truncate()
+
+    def restore(self, datos):
+        """
+        Reemplaza el contenido de las tablas (por ejemplo, con los datos por
+        defecto de la API) y descarta los eventos pendientes, todo con el bloqueo
+        de la carpeta: ninguna compactación puede incorporar eventos viejos a los
+        datos nuevos, y un corte a mitad de camino deja cada archivo completo.
+
+        Parámetros:
+            datos (dict): tabla -> lista de registros.
+        """
+        with self.bloqueo:
+            for tabla, registros in datos.items():
+                write_json_atomic(self.path(tabla), registros)
+                cache.invalidate(self.path(tabla))
+                if tabla in FRAGMENTOS:
+                    self.split(tabla)
+            self.reset()
+
+
+def _shard(id, cantidad):
+    """
+    Devuelve el número de fragmento de un id (siempre 0 si hay un solo archivo).
+    """
+    return zlib.crc32(str(id).encode()) % cantidad
+
+
+def _interleave(partes, orden):
+    """
+    Recorre los registros de los fragmentos en el orden original: el carácter
+    i-ésimo del orden indica de qué fragmento sale el registro i-ésimo. Los
+    registros que el orden no cubre (por ejemplo, sin orden guardado) van al
+    final, fragmento por fragmento.
+    """
+    iteradores = [iter(parte) for parte in partes]
+    if orden:
+        for caracter in orden:
+            registro = next(iteradores[_FRAGMENTO[caracter]], None)
+            if registro is not None:
+                yield registro
+    for iterador in iteradores:
+        yield from iterador
+
+
+def _apply(registro, contadores):
+    """
+    Devuelve el registro con los cambios de sus contadores aplicados. Si hay
+    cambios, devuelve una copia: el registro original puede estar en la cache.
+    """
+    if not contadores:
+        return registro
+    registro = dict(registro)
+    for campo, delta in contadores.items():
+        registro[campo] += delta
+    return registro
+
+
+class AlmacenSQLite():
+    """
+    Guarda las tablas en una base de datos SQLite, con índices sobre el id, el
+    nombre de usuario, el artista de cada álbum, el creador de cada playlist y
+    las tablas de relación (tracklists, playlists y "me gusta").
+
+    Atributos
+    ----------
+    path : str
+        la ruta del archivo de la base de datos
+    directorio : str
+        la carpeta con los archivos JSON desde donde se restauran los datos
+    """
+    def __init__(self, path="db/metrotify.sqlite3", directorio="db"):
+        self.path = path
+        self.directorio = directorio
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self.connection:
+            for tabla, esquema in ESQUEMA.items():
+                columnas = ", ".join(esquema["columnas"][1:])
+                self.connection.execute(f"CREATE TABLE IF NOT EXISTS {tabla} (id PRIMARY KEY, {columnas})")
+                for columna in INDICES.get(tabla, []):
+                    self.connection.execute(f"CREATE INDEX IF NOT EXISTS {tabla}_{columna} ON {tabla} ({columna})")
+                for relacion in esquema["listas"].values():
+                    self.connection.execute(
+                        f"CREATE TABLE IF NOT EXISTS {relacion} "
+                        "(owner_id, position INTEGER, item_id, PRIMARY KEY (owner_id, position))"
+                    )
+                    self.connection.execute(f"CREATE INDEX IF NOT EXISTS {relacion}_item ON {relacion} (item_id)")
+
+    def load(self, tabla):
+        """
+        Lee todos los registros de una tabla.
+
+        Devuelve:
+            list: Una lista de diccionarios, en el orden de inserción.
+        """
+        esquema = ESQUEMA[tabla]
+        columnas = esquema["columnas"]
+        cursor = self.connection.execute(f"SELECT {', '.join(columnas)} FROM {tabla} ORDER BY rowid")
+        registros = {fila[0]: dict(zip(columnas, fila)) for fila in cursor}
+
+        for campo, relacion in esquema["listas"].items():
+            for registro in registros.values():
+                registro[campo] = []
+            cursor = self.connection.execute(f"SELECT owner_id, item_id FROM {relacion} ORDER BY owner_id, position")
+            for owner_id, item_id in cursor:
+                if owner_id in registros:
+                    registros[owner_id][campo].append(item_id)
+        return list(registros.values())
+
+    def stream(self, tabla):
+        """
+        Devuelve los registros de una tabla uno por uno. Las tablas sin campos de
+        tipo lista se leen directamente del cursor.
+        """
+        esquema = ESQUEMA[tabla]
+        if esquema["listas"]:
+            yield from self.load(tabla)
+            return
+        columnas = esquema["columnas"]
+        for fila in self.connection.execute(f"SELECT {', '.join(columnas)} FROM {tabla} ORDER BY rowid"):
+            yield dict(zip(columnas, fila))
+
+    def write(self, tabla, entidades, sucias):
+        """
+        Inserta, actualiza o elimina solo las filas de los ids modificados.
+
+        Parámetros:
+            tabla (str): El nombre de la tabla.
+            entidades (dict): El mapa id -> instancia con todos los registros.
+            sucias (set): Los ids modificados o eliminados desde la última escritura.
+        """
+        esquema = ESQUEMA[tabla]
+        columnas = esquema["columnas"]
+        actualizacion = ", ".join(f"{columna} = excluded.{columna}" for columna in columnas[1:])
+        upsert = (
+            f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {actualizacion}"
+        )
+        with self.connection:
+            for id in sucias:
+                for relacion in esquema["listas"].values():
+                    self.connection.execute(f"DELETE FROM {relacion} WHERE owner_id = ?", (id,))
+                entidad = entidades.get(id)
+                if entidad is None:
+                    self.connection.execute(f"DELETE FROM {tabla} WHERE id = ?", (id,))
+                    continue
+                registro = entidad.to_dict()
+                self.connection.execute(upsert, [registro[columna] for columna in columnas])
+                for campo, relacion in esquema["listas"].items():
+                    self.connection.executemany(
+                        f"INSERT INTO {relacion} (owner_id, position, item_id) VALUES (?, ?, ?)",
+                        [(id, position, item_id) for position, item_id in enumerate(registro[campo])],
+                    )
+
+    def record_event(self, cancion, campo, delta):
+        """
+        Actualiza el contador directamente en la fila de la canción.
+        """
+        with self.connection:
+            self.connection.execute(f"UPDATE canciones SET {campo} = {campo} + ? WHERE id = ?", (delta, cancion.id))
+
+    def needs_compaction(self):
+        """
+        SQLite actualiza los contadores en su lugar, así que no hay nada que compactar.
+        """
+        return False
+
+    def reset(self):
+        """
+        Vuelve a importar los datos desde los archivos JSON, después de restaurarlos.
+        """
+        import_json(AlmacenJSON(self.directorio), self)
+
+    def restore(self, datos):
+        """
+        Reemplaza los archivos JSON de las tablas (ver AlmacenJSON.restore) y
+        vuelve a importarlos.
+        """
+        AlmacenJSON(self.directorio).restore(datos)
+        self.reset()
+
+
+def import_json(origen, destino):
+    """
+    Copia todas las tablas de un AlmacenJSON a un AlmacenSQLite, reemplazando su contenido.
+
+    Parámetros:
+        origen (AlmacenJSON): El almacén desde donde se leen los datos.
+        destino (AlmacenSQLite): El almacén donde se escriben los datos.
+
+    Devuelve:
+        dict: La cantidad de registros importados por tabla.
+    """
+    cantidades = {}
+    with destino.connection:
+        for tabla, esquema in ESQUEMA.items():
+            destino.connection.execute(f"DELETE FROM {tabla}")
+            for relacion in esquema["listas"].values():
+                destino.connection.execute(f"DELETE FROM {relacion}")
+
+            registros = origen.load(tabla)
+            columnas = esquema["columnas"]
+            destino.connection.executemany(
+                f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                [[registro[columna] for columna in columnas] for registro in registros],
+            )
+            for campo, relacion in esquema["listas"].items():
+                destino.connection.executemany(
+                    f"INSERT INTO {relacion} (owner_id, position, item_id) VALUES (?, ?, ?)",
+                    [
+                        (registro["id"], position, item_id)
+                        for registro in registros
+                        for position, item_id in enumerate(registro[campo])
+                    ],
+                )
+            cantidades[tabla] = len(registros)
+    return cantidades
+
+
+def migrate_json_to_sqlite(directorio="db", path=None):
+    """
+    Crea (o reemplaza) la base de datos SQLite a partir de los archivos JSON de 'db/'.
+
+    Parámetros:
+        directorio (str): La carpeta con los archivos JSON.
+        path (str): La ruta de la base de datos. Por defecto 'db/metrotify.sqlite3'.
+
+    Devuelve:
+        dict: La cantidad de registros importados por tabla.
+    """
+    path = path or f"{directorio}/metrotify.sqlite3"
+    return import_json(AlmacenJSON(directorio), AlmacenSQLite(path, directorio))
+
+
+def create_almacen(directorio="db"):
+    """
+    Crea el almacén indicado por la variable de entorno METROTIFY_ALMACEN
+    ('json' por defecto, o 'sqlite').
+    """
+    if os.environ.get("METROTIFY_ALMACEN", "json") == "sqlite":
+        path = f"{directorio}/metrotify.sqlite3"
+        nueva = not os.path.exists(path)
+        almacen = AlmacenSQLite(path, directorio)
+        if nueva:
+            almacen.reset()
+        return almacen
+    return AlmacenJSON(directorio, snapshot=os.environ.get("METROTIFY_SNAPSHOT") == "1")
+
+
+if __name__ == "__main__":
+    directorio = sys.argv[1] if len(sys.argv) > 1 else "db"
+    for tabla, cantidad in migrate_json_to_sqlite(directorio).items():
+        print(f"{tabla}: {cantidad} registros")
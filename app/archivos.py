@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+import threading
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class BloqueoArchivo():
+    """
+    Bloqueo exclusivo entre procesos sobre un archivo de bloqueo (por ejemplo
+    'db/.lock'), usable como context manager.
+
+    Es reentrante dentro del mismo proceso: solo la primera adquisición toma el
+    bloqueo del sistema operativo, y los demás hilos esperan en un RLock.
+
+    Atributos
+    ----------
+    path : str
+        la ruta del archivo de bloqueo
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._profundidad = 0
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._profundidad == 0:
+            self._file = open(self.path, "a+")
+            try:
+                _lock_file(self._file)
+            except BaseException:
+                self._file.close()
+                self._lock.release()
+                raise
+        self._profundidad += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._profundidad -= 1
+        if self._profundidad == 0:
+            _unlock_file(self._file)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+
+def _lock_file(file):
+    if os.name == "nt":
+        while True:
+            try:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(file):
+    if os.name == "nt":
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def write_atomic(path, data):
+    """
+    Escribe un archivo de forma atómica: primero en un archivo temporal de la
+    misma carpeta, con fsync, y luego lo renombra sobre el original. Un lector (o
+    un proceso que se cierre a mitad de camino) ve el archivo viejo o el nuevo,
+    nunca uno truncado.
+
+    Parámetros:
+        path (str): La ruta del archivo.
+        data (str o bytes): El contenido completo del archivo.
+    """
+    directorio = os.path.dirname(path) or "."
+    fd, temporal = tempfile.mkstemp(dir=directorio, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporal, path)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+
+def write_json_atomic(path, data):
+    """
+    Escribe un objeto como JSON de forma atómica (ver write_atomic).
+    """
+    write_atomic(path, json.dumps(data))
+
+
+def iter_json_array(path, tamano_bloque=1 << 16):
+    """
+    Lee un archivo JSON que contiene un arreglo de objetos y devuelve los objetos
+    uno por uno, sin cargar el archivo completo en memoria. Si quien lo usa deja
+    de iterar, el resto del archivo no se lee.
+
+    Parámetros:
+        path (str): La ruta del archivo.
+        tamano_bloque (int): La cantidad de caracteres leídos en cada lectura.
+
+    Devuelve:
+        Un generador de diccionarios.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as file:
+        buffer = ""
+        pos = 0
+        inicio = True
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                bloque = file.read(tamano_bloque)
+                if not bloque:
+                    raise json.JSONDecodeError("Fin de archivo inesperado", buffer, pos)
+                buffer, pos = buffer[pos:] + bloque, 0
+                continue
+            if inicio:
+                if buffer[pos] != "[":
+                    raise json.JSONDecodeError("Se esperaba un arreglo", buffer, pos)
+                inicio = False
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                objeto, fin = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # El objeto quedó cortado al final del bloque: se lee otro.
+                bloque = file.read(tamano_bloque)
+                if not bloque:
+                    raise
+                buffer, pos = buffer[pos:] + bloque, 0
+                continue
+            yield objeto
+            pos = fin
@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+from .archivos import iter_json_array
+
+
+class CacheArchivos():
+    """
+    Cache de archivos JSON ya parseados, compartida por todo el proceso.
+
+    Cada entrada se identifica por la ruta y se valida con el inodo, el mtime y el
+    tamaño del archivo: mientras no cambien, el archivo no se vuelve a leer. Los
+    datos devueltos se comparten entre quienes los piden, así que no se deben
+    modificar.
+
+    Atributos
+    ----------
+    hits : int
+        cantidad de lecturas resueltas desde la cache
+    misses : int
+        cantidad de lecturas que tuvieron que parsear el archivo
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def load_json(self, path):
+        """
+        Devuelve el contenido parseado de un archivo JSON, leyéndolo solo si cambió
+        desde la última vez.
+        """
+        datos = self.peek(path)
+        if datos is not None:
+            return datos
+
+        with open(path, "r") as file:
+            firma = _signature(os.fstat(file.fileno()))
+            datos = json.load(file)
+        with self._lock:
+            self.misses += 1
+            self._entradas[path] = (firma, datos)
+        return datos
+
+    def stream_json(self, path):
+        """
+        Devuelve los objetos de un archivo JSON (un arreglo) uno por uno: desde la
+        cache si está vigente o, si no, leyendo el archivo a medida que se piden
+        (ver iter_json_array). Si el archivo se lee completo y no cambió mientras
+        tanto, queda en la cache.
+        """
+        datos = self.peek(path)
+        if datos is not None:
+            yield from datos
+            return
+
+        firma = _signature(os.stat(path))
+        with self._lock:
+            self.misses += 1
+        datos = []
+        for objeto in iter_json_array(path):
+            datos.append(objeto)
+            yield objeto
+        if _signature(os.stat(path)) == firma:
+            with self._lock:
+                self._entradas[path] = (firma, datos)
+
+    def peek(self, path):
+        """
+        Devuelve el contenido en cache de un archivo si sigue vigente, o None sin
+        leer el archivo.
+        """
+        try:
+            firma = _signature(os.stat(path))
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            entrada = self._entradas.get(path)
+            if entrada is None or entrada[0] != firma:
+                return None
+            self.hits += 1
+            return entrada[1]
+
+    def store(self, path, datos):
+        """
+        Guarda en la cache el contenido que se acaba de escribir en un archivo, para
+        no tener que volver a parsearlo.
+        """
+        firma = _signature(os.stat(path))
+        with self._lock:
+            self._entradas[path] = (firma, datos)
+
+    def invalidate(self, path=None):
+        """
+        Descarta la entrada de un archivo, o todas si no se indica ninguno.
+        """
+        with self._lock:
+            if path is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(path, None)
+
+    def stats(self):
+        """
+        Devuelve los contadores de la cache.
+
+        Devuelve:
+            dict: Aciertos, fallos y cantidad de archivos en cache.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "archivos": len(self._entradas)}
+
+
+def _signature(info):
+    return (info.st_ino, info.st_mtime_ns, info.st_size)
+
+
+cache = CacheArchivos()
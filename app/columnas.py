@@ -0,0 +1,76 @@
+from array import array
+
+
+class ColumnasCanciones():
+    """
+    Almacén en columnas de los contadores de las canciones ('played' y 'liked').
+
+    Cada canción ocupa una fila densa (un entero consecutivo), que guarda en su
+    atributo '_fila'; el mapa de identidad del repositorio lleva del id de la
+    canción a su instancia y, con ella, a su fila. Los contadores se guardan en
+    arrays de int64 en esa posición en vez de como atributos de cada instancia,
+    así que ocupan 8 bytes cada uno y los totales se calculan recorriendo arrays,
+    sin tocar las instancias.
+
+    El repositorio tiene un almacén por carga de la tabla de canciones: lo
+    vuelve a crear al descartar las tablas, así que no acumula filas de cargas
+    anteriores. Una canción creada fuera del repositorio tiene su propio almacén
+    de una fila hasta que se agrega a la tabla (ver attach).
+
+    Atributos
+    ----------
+    played : array
+        la cantidad de reproducciones de cada fila
+    liked : array
+        la cantidad de "me gusta" de cada fila
+    ids : list
+        el id de la canción de cada fila, o None si la canción se eliminó
+    """
+    def __init__(self):
+        self.played = array("q")
+        self.liked = array("q")
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, id, played=0, liked=0):
+        """
+        Agrega una fila con los contadores dados y devuelve su número.
+        """
+        self.played.append(played)
+        self.liked.append(liked)
+        self.ids.append(id)
+        return len(self.ids) - 1
+
+    def attach(self, cancion):
+        """
+        Mueve los contadores de una canción a una fila nueva de este almacén, si
+        todavía no estaban en él.
+        """
+        if cancion._columnas is not self:
+            cancion._fila = self.add(cancion.id, cancion.played, cancion.liked)
+            cancion._columnas = self
+
+    def release(self, fila):
+        """
+        Libera la fila de una canción eliminada: sus contadores quedan en cero, así
+        que no cuentan en los totales.
+        """
+        self.played[fila] = 0
+        self.liked[fila] = 0
+        self.ids[fila] = None
+
+    def column(self, campo):
+        """
+        Devuelve el array de un contador, indexado por fila. Se puede envolver sin
+        copiar, por ejemplo con numpy.frombuffer(columna, dtype="int64").
+        """
+        return getattr(self, campo)
+
+    def items(self, campo):
+        """
+        Devuelve los pares (id, valor del contador) de las filas en uso.
+        """
+        columna = self.column(campo)
+        return ((id, columna[fila]) for fila, id in enumerate(self.ids) if id is not None)
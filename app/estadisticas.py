@@ -0,0 +1,185 @@
+"""
+Estadísticas de reproducciones calculadas con pandas.
+
+Los DataFrames se arman desde los datos ya guardados en columnas, sin recorrer
+las instancias de las canciones: los contadores salen de las columnas del
+repositorio (ColumnasCanciones), y cada canción de cada tracklist es un par de
+enteros, la posición de su álbum y su fila en las columnas, que el repositorio
+mantiene junto con los totales de reproducciones (Repositorio.track_rows). Los
+totales por álbum se suman con numpy sobre esos enteros, sin joins por id, y
+solo las canciones que salen en un ranking se buscan por id para su nombre.
+"""
+import numpy as np
+import pandas as pd
+
+
+RANKINGS = ("top_musicians", "top_albums", "top_songs", "top_genres", "top_liked_songs")
+
+
+def load_frames(usuarios, pistas, canciones, columnas):
+    """
+    Construye los DataFrames de las estadísticas.
+
+    Parámetros:
+        usuarios (list): Las instancias de Usuario.
+        pistas (tuple): Los álbumes y las canciones de sus tracklists, como los
+            devuelve Repositorio.track_rows().
+        canciones (dict): El mapa id -> instancia de Cancion (solo para los
+            nombres de las canciones de los rankings).
+        columnas (ColumnasCanciones): Los contadores de esas canciones.
+
+    Devuelve:
+        dict: Los DataFrames 'usuarios' (id, name, type), 'albums' (id, name,
+        genre, artist; uno por posición), 'pistas' (album, fila; una fila por
+        canción de cada tracklist) y 'canciones' (id, played, liked; una fila por
+        fila de las columnas, con id None si la canción se eliminó), y el mapa
+        'nombres' de las canciones.
+    """
+    albumes, pistas_album, pistas_fila = pistas
+    return {
+        "usuarios": pd.DataFrame(
+            [(user.id, user.name, user.type) for user in usuarios],
+            columns=["id", "name", "type"],
+        ),
+        "albums": pd.DataFrame(
+            [(album.id, album.name, album.genre, album.artist) for album in albumes],
+            columns=["id", "name", "genre", "artist"],
+        ),
+        # Copias de los arrays: el repositorio los sigue modificando.
+        "pistas": pd.DataFrame({
+            "album": np.array(pistas_album, dtype="int64"),
+            "fila": np.array(pistas_fila, dtype="int64"),
+        }),
+        "canciones": pd.DataFrame({
+            "id": columnas.ids,
+            "played": np.array(columnas.column("played"), dtype="int64"),
+            "liked": np.array(columnas.column("liked"), dtype="int64"),
+        }),
+        "nombres": canciones,
+    }
+
+
+def _song_names(frames, filas):
+    # Los nombres de las canciones de unas pocas filas de las columnas.
+    ids = frames["canciones"]["id"].to_numpy()[filas]
+    return [frames["nombres"][id].name for id in ids]
+
+
+def _played_by_album(frames):
+    # Los totales por posición de álbum: las reproducciones de cada pista, sumadas
+    # por álbum; una canción repetida en un tracklist cuenta una vez por aparición.
+    pistas = frames["pistas"]
+    reproducciones = frames["canciones"]["played"].to_numpy()[pistas["fila"].to_numpy()]
+    totales = np.bincount(pistas["album"].to_numpy(), weights=reproducciones, minlength=len(frames["albums"]))
+    return totales.astype("int64"), reproducciones
+
+
+def leaderboard_frame(filas, columnas):
+    """
+    Convierte las filas de un ranking (por ejemplo, las de
+    Repositorio.top_played()) en un DataFrame para mostrarlo o graficarlo.
+
+    Parámetros:
+        filas (iterable): Tuplas con un valor por columna.
+        columnas (list): Los nombres de las columnas.
+    """
+    return pd.DataFrame(list(filas), columns=columnas)
+
+
+def compute_statistics(frames, n=5, rankings=RANKINGS):
+    """
+    Calcula los rankings de reproducciones y "me gusta".
+
+    Las canciones que aparecen más de una vez en un tracklist cuentan una vez
+    por aparición, igual que en Album.get_total_streams().
+
+    Parámetros:
+        frames (dict): Los DataFrames devueltos por load_frames().
+        n (int): La cantidad de filas de cada ranking.
+        rankings (iterable): Los rankings a calcular (por defecto, todos los de
+            RANKINGS); los totales por álbum solo se suman si alguno los necesita.
+
+    Devuelve:
+        dict: DataFrames con columnas 'name' y 'streams' (o 'likes'), por cada
+        ranking pedido: 'top_musicians', 'top_albums', 'top_songs', 'top_genres'
+        y 'top_liked_songs'.
+    """
+    rankings = set(rankings)
+    canciones = frames["canciones"]
+
+    def top(frame, columna, nombre):
+        return frame.nlargest(n, columna)[["name", columna]].rename(columns={columna: nombre})
+
+    def top_songs(columna, nombre):
+        # Solo la columna del contador, sin las filas de canciones eliminadas.
+        primeras = canciones[columna][vivas].nlargest(n)
+        return pd.DataFrame({"name": _song_names(frames, primeras.index.to_numpy()), nombre: primeras})
+
+    resultados = {}
+    if rankings & {"top_songs", "top_liked_songs"}:
+        vivas = canciones["id"].notna().to_numpy()
+    if "top_songs" in rankings:
+        resultados["top_songs"] = top_songs("played", "streams")
+    if "top_liked_songs" in rankings:
+        resultados["top_liked_songs"] = top_songs("liked", "likes")
+    if not rankings & {"top_musicians", "top_albums", "top_genres"}:
+        return resultados
+
+    albums = frames["albums"].assign(played=_played_by_album(frames)[0])
+    if "top_albums" in rankings:
+        resultados["top_albums"] = top(albums, "played", "streams")
+
+    if "top_musicians" in rankings:
+        por_artista = albums.groupby("artist")["played"].sum()
+        usuarios = frames["usuarios"]
+        musicos = usuarios[usuarios["type"] == "musician"].join(por_artista, on="id")
+        musicos["played"] = musicos["played"].fillna(0).astype("int64")
+        resultados["top_musicians"] = top(musicos, "played", "streams")
+
+    if "top_genres" in rankings:
+        generos = albums.groupby("genre", as_index=False)["played"].sum().rename(columns={"genre": "name"})
+        resultados["top_genres"] = top(generos, "played", "streams")
+    return resultados
+
+
+def compute_group_statistics(frames, columna, n=5):
+    """
+    Calcula los rankings de álbumes y canciones dentro de cada género o de cada
+    artista.
+
+    Parámetros:
+        frames (dict): Los DataFrames devueltos por load_frames().
+        columna (str): La columna de los álbumes que agrupa ('genre' o 'artist').
+        n (int): La cantidad de filas de cada ranking.
+
+    Devuelve:
+        dict: valor de la columna -> dict con DataFrames 'top_albums' y
+        'top_songs' (columnas 'name' y 'streams'). Una canción que está en varios
+        álbumes del mismo grupo aparece una sola vez.
+    """
+    totales, reproducciones = _played_by_album(frames)
+    albums = frames["albums"].assign(played=totales)
+    pistas = frames["pistas"]
+    canciones = (
+        pd.DataFrame({
+            columna: albums[columna].to_numpy()[pistas["album"].to_numpy()],
+            "fila": pistas["fila"].to_numpy(),
+            "played": reproducciones,
+        })
+        .drop_duplicates([columna, "fila"])
+        .sort_values("played", ascending=False, kind="stable")
+        .groupby(columna)
+        .head(n)
+    )
+    canciones = canciones.assign(name=_song_names(frames, canciones["fila"].to_numpy()))
+    albums = albums.sort_values("played", ascending=False, kind="stable").groupby(columna).head(n)
+
+    def rename(frame):
+        return frame[["name", "played"]].rename(columns={"played": "streams"}).reset_index(drop=True)
+
+    canciones_por_grupo = dict(tuple(canciones.groupby(columna)))
+    vacio = canciones.iloc[0:0]
+    return {
+        valor: {"top_albums": rename(frame), "top_songs": rename(canciones_por_grupo.get(valor, vacio))}
+        for valor, frame in albums.groupby(columna)
+    }
@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+
+from .archivos import write_atomic
+
+
+CODIGOS = {
+    "played": "p",
+    "liked": "l",
+}
+CAMPOS = {codigo: campo for campo, codigo in CODIGOS.items()}
+
+
+class RegistroEventos():
+    """
+    Registro de solo escritura al final (write-ahead log) para los contadores de
+    las canciones.
+
+    Cada reproducción o "me gusta" se guarda como una línea corta
+    '<campo> <delta> <id>' al final del archivo, así que su costo no depende del
+    tamaño del catálogo. Los eventos se incorporan a los archivos de canciones
+    en la compactación y se vuelven a aplicar al cargar el programa si quedaron
+    pendientes.
+
+    Las escrituras usan group commit: los hilos que agregan eventos al mismo
+    tiempo se encolan, y uno de ellos escribe todo el lote con un único fsync
+    mientras tiene el bloqueo entre procesos.
+
+    Atributos
+    ----------
+    path : str
+        la ruta del archivo de eventos
+    bloqueo : BloqueoArchivo
+        el bloqueo compartido con los demás procesos que usan la misma carpeta
+    """
+    def __init__(self, path, bloqueo):
+        self.path = path
+        self.bloqueo = bloqueo
+        self._condicion = threading.Condition()
+        self._lote = []
+        self._escribiendo = False
+        self._encolados = 0
+        self._escritos = 0
+
+    def append(self, campo, delta, id):
+        """
+        Agrega un evento al final del registro.
+
+        Parámetros:
+            campo (str): El contador modificado ('played' o 'liked').
+            delta (int): La cantidad sumada al contador.
+            id: El id de la canción.
+        """
+        with self._condicion:
+            self._lote.append(_line(campo, delta, id))
+            self._encolados += 1
+            mio = self._encolados
+            while self._escritos < mio:
+                if self._escribiendo:
+                    self._condicion.wait()
+                    continue
+                lote, self._lote = self._lote, []
+                hasta = self._encolados
+                self._escribiendo = True
+                self._condicion.release()
+                try:
+                    self._write_batch(lote)
+                except BaseException:
+                    self._condicion.acquire()
+                    self._lote[:0] = lote
+                    self._escribiendo = False
+                    self._condicion.notify_all()
+                    raise
+                self._condicion.acquire()
+                self._escribiendo = False
+                self._escritos = hasta
+                self._condicion.notify_all()
+
+    def _write_batch(self, lote):
+        with self.bloqueo:
+            with open(self.path, "a") as file:
+                file.write("".join(lote))
+                file.flush()
+                os.fsync(file.fileno())
+
+    def replay(self):
+        """
+        Lee el registro y acumula los eventos pendientes por canción.
+
+        Una última línea incompleta (por ejemplo, si el programa se cerró mientras
+        se escribía) se descarta del archivo.
+
+        Devuelve:
+            dict: Un diccionario id -> {campo: delta acumulado}.
+        """
+        deltas = {}
+        with self.bloqueo:
+            if not os.path.exists(self.path):
+                return deltas
+
+            with open(self.path, "rb") as file:
+                data = file.read()
+
+            completo = data.rfind(b"\n") + 1
+            if completo < len(data):
+                with open(self.path, "r+b") as file:
+                    file.truncate(completo)
+
+        for line in data[:completo].decode().splitlines():
+            codigo, delta, id = line.split(" ", 2)
+            contadores = deltas.setdefault(json.loads(id), {})
+            campo = CAMPOS[codigo]
+            contadores[campo] = contadores.get(campo, 0) + int(delta)
+        return deltas
+
+    def size(self):
+        """
+        Devuelve el tamaño en bytes del registro.
+        """
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def truncate(self, pendientes=None):
+        """
+        Vacía el registro, una vez que sus eventos ya están en los archivos de canciones.
+
+        Parámetros:
+            pendientes (dict, optional): Deltas (como los de replay()) que no se
+                pudieron aplicar y deben quedar en el registro.
+        """
+        lineas = [
+            _line(campo, delta, id)
+            for id, contadores in (pendientes or {}).items()
+            for campo, delta in contadores.items()
+        ]
+        with self.bloqueo:
+            write_atomic(self.path, "".join(lineas))
+
+
+def _line(campo, delta, id):
+    return f"{CODIGOS[campo]} {delta} {json.dumps(id)}\n"
+
+
+class Compactador(threading.Thread):
+    """
+    Hilo en segundo plano que compacta periódicamente el registro de eventos.
+
+    Atributos
+    ----------
+    repositorio : Repositorio
+        el repositorio cuyo registro se compacta
+    intervalo : float
+        los segundos entre dos compactaciones
+    """
+    def __init__(self, repositorio, intervalo=30):
+        super().__init__(daemon=True)
+        self.repositorio = repositorio
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            self.repositorio.compact()
+
+    def stop(self):
+        """
+        Detiene el hilo antes de la próxima compactación.
+        """
+        self._detener.set()
@@ -0,0 +1,200 @@
+"""
+Conteo aproximado de reproducciones con un count-min sketch.
+
+Es un modo opcional (METROTIFY_CONTEO=sketch): además de los contadores
+exactos 'played', que siguen siendo los que se guardan, cada reproducción suma
+en una matriz fija de 'profundidad' filas por 'ancho' columnas, una columna por
+fila elegida con un hash del id. La estimación de una canción es el mínimo de
+sus columnas: nunca es menor que el valor exacto y, con probabilidad
+1 - e^-profundidad, lo supera en menos de e / ancho del total de
+reproducciones. Un montículo chico guarda las k canciones con estimación más
+alta (heavy hitters), así que las más escuchadas se detectan sin recorrer el
+catálogo y con memoria que no depende de él.
+
+reconcile() compara las estimaciones con los contadores exactos para medir el
+error real.
+"""
+import hashlib
+import heapq
+import math
+import os
+from array import array
+
+
+ANCHO = 2048
+PROFUNDIDAD = 4
+PRIMEROS = 10
+
+
+class ConteoMinimo():
+    """
+    Count-min sketch de contadores enteros.
+
+    Atributos
+    ----------
+    ancho : int
+        las columnas de cada fila
+    profundidad : int
+        la cantidad de filas (de funciones de hash)
+    total : int
+        la suma de todo lo contado
+    """
+    def __init__(self, ancho=ANCHO, profundidad=PROFUNDIDAD):
+        self.ancho = ancho
+        self.profundidad = profundidad
+        self.total = 0
+        self._filas = [array("q", bytes(8 * ancho)) for _ in range(profundidad)]
+
+    def _columns(self, id):
+        # Dos hashes de 64 bits combinados (h1 + i * h2) dan las columnas de todas las filas.
+        digest = hashlib.blake2b(str(id).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + fila * h2) % self.ancho for fila in range(self.profundidad)]
+
+    def add(self, id, delta=1):
+        """
+        Suma delta al contador de un id.
+
+        Devuelve:
+            int: La nueva estimación del contador.
+        """
+        self.total += delta
+        estimacion = None
+        for fila, columna in zip(self._filas, self._columns(id)):
+            fila[columna] += delta
+            if estimacion is None or fila[columna] < estimacion:
+                estimacion = fila[columna]
+        return estimacion
+
+    def estimate(self, id):
+        """
+        Devuelve la estimación del contador de un id.
+        """
+        return min(fila[columna] for fila, columna in zip(self._filas, self._columns(id)))
+
+    def error_bound(self):
+        """
+        Devuelve el error máximo (e / ancho * total) que no se supera con
+        probabilidad 1 - e^-profundidad.
+        """
+        return math.e / self.ancho * self.total
+
+
+class FrecuentesAproximados():
+    """
+    Count-min sketch de reproducciones por canción con las k canciones de
+    estimación más alta.
+
+    Atributos
+    ----------
+    conteo : ConteoMinimo
+        el sketch
+    k : int
+        la cantidad de canciones frecuentes que se mantienen
+    version : tuple
+        la versión de la tabla de canciones con la que se construyó, o None
+    """
+    def __init__(self, ancho=ANCHO, profundidad=PROFUNDIDAD, k=PRIMEROS):
+        self.conteo = ConteoMinimo(ancho, profundidad)
+        self.k = k
+        self.version = None
+        self._candidatos = {}
+        self._monticulo = []
+
+    def rebuild(self, conteos, version):
+        """
+        Vuelve a construir el sketch.
+
+        Parámetros:
+            conteos (iterable): Pares (id, reproducciones exactas).
+            version (tuple): La versión de la tabla con la que se construye.
+        """
+        self.conteo = ConteoMinimo(self.conteo.ancho, self.conteo.profundidad)
+        self._candidatos = {}
+        self._monticulo = []
+        for id, conteo in conteos:
+            if conteo:
+                self.add(id, conteo)
+        self.version = version
+
+    def add(self, id, delta=1):
+        """
+        Cuenta delta reproducciones de una canción y actualiza las frecuentes.
+        """
+        estimacion = self.conteo.add(id, delta)
+        if id not in self._candidatos and len(self._candidatos) >= self.k:
+            menor = self._minimum()
+            if estimacion <= self._candidatos[menor]:
+                return
+            del self._candidatos[menor]
+            heapq.heappop(self._monticulo)
+        self._candidatos[id] = estimacion
+        heapq.heappush(self._monticulo, (estimacion, id))
+        if len(self._monticulo) > 4 * self.k:
+            self._monticulo = [(conteo, id) for id, conteo in self._candidatos.items()]
+            heapq.heapify(self._monticulo)
+
+    def _minimum(self):
+        # Las entradas del montículo quedan viejas cuando sube la estimación de
+        # un candidato; se descartan al llegar arriba.
+        while True:
+            conteo, id = self._monticulo[0]
+            if self._candidatos.get(id) == conteo:
+                return id
+            heapq.heappop(self._monticulo)
+
+    def top(self, n=None):
+        """
+        Devuelve las canciones frecuentes.
+
+        Devuelve:
+            list: Pares (id, reproducciones estimadas), de mayor a menor.
+        """
+        return heapq.nlargest(n or self.k, self._candidatos.items(), key=lambda par: par[1])
+
+    def reconcile(self, exactos):
+        """
+        Compara las estimaciones con los contadores exactos.
+
+        Parámetros:
+            exactos (dict): id de la canción -> reproducciones exactas.
+
+        Devuelve:
+            dict: 'error_medio' y 'error_maximo' (estimación - exacto, sobre todas
+            las canciones), 'cota' (ver ConteoMinimo.error_bound), 'fuera_de_cota'
+            (canciones que la superan) y 'aciertos_primeros' (cuántas de las k
+            frecuentes están entre las k más escuchadas exactas).
+        """
+        cota = self.conteo.error_bound()
+        suma = 0
+        maximo = 0
+        fuera = 0
+        for id, exacto in exactos.items():
+            error = self.conteo.estimate(id) - exacto
+            suma += error
+            maximo = max(maximo, error)
+            if error > cota:
+                fuera += 1
+        primeros = {id for id, _ in heapq.nlargest(self.k, exactos.items(), key=lambda par: par[1])}
+        return {
+            "error_medio": suma / len(exactos) if exactos else 0,
+            "error_maximo": maximo,
+            "cota": cota,
+            "fuera_de_cota": fuera,
+            "aciertos_primeros": len(primeros & self._candidatos.keys()),
+        }
+
+
+def create_frecuentes():
+    """
+    Crea el conteo aproximado si la variable de entorno METROTIFY_CONTEO es
+    'sketch', con el ancho y la profundidad de METROTIFY_SKETCH_ANCHO y
+    METROTIFY_SKETCH_PROFUNDIDAD; si no, devuelve None.
+    """
+    if os.environ.get("METROTIFY_CONTEO", "exacto") != "sketch":
+        return None
+    return FrecuentesAproximados(
+        int(os.environ.get("METROTIFY_SKETCH_ANCHO", ANCHO)),
+        int(os.environ.get("METROTIFY_SKETCH_PROFUNDIDAD", PROFUNDIDAD)),
+    )
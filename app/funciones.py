@@ -1,14 +1,15 @@
 import os
 import requests
 import uuid
-import json
 import webbrowser
-import pandas as pd
 import matplotlib.pyplot as plt
 
 
 
 from .modelos import Usuario, Album, Cancion, Playlist
+from .cache import cache
+from .estadisticas import compute_statistics, leaderboard_frame, load_frames
+from .repositorio import get_repositorio
 
 
 def generate_id():
@@ -22,7 +23,8 @@ def generate_id():
 
 def validate_if_username_exists(username):
     """
-    Valida si un nombre de usuario ya existe en el archivo 'db/usuarios.json'.
+    Valida si un nombre de usuario ya existe, con el índice de nombres de usuario
+    del repositorio (sin recorrer los usuarios).
 
     Parámetros:
         username (str): El nombre de usuario a validar.
@@ -30,14 +32,7 @@ def validate_if_username_exists(username):
     Devuelve:
         bool: True si el nombre de usuario ya existe, False si no.
     """
-    with open("db/usuarios.json", "r") as file:
-        users = json.load(file)
-
-    for user in users:
-        if user["username"] == username:
-            return True
-
-    return False
+    return len(get_repositorio().find("usuarios", "username", username)) > 0
 
 def validate_integer_input(prompt):
     """
@@ -116,17 +111,20 @@ def restore_default_data():
     """
     Restaura los datos por defecto de la aplicación.
 
-    La función carga los usuarios, álbumes y playlists desde una API y los guarda
-    en los archivos 'db/usuarios.txt', 'db/albums.txt', 'db/canciones.txt' y 'db/playlists.txt'.
+    La función carga los usuarios, álbumes y playlists desde una API y, cuando
+    tiene todo, reemplaza con ellos los archivos de 'db/' de una sola vez (ver
+    Repositorio.restore), con escrituras atómicas y descartando los eventos
+    pendientes de las canciones viejas.
 
     Devuelve:
         Un diccionario con los códigos de estado de las respuestas HTTP de cada solicitud.
     """
-    codes = {
-        "users": load_users_from_api(),
-        "albums": load_albums_from_api(),
-        "playlists": load_playlists_from_api()
-    }
+    codes = {}
+    datos = {}
+    codes["users"], datos["usuarios"] = load_users_from_api()
+    codes["albums"], datos["albums"], datos["canciones"] = load_albums_from_api()
+    codes["playlists"], datos["playlists"] = load_playlists_from_api()
+    get_repositorio().restore(datos)
     return codes
    
 
@@ -135,44 +133,40 @@ def load_users_from_api():
     Carga los usuarios desde una API.
 
     La función realiza una solicitud GET a la API, parsea la respuesta a JSON,
-    y luego escribe cada usuario en el archivo 'db/usuarios.json'. Cada usuario
-    se escribe en una nueva línea en formato JSON.
-
-    Al abrir el archivo 'db/usuarios.json' en modo escritura, se borra cualquier
-    contenido existente en el archivo.
+    y convierte cada usuario al formato del archivo 'db/usuarios.json'.
 
     Devuelve:
-        El código de estado de la respuesta HTTP.
+        tuple: El código de estado de la respuesta HTTP y la lista de usuarios.
     """
     url = "https://raw.githubusercontent.com/Algoritmos-y-Programacion/api-proyecto/main/users.json"
     response = requests.get(url)
     data = response.json()
-    with open("db/usuarios.json", "w") as file:
-        json_data = []
-        for user in data:
-            user = Usuario(user["id"], user["name"], user["email"], user["username"], user["type"])
-            user_dict = {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "username": user.username,
-                "type": user.type,
-                "liked_albums": [],
-                "songs_liked": [],
-                "playlists": [],
-                "artists_liked": []
-            }
-            json_data.append(user_dict)
-        json.dump(json_data, file)
-            
-    return response.status_code
+    json_data = []
+    for user in data:
+        user = Usuario(user["id"], user["name"], user["email"], user["username"], user["type"])
+        user_dict = {
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "username": user.username,
+            "type": user.type,
+            "liked_albums": [],
+            "songs_liked": [],
+            "playlists": [],
+            "artists_liked": []
+        }
+        json_data.append(user_dict)
+
+    return response.status_code, json_data
 
 def load_albums_from_api():
     """
-    Carga los álbumes desde una API y guarda la información en archivos JSON.
+    Carga los álbumes y sus canciones desde una API, en el formato de los
+    archivos JSON de 'db/'.
 
     Returns:
-        int: El código de estado de la respuesta HTTP.
+        tuple: El código de estado de la respuesta HTTP, la lista de álbumes y la
+        lista de canciones.
     """
     url = "https://raw.githubusercontent.com/Algoritmos-y-Programacion/api-proyecto/main/albums.json"
     response = requests.get(url)
@@ -206,64 +200,49 @@ def load_albums_from_api():
             all_tracks.append(track_dict)                          
             
 
-    with open("db/albums.json", "w") as file:
-        json.dump(all_albums, file)
-
-    with open("db/canciones.json", "w") as file:
-        json.dump(all_tracks, file)
-
-    return response.status_code
+    return response.status_code, all_albums, all_tracks
 
 def load_playlists_from_api():
     """
-    Carga las listas de reproducción desde una API y las guarda en un archivo JSON local.
+    Carga las listas de reproducción desde una API, en el formato del archivo
+    'db/playlists.json'.
 
     Returns:
-        int: Código de estado de la respuesta HTTP.
+        tuple: Código de estado de la respuesta HTTP y la lista de playlists.
     """
     url = "https://raw.githubusercontent.com/Algoritmos-y-Programacion/api-proyecto/main/playlists.json"
     response = requests.get(url)
     data = response.json()
 
-    with open("db/playlists.json", "w") as file:
-        json_data = []
-        for playlist in data:
-            playlist_dict = {
-                "id": playlist["id"],
-                "name": playlist["name"],
-                "description": playlist["description"].replace('\n', ' '),
-                "creator": playlist["creator"],
-                "tracks": playlist["tracks"]
-            }
-            json_data.append(playlist_dict)
-        json.dump(json_data, file)
+    json_data = []
+    for playlist in data:
+        playlist_dict = {
+            "id": playlist["id"],
+            "name": playlist["name"],
+            "description": playlist["description"].replace('\n', ' '),
+            "creator": playlist["creator"],
+            "tracks": playlist["tracks"]
+        }
+        json_data.append(playlist_dict)
 
-    return response.status_code
+    return response.status_code, json_data
 
 def load_all_data():
     """
     Carga todos los datos de la aplicación desde los archivos 'db/usuarios.json',
-    'db/albums.json', 'db/canciones.json' y 'db/playlists.json'.
+    'db/albums.json', 'db/playlists.json' y los fragmentos de 'db/canciones/'.
 
     Devuelve:
         Un diccionario con los datos cargados.
     """
-    with open("db/usuarios.json") as file:
-        users = json.load(file)
-    with open("db/albums.json") as file:
-        albums = json.load(file)
-    with open("db/canciones.json") as file:
-        songs = json.load(file)
-    with open("db/playlists.json") as file:
-        playlists = json.load(file)
-        
-    usuarios = [Usuario(**user) for user in users]
+    repo = get_repositorio()
+    usuarios = repo.all("usuarios")
     
-    albumes = [Album(**album) for album in albums]
+    albumes = repo.all("albums")
     
-    canciones = [Cancion(**song) for song in songs]
+    canciones = repo.all("canciones")
     
-    playlists = [Playlist(**playlist) for playlist in playlists]
+    playlists = repo.all("playlists")
     
     return usuarios, albumes, canciones, playlists
 
@@ -289,26 +268,7 @@ def create_new_user():
         username = validate_string_input("Ingrese un nombre de usuario: ")
     type = select_user_type()
     user = Usuario(id, name, email, username, type)
-
-    with open("db/usuarios.json", "r") as file:
-        users = json.load(file)
-
-    user_dict = {
-        "id": user.id,
-        "name": user.name,
-        "email": user.email,
-        "username": user.username,
-        "type": user.type,
-        "liked_albums": [],
-        "songs_liked": [],
-        "playlists": [],
-        "artists_liked": []
-    }
-
-    users.append(user_dict)
-
-    with open("db/usuarios.json", "w") as file:
-        json.dump(users, file)
+    get_repositorio().add("usuarios", user)
 
     return user
 
@@ -317,20 +277,18 @@ def login_user():
     Inicia sesión de un usuario.
 
     La función solicita al usuario ingresar su nombre de usuario y luego
-    busca el usuario en el archivo 'db/usuarios.json'.
+    lo busca en el índice de nombres de usuario del repositorio.
 
     Devuelve:
-        Usuario: El objeto Usuario que inició sesión.
+        Usuario: El objeto Usuario que inició sesión, o None si no existe.
     """
     username = validate_string_input("Ingrese su nombre de usuario: ")
-    with open("db/usuarios.json", "r") as file:
-        users = json.load(file)
-
-    for user in users:
-        if user["username"] == username:
-            user = Usuario(**user)
-            print(f"Bienvenido, {user.name}!")
-            user_menu(user)
+    users = get_repositorio().find("usuarios", "username", username)
+    if users:
+        user = users[0]
+        print(f"Bienvenido, {user.name}!")
+        user_menu(user)
+        return user
 
     print("Usuario no encontrado.")
     return None
@@ -370,6 +328,7 @@ def user_menu(user):
                 break
             else:
                 print("Opción inválida.")
+            get_repositorio().flush()
         else:
             print("1. Buscar Perfil")
             print("2. Buscar Canciones por Nombre, Album, Artista o Playlist")
@@ -394,6 +353,8 @@ def user_menu(user):
                 break
             else:
                 print("Opción inválida.")
+            get_repositorio().flush()
+    get_repositorio().flush()
 
 def create_album(user):
     """
@@ -421,24 +382,9 @@ def create_album(user):
         else:
             print("Opción inválida.")
             
-    with open("db/albums.json", "r") as file:
-        albums = json.load(file)
-        
-    new_album = {
-        "id": len(albums) + 1,
-        "name": name,
-        "description": description,
-        "cover": cover,
-        "published": published,
-        "genre": genre,
-        "artist": user.id,
-        "tracklist": tracklist
-    }
-    
-    albums.append(new_album)
-    
-    with open("db/albums.json", "w") as file:
-        json.dump(albums, file, indent=4)
+    repo = get_repositorio()
+    new_album = Album(len(repo.table("albums")) + 1, name, description, cover, published, genre, user.id, tracklist)
+    repo.add("albums", new_album)
         
     print(f"Álbum {name} creado exitosamente.")
     
@@ -453,24 +399,11 @@ def create_track():
     duration = validate_string_input("Ingrese la duración de la canción: ")
     link = validate_string_input("Ingrese el enlace de la canción: ")
 
-    with open("db/canciones.json", "r") as file:
-        songs = json.load(file)
-        
-    new_song = {
-        "id": len(songs) + 1,
-        "name": name,
-        "duration": duration,
-        "link": link,
-        "played": 0,
-        "liked": 0
-    }
-    
-    songs.append(new_song)
-    
-    with open("db/canciones.json", "w") as file:        
-        json.dump(songs, file, indent=4)        
+    repo = get_repositorio()
+    new_song = Cancion(len(repo.table("canciones")) + 1, name, duration, link)
+    repo.add("canciones", new_song)
     print(f"Canción {name} creada exitosamente.")
-    return Cancion(**new_song)
+    return new_song
 
 
         
@@ -488,17 +421,21 @@ def create_playlist(user):
     name = validate_string_input("Ingrese el nombre de la playlist: ")
     description = validate_string_input("Ingrese la descripción de la playlist: ")
 
-    with open("db/canciones.json", "r") as file:
-        all_songs = json.load(file)
-        
-    all_songs = [Cancion(**song) for song in all_songs]
-
     tracks = []
+    if input("¿Desea importar las canciones desde un archivo de texto (un título por línea)? (s/n): ").lower() == 's':
+        path = validate_string_input("Ingrese la ruta del archivo: ")
+        try:
+            tracks = import_tracks_from_file(path)
+        except (OSError, UnicodeDecodeError):
+            # UnicodeDecodeError: el archivo no está en UTF-8 (por ejemplo, guardado en cp1252).
+            print("No se pudo leer el archivo.")
+
     while True:
         song_name = input("Ingrese el nombre de una canción para agregar a la playlist, o 'q' para terminar: ")
         if song_name.lower() == 'q':
             break
-        matching_songs = [song for song in all_songs if song_name in song.name]
+        # El índice encuentra las coincidencias sin distinguir mayúsculas; aquí sí se distinguen.
+        matching_songs = [song for song in get_repositorio().search("canciones", "name", song_name) if song_name in song.name]
         if matching_songs:
             for i, song in enumerate(matching_songs, start=1):
                 print(f"{i}. {song}")
@@ -507,24 +444,41 @@ def create_playlist(user):
         else:
             print("No se encontraron canciones que coincidan.")
 
-    with open("db/playlists.json", "r") as file:
-        playlists = json.load(file)
-
-    new_playlist = {
-        "id": len(playlists) + 1,
-        "name": name,
-        "description": description,
-        "creator": user.id,
-        "tracks": tracks
-    }
-
-    playlists.append(new_playlist)
-
-    with open("db/playlists.json", "w") as file:
-        json.dump(playlists, file, indent=4)
+    repo = get_repositorio()
+    new_playlist = Playlist(len(repo.table("playlists")) + 1, name, description, user.id, tracks)
+    repo.add("playlists", new_playlist)
         
     print(f"Playlist {name} creada exitosamente.")
     
+def import_tracks_from_file(path):
+    """
+    Lee una lista de títulos de canciones (uno por línea) y los busca todos a la
+    vez en el catálogo. De cada título se toma la canción con ese nombre exacto
+    (sin distinguir mayúsculas) o, si no hay, la primera que lo contiene.
+
+    Parámetros:
+        path (str): La ruta del archivo de texto.
+
+    Devuelve:
+        list: Los ids de las canciones encontradas, en el orden del archivo.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        titles = [line.strip() for line in file if line.strip()]
+
+    tracks = []
+    not_found = []
+    for title, matching_songs in zip(titles, get_repositorio().search_many("canciones", "name", titles)):
+        exact = [song for song in matching_songs if song.name.lower() == title.lower()]
+        if exact or matching_songs:
+            tracks.append((exact or matching_songs)[0].id)
+        else:
+            not_found.append(title)
+
+    print(f"Se importaron {len(tracks)} de {len(titles)} canciones.")
+    for title in not_found:
+        print(f"- No se encontró: {title}")
+    return tracks
+
 def edit_user(user):
     """
     Edita un usuario.
@@ -567,13 +521,11 @@ def delete_account(user):
     """
     confirm = input("Está a punto de eliminar su cuenta. ¿Está seguro? (s/n): ")
     if confirm.lower() == 's':
-        with open("db/usuarios.json", "r") as file:
-            users = json.load(file)
-
-        users = [u for u in users if u["id"] != user.id]
-
-        with open("db/usuarios.json", "w") as file:
-            json.dump(users, file, indent=4)
+        for song in user.get_liked_songs():
+            user.dislike_song(song)
+        repo = get_repositorio()
+        repo.remove("usuarios", user.id)
+        repo.flush()
 
         print("Cuenta eliminada exitosamente.")
         exit()
@@ -589,19 +541,21 @@ def search_user_profile(user):
     Parámetros:
         user (Usuario): El objeto Usuario que inició sesión.
     """
-    name = validate_string_input("Ingrese el nombre a buscar: ")
-    with open("db/usuarios.json", "r") as file:
-        users = json.load(file)
+    name = validate_string_input("Ingrese el nombre o el inicio del nombre de usuario a buscar: ")
+    repo = get_repositorio()
+    users = repo.search("usuarios", "name", name)
+    # Se agregan los usuarios cuyo nombre de usuario empieza con lo ingresado.
+    users += [user_profile for user_profile in repo.complete("usuarios", "username", name) if user_profile not in users]
 
-    matching_profiles = [user_profile for user_profile in users if name.lower() in user_profile["name"].lower() and user_profile["username"] != user.username]
+    matching_profiles = [user_profile for user_profile in users if user_profile.username != user.username]
 
     if matching_profiles:
         print("Perfiles encontrados:")
         for i, user_profile in enumerate(matching_profiles, start=1):
-            print(f"{i:2d}. {user_profile['name']} ({user_profile['type']})")
+            print(f"{i:2d}. {user_profile.name} (@{user_profile.username}, {user_profile.type})")
 
         selection = validate_integer_input_min_max("Seleccione el perfil que desea ver: ", 1, len(matching_profiles))
-        selected_profile = Usuario(**matching_profiles[selection - 1])
+        selected_profile = matching_profiles[selection - 1]
         show_user_profile(selected_profile)
     else:
         print("Perfil no encontrado.")
@@ -629,13 +583,17 @@ def show_user_profile(user):
             print(f"- {album.name} de {album.get_artist()}")
         print("Canciones que le gustan:")
         for song in user.get_liked_songs():
-            print(f"- {song.name} del álbum {song.get_album()} de {song.get_artist()}")
+            album = song.get_album()
+            artist = album.get_artist() if album else None
+            print(f"- {song.name} del álbum {album.name if album else '-'} de {artist.name if artist else '-'}")
     else:
+        repo = get_repositorio()
         user.show_albums()
         print("Canciones mas escuchadas:")
         for song in user.get_top_songs():
-            print(f"- {song.name} Reproducciones: {song.played} Likes: {song.liked}")
+            print(f"- {song.name} Reproducciones: {song.played} Likes: {song.liked} Oyentes: ~{repo.unique_listeners('canciones', song.id)}")
         print("Cantidad de reproducciones Totales: ", user.get_total_played())
+        print("Oyentes únicos (aproximado): ", repo.unique_listeners("usuarios", user.id))
     
     input("Presione Enter para continuar...")
     
@@ -654,7 +612,8 @@ def search_songs_menu(user):
         print("2. Buscar por Album")
         print("3. Buscar por Artista")
         print("4. Buscar por Playlist")
-        print("5. Salir")
+        print("5. Buscar en nombres y descripciones")
+        print("6. Salir")
         opc = validate_integer_input("Ingrese una opción: ")
         if opc == 1:
             search_songs_by_name(user)
@@ -665,6 +624,8 @@ def search_songs_menu(user):
         elif opc == 4:
             search_songs_by_playlist(user)
         elif opc == 5:
+            search_by_text(user)
+        elif opc == 6:
             print("Saliendo del menú de búsqueda de canciones...")
             break
         else:
@@ -679,10 +640,11 @@ def search_songs_by_name(user):
         user (Usuario): El objeto Usuario que inició sesión.
     """
     name = validate_string_input("Ingrese el nombre de la canción a buscar: ")
-    with open("db/canciones.json", "r") as file:
-        songs = json.load(file)
-
-    matching_songs = [Cancion(**song) for song in songs if name.lower() in song["name"].lower()]
+    matching_songs = get_repositorio().search("canciones", "name", name)
+    if not matching_songs:
+        matching_songs = get_repositorio().search_fuzzy("canciones", "name", name, 20)
+        if matching_songs:
+            print("No hay coincidencias exactas. Quizás quiso decir:")
 
     if matching_songs:
         print("Canciones encontradas:")
@@ -702,10 +664,11 @@ def search_songs_by_album(user):
         user (Usuario): El objeto Usuario que inició sesión.
     """
     album_name = validate_string_input("Ingrese el nombre del álbum a buscar: ")
-    with open("db/albums.json", "r") as file:
-        albums = json.load(file)
-
-    matching_albums = [Album(**album) for album in albums if album_name.lower() in album["name"].lower()]
+    matching_albums = get_repositorio().search("albums", "name", album_name)
+    if not matching_albums:
+        matching_albums = get_repositorio().search_fuzzy("albums", "name", album_name, 20)
+        if matching_albums:
+            print("No hay coincidencias exactas. Quizás quiso decir:")
 
     if matching_albums:
         print("Álbumes encontrados:")
@@ -725,10 +688,14 @@ def search_songs_by_artist(user):
         user (Usuario): El objeto Usuario que inició sesión.
     """
     artist_name = validate_string_input("Ingrese el nombre del artista a buscar: ")
-    with open("db/usuarios.json", "r") as file:
-        users = json.load(file)
+    users = get_repositorio().search("usuarios", "name", artist_name)
 
-    matching_artists = [Usuario(**user) for user in users if artist_name.lower() in user["name"].lower() and user["type"] == "musician"]
+    matching_artists = [artist for artist in users if artist.type == "musician"]
+    if not matching_artists:
+        users = get_repositorio().search_fuzzy("usuarios", "name", artist_name)
+        matching_artists = [artist for artist in users if artist.type == "musician"][:20]
+        if matching_artists:
+            print("No hay coincidencias exactas. Quizás quiso decir:")
 
     if matching_artists:
         print("Artistas encontrados:")
@@ -748,10 +715,7 @@ def search_songs_by_playlist(user):
         user (Usuario): El objeto Usuario que inició sesión.
     """
     playlist_name = validate_string_input("Ingrese el nombre de la playlist a buscar: ")
-    with open("db/playlists.json", "r") as file:
-        playlists = json.load(file)
-
-    matching_playlists = [Playlist(**playlist) for playlist in playlists if playlist_name.lower() in playlist["name"].lower()]
+    matching_playlists = get_repositorio().search("playlists", "name", playlist_name)
 
     if matching_playlists:
         print("Playlists encontradas:")
@@ -763,6 +727,38 @@ def search_songs_by_playlist(user):
     else:
         print("Playlist no encontrada.")
         
+def search_by_text(user):
+    """
+    Busca álbumes y playlists por las palabras de su nombre y su descripción, y
+    muestra los más relevantes de cada uno primero (ranking BM25). Los álbumes y
+    las playlists se muestran en listas separadas: cada tabla tiene su propio
+    índice, con sus propias frecuencias y largos, así que los puntajes de una no
+    se pueden comparar con los de la otra.
+
+    Parámetros:
+        user (Usuario): El objeto Usuario que inició sesión.
+    """
+    text = validate_string_input("Ingrese las palabras a buscar: ")
+    repo = get_repositorio()
+    results = []
+    for title, tabla in (("Álbumes encontrados:", "albums"), ("Playlists encontradas:", "playlists")):
+        ranked = repo.rank(tabla, text)
+        if ranked:
+            print(title)
+            for i, (score, result) in enumerate(ranked, start=len(results) + 1):
+                print(f"{i:2d}. {result.name}")
+            results += [result for score, result in ranked]
+
+    if results:
+        selection = validate_integer_input_min_max("Seleccione el resultado que desea ver: ", 1, len(results))
+        selected = results[selection - 1]
+        if isinstance(selected, Album):
+            show_album(selected, user)
+        else:
+            show_playlist(selected, user)
+    else:
+        print("No se encontraron álbumes ni playlists.")
+
 def show_album(album, user):
     """
     Muestra un álbum.
@@ -930,7 +926,7 @@ def show_song(song, user):
                 user.like_song(song)
         elif option == "2":
             webbrowser.open(song.link)
-            song.play()
+            song.play(user)
         elif option == "3":
             break
         else:
@@ -939,20 +935,36 @@ def show_song(song, user):
 def show_statistics():
 
     usuarios, albumes, canciones, playlists = load_all_data()
-    
-    musicians = pd.DataFrame([{'name': user.name, 'streams': user.get_total_played()} for user in usuarios if user.type == "musician"])
-    albums = pd.DataFrame([{'name': album.name, 'streams': album.get_total_streams()} for album in albumes])
-    songs = pd.DataFrame([{'name': song.name, 'streams': song.played} for song in canciones])
-
-    top_musicians = musicians.nlargest(5, 'streams')
+    repo = get_repositorio()
+
+    # Los tres rankings principales salen de las clasificaciones en vivo del
+    # repositorio, con los oyentes únicos aproximados de cada fila.
+    def leaderboard(tabla):
+        return leaderboard_frame(
+            (
+                (entity.name, streams, repo.unique_listeners(tabla, entity.id))
+                for entity, streams in repo.top_played(tabla, 5)
+            ),
+            ['name', 'streams', 'listeners'],
+        )
+
+    top_musicians = leaderboard("usuarios")
     print(top_musicians)
 
-    top_albums = albums.nlargest(5, 'streams')
+    top_albums = leaderboard("albums")
     print(top_albums)
 
-    top_songs = songs.nlargest(5, 'streams')
+    top_songs = leaderboard("canciones")
     print(top_songs)
 
+    # Solo los rankings que no salen de las clasificaciones en vivo.
+    statistics = compute_statistics(load_frames(usuarios, repo.track_rows(), repo.table("canciones"), repo.columnas), rankings=("top_genres", "top_liked_songs"))
+    print(statistics['top_genres'])
+    print(statistics['top_liked_songs'])
+
+    estadisticas_cache = cache.stats()
+    print(f"Cache de archivos: {estadisticas_cache['hits']} aciertos, {estadisticas_cache['misses']} lecturas de disco")
+
 
     fig, axs = plt.subplots(3, 1, figsize=(10, 15))
 
@@ -967,4 +979,55 @@ def show_statistics():
 
 
     plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    plt.show()
+
+def statistics_menu():
+    """
+    Muestra el menú de estadísticas.
+    """
+    while True:
+        print("Menú de estadísticas")
+        print("1. Reproducciones totales")
+        print("2. Más escuchadas y tendencias recientes")
+        print("3. Salir")
+        opc = validate_integer_input_min_max("Ingrese una opción: ", 1, 3)
+        if opc == 1:
+            show_statistics()
+        elif opc == 2:
+            show_recent_statistics()
+        else:
+            print("Saliendo del menú de estadísticas...")
+            break
+
+
+def show_recent_statistics():
+    """
+    Muestra las canciones más escuchadas en la última hora y en el último día, y
+    las que más crecieron en la última hora respecto de la anterior, desde el
+    historial de reproducciones recientes. Si el conteo aproximado está
+    activado, también las más escuchadas según él y su error.
+    """
+    repo = get_repositorio()
+    for titulo, segundos in (("la última hora", 3600), ("el último día", 86400)):
+        print(f"Más escuchadas en {titulo}:")
+        primeras = repo.top_recent(segundos, 5)
+        if not primeras:
+            print("  Sin reproducciones.")
+        for i, (song, streams) in enumerate(primeras, 1):
+            print(f"  {i}. {song.name} - {streams} reproducciones")
+
+    print("Tendencias de la última hora:")
+    tendencias = repo.trending(3600, 5)
+    if not tendencias:
+        print("  Sin tendencias.")
+    for i, (song, actuales, anteriores) in enumerate(tendencias, 1):
+        print(f"  {i}. {song.name} - {actuales} reproducciones (la hora anterior: {anteriores})")
+
+    estimadas = repo.top_estimated(5)
+    if estimadas:
+        print("Más escuchadas según el conteo aproximado:")
+        for i, (song, streams) in enumerate(estimadas, 1):
+            print(f"  {i}. {song.name} - ~{streams} reproducciones")
+        errores = repo.reconcile_estimates()
+        print(f"  Error medio: {errores['error_medio']:.1f}  Error máximo: {errores['error_maximo']}  "
+              f"Cota: {errores['cota']:.1f}  Aciertos en el top: {errores['aciertos_primeros']}")
@@ -0,0 +1,258 @@
+"""
+Historial de reproducciones por ventanas de tiempo.
+
+El contador 'played' de cada canción es el total de toda su vida, así que no
+alcanza para saber qué se escuchó en la última hora o en el último día. Este
+módulo guarda, además, las reproducciones en cubetas de un minuto y de una
+hora dentro de anillos de tamaño fijo: la memoria depende de la cantidad de
+cubetas y de las canciones escuchadas en cada una, no del tiempo que lleve
+funcionando el programa ni de la cantidad de reproducciones.
+
+El historial se guarda en 'db/historial.json'. Cada proceso guarda solo las
+reproducciones que todavía no guardó, sumándolas a las del archivo, así que
+varios procesos pueden compartirlo.
+"""
+import heapq
+import json
+import os
+import time
+
+from .archivos import BloqueoArchivo, write_json_atomic
+
+
+MINUTO = 60
+HORA = 3600
+
+
+class Anillo():
+    """
+    Buffer circular de cubetas de tiempo con la cantidad de reproducciones de
+    cada canción.
+
+    La cubeta de un instante es int(instante // segundos) y ocupa la posición
+    cubeta % tamano del anillo; al llegar una cubeta nueva a una posición, la
+    vieja se descarta.
+
+    Atributos
+    ----------
+    tamano : int
+        la cantidad de cubetas
+    segundos : int
+        los segundos que abarca cada cubeta
+    """
+    def __init__(self, tamano, segundos):
+        self.tamano = tamano
+        self.segundos = segundos
+        self._inicios = [None] * tamano
+        self._conteos = [None] * tamano
+
+    def add(self, id, delta, momento):
+        """
+        Suma delta reproducciones de una canción en la cubeta del momento dado.
+        """
+        cubeta = int(momento // self.segundos)
+        posicion = cubeta % self.tamano
+        inicio = self._inicios[posicion]
+        if inicio is not None and inicio > cubeta:
+            # Más vieja que lo que ya guarda el anillo.
+            return
+        if inicio != cubeta:
+            self._inicios[posicion] = cubeta
+            self._conteos[posicion] = {}
+        conteos = self._conteos[posicion]
+        conteos[id] = conteos.get(id, 0) + delta
+
+    def window(self, cantidad, momento):
+        """
+        Suma las reproducciones de las últimas cubetas.
+
+        Parámetros:
+            cantidad (int): La cantidad de cubetas, contando la del momento dado.
+            momento (float): El final de la ventana, en segundos desde la época.
+
+        Devuelve:
+            dict: id de la canción -> reproducciones en la ventana.
+        """
+        hasta = int(momento // self.segundos)
+        desde = hasta - min(cantidad, self.tamano) + 1
+        total = {}
+        for inicio, conteos in zip(self._inicios, self._conteos):
+            if inicio is None or not desde <= inicio <= hasta:
+                continue
+            for id, conteo in conteos.items():
+                total[id] = total.get(id, 0) + conteo
+        return total
+
+    def merge(self, otro):
+        """
+        Suma al anillo las cubetas de otro anillo con la misma configuración.
+        """
+        for inicio, conteos in zip(otro._inicios, otro._conteos):
+            if inicio is None:
+                continue
+            for id, conteo in conteos.items():
+                self.add(id, conteo, inicio * self.segundos)
+
+    def is_empty(self):
+        return all(inicio is None for inicio in self._inicios)
+
+    def to_dict(self):
+        return {
+            "segundos": self.segundos,
+            "cubetas": [
+                [inicio, list(conteos.items())]
+                for inicio, conteos in sorted(par for par in zip(self._inicios, self._conteos) if par[0] is not None)
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, datos, tamano):
+        anillo = cls(tamano, datos["segundos"])
+        for inicio, conteos in datos["cubetas"]:
+            for id, conteo in conteos:
+                anillo.add(id, conteo, inicio * anillo.segundos)
+        return anillo
+
+
+class HistorialReproducciones():
+    """
+    Reproducciones recientes por minuto (las últimas dos horas) y por hora (los
+    últimos días), con consultas de las más escuchadas en una ventana y de
+    tendencias.
+
+    El anillo de minutos guarda el doble de la ventana de tendencias más usada
+    (una hora), para que tanto esa hora como la anterior se deslicen minuto a
+    minuto en vez de cortarse en el comienzo de la hora del reloj.
+
+    No tiene lock propio: el repositorio llama a record() y a save() con su lock.
+
+    Atributos
+    ----------
+    path : str
+        la ruta del archivo del historial, o None para no guardarlo
+    minutos : Anillo
+        las cubetas de un minuto
+    horas : Anillo
+        las cubetas de una hora
+    """
+    def __init__(self, path=None, minutos=120, horas=48):
+        self.path = path
+        self.minutos = Anillo(minutos, MINUTO)
+        self.horas = Anillo(horas, HORA)
+        self._sin_guardar = (Anillo(minutos, MINUTO), Anillo(horas, HORA))
+        self._bloqueo = BloqueoArchivo(f"{os.path.dirname(path) or '.'}/.historial.lock") if path else None
+        if path:
+            self.minutos, self.horas = self._read()
+
+    def record(self, id, delta=1, momento=None):
+        """
+        Registra delta reproducciones de una canción.
+
+        Parámetros:
+            id: El id de la canción.
+            delta (int): La cantidad de reproducciones.
+            momento (float): El instante, en segundos desde la época (por defecto, ahora).
+        """
+        if momento is None:
+            momento = time.time()
+        for anillo in (self.minutos, self.horas) + self._sin_guardar:
+            anillo.add(id, delta, momento)
+
+    def _ring(self, segundos):
+        if segundos <= self.minutos.tamano * MINUTO:
+            return self.minutos
+        return self.horas
+
+    def window(self, segundos, momento=None):
+        """
+        Devuelve las reproducciones de cada canción en los últimos segundos dados.
+
+        La ventana se redondea a cubetas enteras: de un minuto si cabe en el
+        anillo de minutos y de una hora si no, hasta lo que guarde el anillo de
+        horas.
+
+        Devuelve:
+            dict: id de la canción -> reproducciones en la ventana.
+        """
+        if momento is None:
+            momento = time.time()
+        anillo = self._ring(segundos)
+        return anillo.window(max(1, round(segundos / anillo.segundos)), momento)
+
+    def top(self, segundos, n=10, momento=None):
+        """
+        Devuelve las canciones más escuchadas en los últimos segundos dados.
+
+        Devuelve:
+            list: Pares (id, reproducciones), de mayor a menor.
+        """
+        conteos = self.window(segundos, momento)
+        return heapq.nlargest(n, conteos.items(), key=lambda par: par[1])
+
+    def trending(self, segundos, n=10, momento=None):
+        """
+        Devuelve las canciones cuyas reproducciones más crecieron en los últimos
+        segundos dados respecto de los segundos anteriores.
+
+        Si las dos ventanas entran en el anillo de minutos, las dos se calculan
+        con cubetas de un minuto, así que coinciden con top() para la misma
+        ventana. Si no, se usan cubetas enteras de una hora (al menos una por
+        ventana), y la ventana actual empieza en el comienzo de una hora.
+
+        La tendencia es (actuales + 1) / (anteriores + 1), así que una canción
+        sin reproducciones previas no queda por encima de todas por una sola
+        reproducción; a igual tendencia, gana la que tiene más reproducciones.
+
+        Devuelve:
+            list: Tuplas (id, reproducciones actuales, reproducciones anteriores),
+            de mayor a menor tendencia. Solo incluye canciones que crecieron.
+        """
+        if momento is None:
+            momento = time.time()
+        if 2 * segundos <= self.minutos.tamano * MINUTO:
+            anillo = self.minutos
+            cubetas = max(1, round(segundos / MINUTO))
+        elif segundos >= HORA:
+            anillo = self.horas
+            cubetas = min(segundos // HORA, self.horas.tamano // 2)
+        else:
+            raise ValueError(f"La ventana de {segundos} s no entra dos veces en el anillo de minutos")
+        actuales = anillo.window(cubetas, momento)
+        anteriores = anillo.window(cubetas, momento - cubetas * anillo.segundos)
+        crecieron = (
+            (id, conteo, anteriores.get(id, 0))
+            for id, conteo in actuales.items()
+            if conteo > anteriores.get(id, 0)
+        )
+        return heapq.nlargest(n, crecieron, key=lambda fila: ((fila[1] + 1) / (fila[2] + 1), fila[1]))
+
+    def _read(self):
+        minutos = Anillo(self.minutos.tamano, MINUTO)
+        horas = Anillo(self.horas.tamano, HORA)
+        try:
+            with open(self.path, "r") as file:
+                datos = json.load(file)
+        except FileNotFoundError:
+            return minutos, horas
+        minutos.merge(Anillo.from_dict(datos["minutos"], minutos.tamano))
+        horas.merge(Anillo.from_dict(datos["horas"], horas.tamano))
+        return minutos, horas
+
+    def save(self):
+        """
+        Suma al archivo las reproducciones registradas desde el último guardado y
+        trae las que guardaron otros procesos.
+
+        Devuelve:
+            bool: True si había reproducciones para guardar, False si no.
+        """
+        if self.path is None or all(anillo.is_empty() for anillo in self._sin_guardar):
+            return False
+        with self._bloqueo:
+            minutos, horas = self._read()
+            sin_guardar, self._sin_guardar = self._sin_guardar, (Anillo(minutos.tamano, MINUTO), Anillo(horas.tamano, HORA))
+            minutos.merge(sin_guardar[0])
+            horas.merge(sin_guardar[1])
+            write_json_atomic(self.path, {"minutos": minutos.to_dict(), "horas": horas.to_dict()})
+            self.minutos, self.horas = minutos, horas
+        return True
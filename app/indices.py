@@ -0,0 +1,690 @@
+import bisect
+import heapq
+import math
+import re
+
+
+class IndiceHash():
+    """
+    Índice en memoria de un campo de una tabla: valor -> ids de los registros.
+
+    El repositorio lo construye al cargar la tabla y lo actualiza en cada
+    inserción, modificación y eliminación, así que una búsqueda por el campo
+    cuesta lo mismo sin importar el tamaño de la tabla.
+
+    Atributos
+    ----------
+    campo : str
+        el nombre del atributo indexado
+    """
+    def __init__(self, campo):
+        self.campo = campo
+        self._ids = {}
+        self._valores = {}
+
+    def build(self, entidades):
+        """
+        Reconstruye el índice a partir de todas las instancias de la tabla.
+
+        Parámetros:
+            entidades (iterable): Las instancias de la tabla.
+        """
+        self._ids.clear()
+        self._valores.clear()
+        for entidad in entidades:
+            self.add(entidad)
+
+    def add(self, entidad):
+        """
+        Agrega una instancia al índice, o la mueve si el valor de su campo cambió.
+        """
+        valor = getattr(entidad, self.campo)
+        if entidad.id in self._valores:
+            if self._valores[entidad.id] == valor:
+                return
+            self._discard(entidad.id)
+        self._valores[entidad.id] = valor
+        self._ids.setdefault(valor, {})[entidad.id] = None
+
+    def remove(self, entidad):
+        """
+        Quita una instancia del índice.
+        """
+        self._discard(entidad.id)
+
+    def _discard(self, id):
+        if id not in self._valores:
+            return
+        valor = self._valores.pop(id)
+        ids = self._ids[valor]
+        del ids[id]
+        if not ids:
+            del self._ids[valor]
+
+    def get(self, valor):
+        """
+        Devuelve los ids de los registros cuyo campo es igual al valor, en orden de inserción.
+        """
+        return list(self._ids.get(valor, ()))
+
+
+class IndiceLista():
+    """
+    Índice invertido de un campo de tipo lista: elemento -> ids de los registros
+    que lo contienen (por ejemplo, canción -> álbum a partir de 'tracklist').
+
+    Atributos
+    ----------
+    campo : str
+        el nombre del atributo de tipo lista indexado
+    """
+    def __init__(self, campo):
+        self.campo = campo
+        self._duenos = {}
+        self._elementos = {}
+
+    def build(self, entidades):
+        """
+        Reconstruye el índice a partir de todas las instancias de la tabla.
+
+        Parámetros:
+            entidades (iterable): Las instancias de la tabla.
+        """
+        self._duenos.clear()
+        self._elementos.clear()
+        for entidad in entidades:
+            elementos = set(getattr(entidad, self.campo))
+            self._elementos[entidad.id] = elementos
+            for elemento in elementos:
+                self._duenos.setdefault(elemento, {})[entidad.id] = None
+
+    def add(self, entidad):
+        """
+        Agrega una instancia al índice, o actualiza los elementos que cambiaron en su lista.
+        """
+        nuevos = set(getattr(entidad, self.campo))
+        anteriores = self._elementos.get(entidad.id, set())
+        for elemento in anteriores - nuevos:
+            self._discard(elemento, entidad.id)
+        for elemento in nuevos - anteriores:
+            self._duenos.setdefault(elemento, {})[entidad.id] = None
+        self._elementos[entidad.id] = nuevos
+
+    def remove(self, entidad):
+        """
+        Quita una instancia del índice.
+        """
+        for elemento in self._elementos.pop(entidad.id, ()):
+            self._discard(elemento, entidad.id)
+
+    def link(self, elemento, id):
+        """
+        Registra que la lista del registro id ahora contiene el elemento.
+        """
+        self._duenos.setdefault(elemento, {})[id] = None
+        self._elementos.setdefault(id, set()).add(elemento)
+
+    def unlink(self, elemento, id):
+        """
+        Registra que la lista del registro id ya no contiene el elemento.
+        """
+        elementos = self._elementos.get(id)
+        if elementos is None or elemento not in elementos:
+            return
+        elementos.discard(elemento)
+        self._discard(elemento, id)
+
+    def _discard(self, elemento, id):
+        duenos = self._duenos[elemento]
+        del duenos[id]
+        if not duenos:
+            del self._duenos[elemento]
+
+    def get(self, elemento):
+        """
+        Devuelve los ids de los registros cuya lista contiene el elemento.
+        """
+        return list(self._duenos.get(elemento, ()))
+
+    def count(self, elemento):
+        """
+        Devuelve cuántos registros contienen el elemento en su lista.
+        """
+        return len(self._duenos.get(elemento, ()))
+
+    def contains(self, elemento, id):
+        """
+        Devuelve True si la lista del registro id contiene el elemento.
+        """
+        return id in self._duenos.get(elemento, ())
+
+
+class IndiceTrie():
+    """
+    Árbol de prefijos (trie) de un campo de texto: permite saber si un valor
+    existe y listar los valores que empiezan con un prefijo recorriendo solo los
+    caracteres del prefijo (por ejemplo, para autocompletar nombres de usuario).
+
+    Cada nodo es un diccionario carácter -> nodo hijo; la clave '' de un nodo
+    guarda los ids de los registros cuyo valor termina en él.
+
+    Atributos
+    ----------
+    campo : str
+        el nombre del atributo indexado
+    """
+    def __init__(self, campo):
+        self.campo = campo
+        self._raiz = {}
+        self._valores = {}
+
+    def build(self, entidades):
+        """
+        Reconstruye el índice a partir de todas las instancias de la tabla.
+
+        Parámetros:
+            entidades (iterable): Las instancias de la tabla.
+        """
+        self._raiz = {}
+        self._valores.clear()
+        for entidad in entidades:
+            self.add(entidad)
+
+    def add(self, entidad):
+        """
+        Agrega una instancia al índice, o la mueve si el valor de su campo cambió.
+        """
+        valor = getattr(entidad, self.campo)
+        if entidad.id in self._valores:
+            if self._valores[entidad.id] == valor:
+                return
+            self._discard(entidad.id)
+        self._valores[entidad.id] = valor
+        nodo = self._raiz
+        for caracter in valor:
+            nodo = nodo.setdefault(caracter, {})
+        nodo.setdefault("", {})[entidad.id] = None
+
+    def remove(self, entidad):
+        """
+        Quita una instancia del índice.
+        """
+        self._discard(entidad.id)
+
+    def _discard(self, id):
+        if id not in self._valores:
+            return
+        valor = self._valores.pop(id)
+        camino = [self._raiz]
+        for caracter in valor:
+            camino.append(camino[-1][caracter])
+        ids = camino[-1][""]
+        del ids[id]
+        if not ids:
+            del camino[-1][""]
+        # Se podan los nodos que quedaron vacíos, desde la hoja hacia la raíz.
+        for caracter, padre, nodo in zip(reversed(valor), reversed(camino[:-1]), reversed(camino[1:])):
+            if nodo:
+                break
+            del padre[caracter]
+
+    def _node(self, prefijo):
+        nodo = self._raiz
+        for caracter in prefijo:
+            nodo = nodo.get(caracter)
+            if nodo is None:
+                return None
+        return nodo
+
+    def contains(self, valor):
+        """
+        Devuelve True si algún registro tiene exactamente ese valor.
+        """
+        nodo = self._node(valor)
+        return nodo is not None and "" in nodo
+
+    def get(self, valor):
+        """
+        Devuelve los ids de los registros cuyo campo es igual al valor.
+        """
+        nodo = self._node(valor)
+        return list(nodo.get("", ())) if nodo is not None else []
+
+    def prefix(self, prefijo, limite=None):
+        """
+        Devuelve los ids de los registros cuyo campo empieza con el prefijo, en
+        orden alfabético del valor, hasta 'limite' ids.
+        """
+        nodo = self._node(prefijo)
+        ids = []
+        pila = [nodo] if nodo is not None else []
+        while pila and (limite is None or len(ids) < limite):
+            nodo = pila.pop()
+            ids.extend(nodo.get("", ()))
+            pila.extend(nodo[caracter] for caracter in sorted((c for c in nodo if c), reverse=True))
+        return ids[:limite]
+
+
+class IndiceTrigramas():
+    """
+    Índice invertido de trigramas de un campo de texto, para buscar los registros
+    cuyo campo contiene un texto sin distinguir mayúsculas (con la misma semántica
+    que 'texto.lower() in valor.lower()').
+
+    Cada valor se guarda ya convertido a minúsculas. Una búsqueda interseca los
+    registros de los trigramas del texto, empezando por el más raro, y solo
+    compara el texto completo contra esos candidatos.
+
+    El índice vive en memoria y no se guarda en disco: el repositorio lo
+    construye en la primera búsqueda de cada proceso y lo mantiene con cada
+    alta, cambio o baja.
+
+    Atributos
+    ----------
+    campo : str
+        el nombre del atributo de texto indexado
+    """
+    def __init__(self, campo):
+        self.campo = campo
+        self._claves = {}
+        self._posiciones = {}
+        self._trigramas = {}
+        self._siguiente = 0
+
+    def build(self, entidades):
+        """
+        Reconstruye el índice a partir de todas las instancias de la tabla.
+
+        Parámetros:
+            entidades (iterable): Las instancias de la tabla.
+        """
+        self._claves.clear()
+        self._posiciones.clear()
+        self._trigramas.clear()
+        self._siguiente = 0
+        for entidad in entidades:
+            self.add(entidad)
+
+    def add(self, entidad):
+        """
+        Agrega una instancia al índice, o actualiza sus trigramas si el texto cambió.
+        """
+        clave = getattr(entidad, self.campo).lower()
+        anterior = self._claves.get(entidad.id)
+        if anterior == clave:
+            return
+        if anterior is None:
+            self._posiciones[entidad.id] = self._siguiente
+            self._siguiente += 1
+        else:
+            self._discard(entidad.id, anterior)
+        self._claves[entidad.id] = clave
+        for trigrama in _trigrams(clave):
+            self._trigramas.setdefault(trigrama, set()).add(entidad.id)
+
+    def remove(self, entidad):
+        """
+        Quita una instancia del índice.
+        """
+        clave = self._claves.pop(entidad.id, None)
+        if clave is not None:
+            self._discard(entidad.id, clave)
+            del self._posiciones[entidad.id]
+
+    def _discard(self, id, clave):
+        for trigrama in _trigrams(clave):
+            ids = self._trigramas[trigrama]
+            ids.discard(id)
+            if not ids:
+                del self._trigramas[trigrama]
+
+    def search(self, texto):
+        """
+        Devuelve los ids de los registros cuyo campo contiene el texto, sin
+        distinguir mayúsculas, en orden de inserción.
+        """
+        consulta = texto.lower()
+        trigramas = _trigrams(consulta)
+        if not trigramas:
+            # Con menos de tres caracteres no hay trigramas: se recorren las claves.
+            return [id for id, clave in self._claves.items() if consulta in clave]
+
+        conjuntos = sorted((self._trigramas.get(trigrama, set()) for trigrama in trigramas), key=len)
+        candidatos = conjuntos[0].intersection(*conjuntos[1:])
+        ids = [id for id in candidatos if consulta in self._claves[id]]
+        ids.sort(key=self._posiciones.__getitem__)
+        return ids
+
+
+def _trigrams(texto):
+    return {texto[inicio:inicio + 3] for inicio in range(len(texto) - 2)}
+
+
+class IndiceBM25():
+    """
+    Índice invertido de las palabras de uno o más campos de texto (por ejemplo,
+    nombre y descripción), para buscar con ranking BM25.
+
+    Una búsqueda solo recorre las listas de los términos de la consulta, con la
+    estrategia MaxScore: los términos se procesan del de mayor a menor puntaje
+    máximo posible, y cuando la suma de los puntajes máximos de los términos que
+    faltan ya no alcanza al k-ésimo mejor resultado, esos términos solo suman
+    puntaje a los candidatos que ya se tienen, sin agregar documentos nuevos.
+
+    Atributos
+    ----------
+    campos : list
+        los nombres de los atributos de texto indexados
+    k1 : float
+        la saturación de la frecuencia de un término
+    b : float
+        el peso de la normalización por largo del documento
+    """
+    def __init__(self, campos, k1=1.2, b=0.75):
+        self.campos = campos
+        self.k1 = k1
+        self.b = b
+        self._terminos = {}
+        self._largos = {}
+        self._largo_total = 0
+
+    def build(self, entidades):
+        """
+        Reconstruye el índice a partir de todas las instancias de la tabla.
+
+        Parámetros:
+            entidades (iterable): Las instancias de la tabla.
+        """
+        self._terminos.clear()
+        self._largos.clear()
+        self._largo_total = 0
+        for entidad in entidades:
+            self.add(entidad)
+
+    def add(self, entidad):
+        """
+        Agrega una instancia al índice, o la vuelve a indexar si ya estaba.
+        """
+        self.remove(entidad)
+        palabras = _words(" ".join(getattr(entidad, campo) for campo in self.campos))
+        frecuencias = {}
+        for palabra in palabras:
+            frecuencias[palabra] = frecuencias.get(palabra, 0) + 1
+        for palabra, frecuencia in frecuencias.items():
+            self._terminos.setdefault(palabra, {})[entidad.id] = frecuencia
+        self._largos[entidad.id] = (len(palabras), list(frecuencias))
+        self._largo_total += len(palabras)
+
+    def remove(self, entidad):
+        """
+        Quita una instancia del índice.
+        """
+        if entidad.id not in self._largos:
+            return
+        largo, palabras = self._largos.pop(entidad.id)
+        self._largo_total -= largo
+        for palabra in palabras:
+            documentos = self._terminos[palabra]
+            del documentos[entidad.id]
+            if not documentos:
+                del self._terminos[palabra]
+
+    def top(self, texto, k=10):
+        """
+        Devuelve los k registros con mayor puntaje BM25 para el texto.
+
+        Devuelve:
+            list: Tuplas (puntaje, id), de mayor a menor puntaje.
+        """
+        cantidad = len(self._largos)
+        if not cantidad or k <= 0:
+            return []
+        promedio = self._largo_total / cantidad or 1
+
+        terminos = []
+        for palabra in set(_words(texto)):
+            documentos = self._terminos.get(palabra)
+            if documentos:
+                idf = math.log(1 + (cantidad - len(documentos) + 0.5) / (len(documentos) + 0.5))
+                # tf / (tf + K) < 1, así que idf * (k1 + 1) acota el puntaje del término.
+                terminos.append((idf * (self.k1 + 1), idf, documentos))
+        terminos.sort(key=lambda termino: termino[0], reverse=True)
+
+        restantes = [0.0] * (len(terminos) + 1)
+        for posicion in range(len(terminos) - 1, -1, -1):
+            restantes[posicion] = restantes[posicion + 1] + terminos[posicion][0]
+
+        puntajes = {}
+        umbral = 0.0
+        for posicion, (_, idf, documentos) in enumerate(terminos):
+            esencial = len(puntajes) < k or restantes[posicion] > umbral
+            if esencial:
+                ids = documentos
+            elif len(puntajes) < len(documentos):
+                ids = [id for id in puntajes if id in documentos]
+            else:
+                ids = [id for id in documentos if id in puntajes]
+            for id in ids:
+                frecuencia = documentos[id]
+                normalizacion = self.k1 * (1 - self.b + self.b * self._largos[id][0] / promedio)
+                puntajes[id] = puntajes.get(id, 0.0) + idf * frecuencia * (self.k1 + 1) / (frecuencia + normalizacion)
+            if esencial and len(puntajes) >= k:
+                umbral = heapq.nlargest(k, puntajes.values())[-1]
+
+        return heapq.nlargest(k, ((puntaje, id) for id, puntaje in puntajes.items()), key=lambda par: par[0])
+
+
+class IndiceDifuso():
+    """
+    Índice para buscar por las palabras de un campo de texto tolerando errores
+    de tipeo (hasta 'distancia' ediciones por palabra), al estilo de SymSpell.
+
+    Para cada palabra del vocabulario se guardan las variantes que resultan de
+    borrarle hasta 'distancia' caracteres a su prefijo; una consulta genera las
+    variantes de sus propias palabras y solo calcula la distancia de edición
+    contra las palabras que comparten alguna variante, en vez de contra todo el
+    vocabulario. El vocabulario se mantiene además ordenado, para encontrar con
+    una búsqueda binaria las palabras que empiezan con una palabra de la
+    consulta.
+
+    Atributos
+    ----------
+    campo : str
+        el nombre del atributo de texto indexado
+    distancia : int
+        la cantidad máxima de ediciones por palabra
+    prefijo : int
+        la cantidad de caracteres de cada palabra con los que se generan las variantes
+    """
+    def __init__(self, campo, distancia=2, prefijo=7):
+        self.campo = campo
+        self.distancia = distancia
+        self.prefijo = prefijo
+        self._palabras = {}
+        self._ordenadas = []
+        self._variantes = {}
+        self._documentos = {}
+        self._posiciones = {}
+        self._siguiente = 0
+
+    def build(self, entidades):
+        """
+        Reconstruye el índice a partir de todas las instancias de la tabla.
+
+        Parámetros:
+            entidades (iterable): Las instancias de la tabla.
+        """
+        self._palabras.clear()
+        self._variantes.clear()
+        self._documentos.clear()
+        self._posiciones.clear()
+        self._siguiente = 0
+        for entidad in entidades:
+            self._add(entidad)
+        self._ordenadas = sorted(self._palabras)
+
+    def add(self, entidad):
+        """
+        Agrega una instancia al índice, o actualiza sus palabras si el texto cambió.
+        """
+        for palabra in self._add(entidad):
+            bisect.insort(self._ordenadas, palabra)
+
+    def _add(self, entidad):
+        # Devuelve las palabras que no estaban en el vocabulario.
+        texto = getattr(entidad, self.campo).lower()
+        anterior = self._documentos.get(entidad.id)
+        if anterior is not None and anterior[0] == texto:
+            return []
+        if anterior is None:
+            self._posiciones[entidad.id] = self._siguiente
+            self._siguiente += 1
+        else:
+            self._discard(entidad.id)
+        palabras = set(_words(texto))
+        self._documentos[entidad.id] = (texto, palabras)
+        nuevas = []
+        for palabra in palabras:
+            ids = self._palabras.get(palabra)
+            if ids is None:
+                ids = self._palabras[palabra] = set()
+                nuevas.append(palabra)
+                for variante in _deletes(palabra[:self.prefijo], self.distancia):
+                    self._variantes.setdefault(variante, set()).add(palabra)
+            ids.add(entidad.id)
+        return nuevas
+
+    def remove(self, entidad):
+        """
+        Quita una instancia del índice.
+        """
+        if entidad.id in self._documentos:
+            self._discard(entidad.id)
+            del self._posiciones[entidad.id]
+
+    def _discard(self, id):
+        _, palabras = self._documentos.pop(id)
+        for palabra in palabras:
+            ids = self._palabras[palabra]
+            ids.discard(id)
+            if ids:
+                continue
+            del self._palabras[palabra]
+            del self._ordenadas[bisect.bisect_left(self._ordenadas, palabra)]
+            for variante in _deletes(palabra[:self.prefijo], self.distancia):
+                palabras_variante = self._variantes[variante]
+                palabras_variante.discard(palabra)
+                if not palabras_variante:
+                    del self._variantes[variante]
+
+    def similar_words(self, palabra):
+        """
+        Devuelve las palabras del vocabulario a lo sumo a 'distancia' ediciones de
+        la palabra dada.
+
+        Devuelve:
+            dict: Un diccionario palabra -> distancia.
+        """
+        candidatas = set()
+        for variante in _deletes(palabra[:self.prefijo], self.distancia):
+            candidatas.update(self._variantes.get(variante, ()))
+        similares = {}
+        for candidata in candidatas:
+            distancia = _edit_distance(palabra, candidata, self.distancia)
+            if distancia <= self.distancia:
+                similares[candidata] = distancia
+        return similares
+
+    def _prefixed(self, palabra):
+        # Los registros con alguna palabra que empieza con la dada.
+        ids = set()
+        for posicion in range(bisect.bisect_left(self._ordenadas, palabra), len(self._ordenadas)):
+            otra = self._ordenadas[posicion]
+            if not otra.startswith(palabra):
+                break
+            ids.update(self._palabras[otra])
+        return ids
+
+    def search(self, texto, limite=None):
+        """
+        Devuelve los ids de los registros cuyo texto contiene, para cada palabra de
+        la consulta, una palabra a lo sumo a 'distancia' ediciones. Primero van los
+        que contienen la consulta tal cual, después los que tienen alguna palabra
+        que empieza con una palabra de la consulta, y luego por la suma de las
+        distancias y el orden de inserción.
+
+        Parámetros:
+            texto (str): La consulta.
+            limite (int): La cantidad máxima de ids a devolver (por defecto, todos).
+        """
+        consulta = texto.lower()
+        palabras = _words(consulta)
+        if not palabras:
+            return []
+
+        por_palabra = []
+        for palabra in palabras:
+            # Los registros de cada palabra similar, de la más cercana a la más
+            # lejana: cada registro se queda con la menor distancia.
+            grupos = {}
+            for similar, distancia in self.similar_words(palabra).items():
+                grupos.setdefault(distancia, []).append(self._palabras[similar])
+            mejores = {}
+            for distancia in sorted(grupos):
+                mejores.update(dict.fromkeys(set().union(*grupos[distancia]).difference(mejores), distancia))
+            if not mejores:
+                return []
+            por_palabra.append(mejores)
+
+        # Se interseca empezando por la palabra con menos registros.
+        por_palabra.sort(key=len)
+        distancias = por_palabra[0]
+        for mejores in por_palabra[1:]:
+            distancias = {id: total + mejores[id] for id, total in distancias.items() if id in mejores}
+            if not distancias:
+                return []
+
+        prefijos = set().union(*(self._prefixed(palabra) for palabra in palabras))
+        documentos = self._documentos
+        posiciones = self._posiciones
+        filas = (
+            (consulta not in documentos[id][0], id not in prefijos, distancia, posiciones[id], id)
+            for id, distancia in distancias.items()
+        )
+        filas = sorted(filas) if limite is None else heapq.nsmallest(limite, filas)
+        return [fila[-1] for fila in filas]
+
+
+def _deletes(palabra, distancia):
+    variantes = {palabra}
+    borde = {palabra}
+    for _ in range(distancia):
+        borde = {variante[:posicion] + variante[posicion + 1:] for variante in borde for posicion in range(len(variante))}
+        variantes |= borde
+    return variantes
+
+
+def _edit_distance(a, b, maximo):
+    """
+    Distancia de edición con transposiciones (optimal string alignment). Si supera
+    'maximo' devuelve maximo + 1 sin terminar el cálculo.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior2 = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], anterior2[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, actual
+    return anterior[len(b)]
+
+
+def _words(texto):
+    return re.findall(r"\w+", texto.lower())
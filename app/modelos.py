@@ -1,4 +1,24 @@
-import json
+
+from . import repositorio
+from .columnas import ColumnasCanciones
+
+
+def _memoize(entidad, nombre, tablas, resolver):
+    """
+    Devuelve la relación 'nombre' de una instancia, memoizada en su atributo
+    '_relaciones'. Se vuelve a resolver con resolver() solo si alguna de las
+    tablas de las que depende cambió desde la última vez (ver Repositorio.version).
+    La lista devuelta es compartida y no se debe modificar.
+    """
+    version = repositorio.get_repositorio().version(*tablas)
+    relaciones = getattr(entidad, "_relaciones", None)
+    if relaciones is None:
+        relaciones = entidad._relaciones = {}
+    entrada = relaciones.get(nombre)
+    if entrada is None or entrada[0] != version:
+        entrada = relaciones[nombre] = (version, resolver())
+    return entrada[1]
+
 
 class Usuario():
     """
@@ -74,16 +94,18 @@ class Usuario():
     get_total_played():
         Devuelve el número total de veces que se han reproducido las canciones del artista.
     """
+    __slots__ = ("id", "name", "email", "username", "type", "liked_albums", "songs_liked", "playlists", "artists_liked", "_relaciones")
+
     def __init__(self, id, name, email, username, type, liked_albums = [], songs_liked = [], playlists = [], artists_liked = []):
         self.id = id
         self.name = name
         self.email = email
         self.username = username
         self.type = type
-        self.liked_albums = liked_albums
-        self.songs_liked = songs_liked
-        self.playlists = playlists
-        self.artists_liked = artists_liked
+        self.liked_albums = list(liked_albums)
+        self.songs_liked = list(songs_liked)
+        self.playlists = list(playlists)
+        self.artists_liked = list(artists_liked)
         
     def to_dict(self):
         return {
@@ -102,209 +124,107 @@ class Usuario():
         return f"{self.name}/{self.username} es un {self.type}" 
     
     def like_album(self, album_id):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                if album_id not in user['liked_albums']:
-                    user['liked_albums'].append(album_id.id)
-                break
-                
-            
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)
-            
+        repositorio.get_repositorio().append_to("usuarios", "liked_albums", self, album_id.id)
             
     def like_song(self, song):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                if song.id not in user['songs_liked']:
-                    user['songs_liked'].append(song.id)
-                    song.like()                    
-                break
-        
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)
+        if repositorio.get_repositorio().append_to("usuarios", "songs_liked", self, song.id):
+            song.like()
             
     def like_artist(self, artist_id):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                if artist_id not in user['artists_liked']:
-                    user['artists_liked'].append(artist_id.id)
-                break
-            
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)
+        repositorio.get_repositorio().append_to("usuarios", "artists_liked", self, artist_id.id)
 
     def dislike_album(self, album_id):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                if album_id in user['liked_albums']:
-                    user['liked_albums'].remove(album_id.id)
-                break
-            
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)
+        repositorio.get_repositorio().remove_from("usuarios", "liked_albums", self, album_id.id)
             
     def dislike_song(self, song):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                if song.id in user['songs_liked']:
-                    user['songs_liked'].remove(song.id)
-                    song.dislike()                    
-                break
-        
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)
+        if repositorio.get_repositorio().remove_from("usuarios", "songs_liked", self, song.id):
+            song.dislike()
             
     def dislike_artist(self, artist_id):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                if artist_id in user['artists_liked']:
-                    user['artists_liked'].remove(artist_id.id)
-                break
-            
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)              
+        repositorio.get_repositorio().remove_from("usuarios", "artists_liked", self, artist_id.id)
     
     def show_albums(self):
         print("     ***Álbumes del Artista:***")
-        albums = self.get_albums()
+        albums = self.albums
         for album in albums:
             print(album)
             
     def show_songs(self):
         print("     ***Canciones del Artista:***")
-        songs = self.get_songs()
+        songs = self.songs
         for song in songs:
             print(song)
         
     
     
-    def get_albums(self):
-        with open("db/albums.json", "r") as file:
-            all_albums = json.load(file)
+    @property
+    def albums(self):
+        """
+        Los álbumes del artista, memoizados hasta que cambie la tabla de álbumes.
+        """
+        return _memoize(self, "albums", ("albums",), lambda: repositorio.get_repositorio().find("albums", "artist", self.id))
+
+    @property
+    def songs(self):
+        """
+        Las canciones de todos los álbumes del artista, resueltas en un solo lote.
+        """
+        def resolver():
+            ids = [song_id for album in self.albums for song_id in album.tracklist]
+            return repositorio.get_repositorio().get_many("canciones", ids)
+        return _memoize(self, "songs", ("albums", "canciones"), resolver)
 
-        user_albums = [Album(**album) for album in all_albums if album['artist'] == self.id]
+    def get_albums(self):
+        user_albums = list(self.albums)
         return user_albums
         
     def get_songs(self):
-        albums = self.get_albums()
-        songs = []
-        for album in albums:
-            songs += album.get_songs()
+        songs = list(self.songs)
         return songs
     
     def edit_name(self, new_name):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                user['name'] = new_name
-                break
-            
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)
+        self.name = new_name
+        repositorio.get_repositorio().mark_dirty("usuarios", self)
             
     def edit_email(self, new_email):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                user['email'] = new_email
-                break
-            
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)
+        self.email = new_email
+        repositorio.get_repositorio().mark_dirty("usuarios", self)
             
     def edit_username(self, new_username):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-            
-        for user in all_users:
-            if user['id'] == self.id:
-                user['username'] = new_username
-                break
-            
-        with open("db/usuarios.json", "w") as file:
-            json.dump(all_users, file, indent=4)
+        self.username = new_username
+        repositorio.get_repositorio().mark_dirty("usuarios", self)
             
     def get_liked_albums(self):
-        with open("db/albums.json", "r") as file:
-            all_albums = json.load(file)
-        
-        liked_albums = [Album(**album) for album in all_albums if album['id'] in self.liked_albums]
-        return liked_albums
+        return list(_memoize(self, "liked_albums", ("usuarios", "albums"), lambda: repositorio.get_repositorio().get_many("albums", self.liked_albums)))
     
     def get_liked_songs(self):
-        with open("db/canciones.json", "r") as file:
-            all_songs = json.load(file)
-        
-        liked_songs = [Cancion(**song) for song in all_songs if song['id'] in self.songs_liked]
-        return liked_songs
+        return list(_memoize(self, "songs_liked", ("usuarios", "canciones"), lambda: repositorio.get_repositorio().get_many("canciones", self.songs_liked)))
     
     def get_liked_artists(self):
-        with open("db/usuarios.json", "r") as file:
-            all_artists = json.load(file)
-        
-        liked_artists = [Usuario(**artist) for artist in all_artists if artist['id'] in self.artists_liked]
-        return liked_artists
+        return list(_memoize(self, "artists_liked", ("usuarios",), lambda: repositorio.get_repositorio().get_many("usuarios", self.artists_liked)))
     
     def get_playlists(self):
-        with open("db/playlists.json", "r") as file:
-            all_playlists = json.load(file)
-        
-        user_playlists = [Playlist(**playlist) for playlist in all_playlists if playlist['creator'] == self.id]
+        user_playlists = list(_memoize(self, "playlists", ("playlists",), lambda: repositorio.get_repositorio().find("playlists", "creator", self.id)))
         return user_playlists
     
     def get_amount_likes(self):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-        
-        likes = sum([1 for user in all_users if self.id in user['artists_liked']])
-        return likes
+        return repositorio.get_repositorio().count_containing("usuarios", "artists_liked", self.id)
     
     def verify_if_liked(self, user_id):
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-        
-        for user in all_users:
-            if user['id'] == user_id.id:
-                if self.id in user['artists_liked']:
-                    return True
-                else:
-                    return False         
-        
+        return repositorio.get_repositorio().contains("usuarios", "artists_liked", user_id, self.id)
         
     def get_top_songs(self):
-        songs = self.get_songs()
-        top_songs = sorted(songs, key=lambda x: x.played, reverse=True)
-        return top_songs[:10]
+        # Desde la clasificación en vivo del artista, sin recorrer sus canciones.
+        top_songs = [song for song, _ in repositorio.get_repositorio().top_artist_songs(self.id, 10)]
+        return top_songs
     
     def get_total_played(self):
-        songs = self.get_songs()
-        total_played = sum([song.played for song in songs])
+        total_played = repositorio.get_repositorio().total_played("usuarios", self.id)
         return total_played
 
 class Album():
+    __slots__ = ("id", "name", "description", "cover", "published", "genre", "artist", "tracklist", "_relaciones")
+
     def __init__(self, id, name, description, cover, published, genre, artist, tracklist=[]):
         """
         Crea una instancia de la clase Album.
@@ -326,7 +246,33 @@ class Album():
         self.published = published
         self.genre = genre
         self.artist = artist
-        self.tracklist = tracklist
+        self.tracklist = list(tracklist)
+
+    def to_dict(self):
+        """
+        Devuelve una representación de diccionario del álbum.
+
+        Returns:
+            dict: El álbum con el mismo formato de 'db/albums.json'.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "cover": self.cover,
+            "published": self.published,
+            "genre": self.genre,
+            "artist": self.artist,
+            "tracklist": self.tracklist
+        }
+
+    @property
+    def songs(self):
+        """
+        Las canciones del álbum, resueltas en un solo lote y memoizadas hasta que
+        cambien los álbumes o las canciones. La lista no se debe modificar.
+        """
+        return _memoize(self, "songs", ("albums", "canciones"), lambda: repositorio.get_repositorio().get_many("canciones", self.tracklist))
 
     def get_songs(self):
         """
@@ -335,11 +281,7 @@ class Album():
         Returns:
             list: La lista de objetos Cancion que pertenecen al álbum.
         """
-        with open("db/canciones.json", "r") as file:
-            all_songs = json.load(file)
-
-        album_songs = [Cancion(**song) for song in all_songs if song['id'] in self.tracklist]
-        return album_songs
+        return list(self.songs)
     
     def get_total_streams(self):
         """
@@ -348,9 +290,7 @@ class Album():
         Returns:
             int: El número total de reproducciones del álbum.
         """
-        songs = self.get_songs()
-        total_streams = sum([song.played for song in songs])
-        return total_streams
+        return repositorio.get_repositorio().total_played("albums", self.id)
     
     def get_artist(self):
         """
@@ -359,11 +299,7 @@ class Album():
         Returns:
             Usuario: El objeto Usuario que es el artista del álbum.
         """
-        with open("db/usuarios.json", "r") as file:
-            all_artists = json.load(file)
-        
-        artist = [Usuario(**user) for user in all_artists if user['id'] == self.artist]
-        return artist[0]
+        return repositorio.get_repositorio().get("usuarios", self.artist)
     
     def get_amount_likes(self):
         """
@@ -372,11 +308,7 @@ class Album():
         Returns:
             int: El número de likes del álbum.
         """
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-        
-        likes = sum([1 for user in all_users if self.id in user['liked_albums']])
-        return likes
+        return repositorio.get_repositorio().count_containing("usuarios", "liked_albums", self.id)
     
     def verify_if_liked(self, user_id):
         """
@@ -388,15 +320,7 @@ class Album():
         Returns:
             bool: True si el usuario ha dado like al álbum, False en caso contrario.
         """
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
-        
-        for user in all_users:
-            if user['id'] == user_id.id:
-                if self.id in user['liked_albums']:
-                    return True
-                else:
-                    return False
+        return repositorio.get_repositorio().contains("usuarios", "liked_albums", user_id, self.id)
     
     def __str__(self):
         """
@@ -406,7 +330,7 @@ class Album():
             str: La representación en forma de cadena del álbum.
         """
         string = f"Album: {self.name} - {self.published}"
-        for count, song in enumerate(self.get_songs()):
+        for count, song in enumerate(self.songs):
             string += f"\t\n{count+1}. {song}"
         return string
         
@@ -417,10 +341,16 @@ class Album():
 
         
 class Cancion():
-    def __init__(self, id, name, duration, link, played = 0, liked = 0):
+    __slots__ = ("id", "name", "duration", "link", "_columnas", "_fila")
+
+    def __init__(self, id, name, duration, link, played = 0, liked = 0, columnas = None):
         """
         Constructor de la clase Cancion.
 
+        Los contadores 'played' y 'liked' no se guardan en la instancia sino en la
+        fila de la canción en un ColumnasCanciones: el del repositorio para las
+        canciones de la tabla, o uno propio para una canción suelta.
+
         Args:
             id (int): El ID de la canción.
             name (str): El nombre de la canción.
@@ -428,13 +358,54 @@ class Cancion():
             link (str): El enlace de la canción.
             played (int, optional): El número de veces que se ha reproducido la canción. Por defecto es 0.
             liked (int, optional): El número de veces que se ha marcado la canción como "me gusta". Por defecto es 0.
+            columnas (ColumnasCanciones, optional): El almacén de los contadores. Por defecto, uno nuevo.
         """
         self.id = id
         self.name = name
         self.duration = duration
         self.link = link
-        self.played = played
-        self.liked = liked     
+        if columnas is None:
+            columnas = ColumnasCanciones()
+        self._columnas = columnas
+        self._fila = columnas.add(id, played, liked)
+
+    @property
+    def played(self):
+        """
+        El número de veces que se ha reproducido la canción.
+        """
+        return self._columnas.played[self._fila]
+
+    @played.setter
+    def played(self, played):
+        self._columnas.played[self._fila] = played
+
+    @property
+    def liked(self):
+        """
+        El número de veces que se ha marcado la canción como "me gusta".
+        """
+        return self._columnas.liked[self._fila]
+
+    @liked.setter
+    def liked(self, liked):
+        self._columnas.liked[self._fila] = liked
+
+    def to_dict(self):
+        """
+        Devuelve una representación de diccionario de la canción.
+
+        Returns:
+            dict: La canción con el mismo formato de los archivos de 'db/canciones/'.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "duration": self.duration,
+            "link": self.link,
+            "played": self.played,
+            "liked": self.liked
+        }
         
     def __str__(self):
         """
@@ -450,26 +421,22 @@ class Cancion():
         Obtiene el artista de la canción.
 
         Returns:
-            Usuario: El objeto Usuario que representa al artista de la canción.
+            Usuario: El objeto Usuario que representa al artista de la canción, o None
+            si la canción no pertenece a ningún álbum.
         """
-        with open("db/albums.json", "r") as file:
-            all_albums = json.load(file)
-        
-        artist = [Usuario(**album) for album in all_albums if album['id'] == self.album]
-        return artist[0]
+        album = self.get_album()
+        return album.get_artist() if album else None
     
     def get_album(self):
         """
         Obtiene el álbum al que pertenece la canción.
 
         Returns:
-            Album: El objeto Album al que pertenece la canción.
+            Album: El objeto Album al que pertenece la canción, o None si no está en
+            ningún tracklist.
         """
-        with open("db/albums.json", "r") as file:
-            all_albums = json.load(file)
-        
-        album = [Album(**album) for album in all_albums if album['id'] == self.album]
-        return album[0]
+        albums = repositorio.get_repositorio().find_containing("albums", "tracklist", self.id)
+        return albums[0] if albums else None
     
     def verify_if_liked(self, user_id):
         """
@@ -481,61 +448,32 @@ class Cancion():
         Returns:
             bool: True si la canción ha sido marcada como "me gusta" por el usuario, False en caso contrario.
         """
-        with open("db/usuarios.json", "r") as file:
-            all_users = json.load(file)
+        return repositorio.get_repositorio().contains("usuarios", "songs_liked", user_id, self.id)
         
-        for user in all_users:
-            if user['id'] == user_id.id:
-                if self.id in user['songs_liked']:
-                    return True
-                else:
-                    return False
-        
-    def play(self):
+    def play(self, user=None):
         """
         Incrementa el contador de reproducciones de la canción en 1.
-        """
-        with open("db/canciones.json", "r") as file:
-            all_songs = json.load(file)
-
-        for song in all_songs:
-            if song['id'] == self.id:
-                song['played'] += 1
-                break
 
-        with open("db/canciones.json", "w") as file:
-            json.dump(all_songs, file, indent=4)
+        Args:
+            user (Usuario): El usuario que la escucha, para contar oyentes únicos (opcional).
+        """
+        repo = repositorio.get_repositorio()
+        repo.record_event(self, "played", 1)
+        if user is not None:
+            repo.record_listener(self, user)
             
     
     def like(self):
         """
         Incrementa el contador de "me gusta" de la canción en 1.
         """
-        with open("db/canciones.json", "r") as file:
-            all_songs = json.load(file)
-            
-        for song in all_songs:
-            if song['id'] == self.id:
-                song['liked'] += 1
-                break
-            
-        with open("db/canciones.json", "w") as file:
-            json.dump(all_songs, file, indent=4)
+        repositorio.get_repositorio().record_event(self, "liked", 1)
             
     def dislike(self):
         """
         Decrementa el contador de "me gusta" de la canción en 1.
         """
-        with open("db/canciones.json", "r") as file:
-            all_songs = json.load(file)
-            
-        for song in all_songs:
-            if song['id'] == self.id:
-                song['liked'] -= 1
-                break
-            
-        with open("db/canciones.json", "w") as file:
-            json.dump(all_songs, file, indent=4)
+        repositorio.get_repositorio().record_event(self, "liked", -1)
             
             
                 
@@ -544,36 +482,54 @@ class Playlist():
     """
     Representa una lista de reproducción con sus atributos y métodos.
     """
+    __slots__ = ("id", "name", "description", "creator", "tracks", "_relaciones")
 
     def __init__(self, id, name, description, creator, tracks = []):
         self.id = id
         self.name = name
         self.description = description
         self.creator = creator
-        self.tracks = tracks
+        self.tracks = list(tracks)
+
+    def to_dict(self):
+        """
+        Devuelve una representación de diccionario de la lista de reproducción.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "creator": self.creator,
+            "tracks": self.tracks
+        }
         
     def __str__(self):
         return f"{self.name} - {self.description}"
     
+    @property
+    def songs(self):
+        """
+        Las canciones de la lista de reproducción, resueltas en un solo lote y
+        memoizadas hasta que cambien las playlists o las canciones. La lista no se
+        debe modificar.
+        """
+        return _memoize(self, "songs", ("playlists", "canciones"), lambda: repositorio.get_repositorio().get_many("canciones", self.tracks))
+
     def get_tracks(self):
         """
-        Recupera las canciones asociadas a la lista de reproducción desde un archivo JSON.
+        Recupera las canciones asociadas a la lista de reproducción desde el repositorio.
 
         Returns:
             Una lista de objetos de canciones.
         """
-        with open("db/canciones.json", "r") as file:
-            all_songs = json.load(file)
-        
-        playlist_tracks = [Cancion(**song) for song in all_songs if song['id'] in self.tracks]
-        return playlist_tracks
+        return list(self.songs)
     
     def show_tracks(self):
         """
         Imprime las canciones de la lista de reproducción.
         """
         print("     ***Canciones de la Playlist:***")
-        for count, song in enumerate(self.get_tracks()):
+        for count, song in enumerate(self.songs):
             print(f"{count+1}. {song}")
             
     
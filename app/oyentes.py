@@ -0,0 +1,232 @@
+"""
+Oyentes únicos aproximados con HyperLogLog.
+
+Guardar el conjunto de ids de usuarios que escucharon cada canción crece con
+los oyentes y no escala al catálogo completo. Cada canción guarda, en cambio,
+un HyperLogLog de los ids de quienes la reprodujeron: un arreglo de 2^p
+registros de un byte que estima la cantidad de ids distintos con un error
+relativo típico de 1.04 / sqrt(2^p) (un 3 % con p = 10). Mientras tiene pocos
+registros usados se guarda en forma dispersa, así que una canción con pocos
+oyentes ocupa unos pocos bytes.
+
+Los HyperLogLog se combinan tomando el máximo de cada registro, así que los
+oyentes únicos de un álbum o de un artista salen de combinar los de sus
+canciones, sin contar dos veces a quien escuchó varias. Por lo mismo, guardarlos
+es idempotente: cada proceso combina los suyos con los del archivo
+'db/oyentes.json' y lo reescribe.
+"""
+import base64
+import hashlib
+import json
+import math
+import os
+
+from .archivos import BloqueoArchivo, write_json_atomic
+
+
+PRECISION = 10
+
+
+def _hash(valor):
+    # Un hash estable entre procesos (hash() de str cambia en cada ejecución).
+    return int.from_bytes(hashlib.blake2b(str(valor).encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog():
+    """
+    Estimador de la cantidad de elementos distintos.
+
+    Atributos
+    ----------
+    precision : int
+        p, la cantidad de bits del hash que eligen el registro (hay 2^p registros)
+    """
+    __slots__ = ("precision", "_registros")
+
+    def __init__(self, precision=PRECISION):
+        self.precision = precision
+        # Disperso (dict posición -> valor) hasta que conviene el arreglo completo.
+        self._registros = {}
+
+    @property
+    def _tamano(self):
+        return 1 << self.precision
+
+    def add(self, valor):
+        """
+        Agrega un elemento.
+
+        Devuelve:
+            bool: True si cambió algún registro.
+        """
+        h = _hash(valor)
+        bits = 64 - self.precision
+        posicion = h >> bits
+        rango = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        return self._raise(posicion, rango)
+
+    def _raise(self, posicion, rango):
+        registros = self._registros
+        actual = registros.get(posicion, 0) if isinstance(registros, dict) else registros[posicion]
+        if actual >= rango:
+            return False
+        registros[posicion] = rango
+        if isinstance(registros, dict) and len(registros) > self._tamano // 16:
+            denso = bytearray(self._tamano)
+            for indice, valor in registros.items():
+                denso[indice] = valor
+            self._registros = denso
+        return True
+
+    def _items(self):
+        if isinstance(self._registros, dict):
+            return self._registros.items()
+        return ((indice, valor) for indice, valor in enumerate(self._registros) if valor)
+
+    def merge(self, otro):
+        """
+        Combina con otro HyperLogLog de la misma precisión (el resultado estima los
+        elementos distintos de la unión).
+
+        Devuelve:
+            bool: True si cambió algún registro.
+        """
+        cambio = False
+        for posicion, rango in otro._items():
+            cambio = self._raise(posicion, rango) or cambio
+        return cambio
+
+    def estimate(self):
+        """
+        Devuelve la cantidad estimada de elementos distintos.
+        """
+        m = self._tamano
+        usados = 0
+        suma = 0.0
+        for _, rango in self._items():
+            usados += 1
+            suma += 2.0 ** -rango
+        suma += m - usados
+        if usados == 0:
+            return 0
+        estimacion = 0.7213 / (1 + 1.079 / m) * m * m / suma
+        if estimacion <= 2.5 * m and usados < m:
+            # Con pocos elementos, el conteo lineal de registros vacíos es más exacto.
+            estimacion = m * math.log(m / (m - usados))
+        return round(estimacion)
+
+    def to_bytes(self):
+        """
+        Devuelve los registros codificados: b'd' seguido del arreglo completo, o
+        b's' seguido de tres bytes (posición y valor) por registro usado.
+        """
+        if isinstance(self._registros, dict):
+            datos = bytearray(b"s")
+            for posicion, rango in sorted(self._registros.items()):
+                datos += posicion.to_bytes(2, "big") + bytes((rango,))
+            return bytes(datos)
+        return b"d" + bytes(self._registros)
+
+    @classmethod
+    def from_bytes(cls, datos, precision=PRECISION):
+        hll = cls(precision)
+        if datos[:1] == b"d":
+            hll._registros = bytearray(datos[1:])
+        else:
+            for inicio in range(1, len(datos), 3):
+                hll._raise(int.from_bytes(datos[inicio:inicio + 2], "big"), datos[inicio + 2])
+        return hll
+
+
+class OyentesUnicos():
+    """
+    HyperLogLog de oyentes por canción, guardados en un archivo JSON.
+
+    No tiene lock propio: el repositorio llama a sus métodos con su lock.
+
+    Atributos
+    ----------
+    path : str
+        la ruta del archivo, o None para no guardarlos
+    precision : int
+        la precisión de los HyperLogLog
+    """
+    def __init__(self, path=None, precision=PRECISION):
+        self.path = path
+        self.precision = precision
+        self._canciones = None
+        self._cambiadas = set()
+        self._bloqueo = BloqueoArchivo(f"{os.path.dirname(path) or '.'}/.oyentes.lock") if path else None
+
+    def _sketches(self):
+        if self._canciones is None:
+            self._canciones = self._read()
+        return self._canciones
+
+    def record(self, cancion_id, usuario_id):
+        """
+        Registra que un usuario escuchó una canción.
+        """
+        canciones = self._sketches()
+        hll = canciones.get(cancion_id)
+        if hll is None:
+            hll = canciones[cancion_id] = HyperLogLog(self.precision)
+        if hll.add(usuario_id):
+            self._cambiadas.add(cancion_id)
+
+    def combined(self, canciones_ids):
+        """
+        Combina los HyperLogLog de varias canciones.
+
+        Devuelve:
+            HyperLogLog: El que estima los oyentes distintos de todas ellas.
+        """
+        canciones = self._sketches()
+        total = HyperLogLog(self.precision)
+        for id in canciones_ids:
+            hll = canciones.get(id)
+            if hll is not None:
+                total.merge(hll)
+        return total
+
+    def estimate(self, canciones_ids):
+        """
+        Devuelve la cantidad estimada de oyentes distintos de las canciones dadas.
+        """
+        return self.combined(canciones_ids).estimate()
+
+    def _read(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r") as file:
+                datos = json.load(file)
+        except FileNotFoundError:
+            return {}
+        return {
+            id: HyperLogLog.from_bytes(base64.b64decode(codificado), datos["precision"])
+            for id, codificado in datos["canciones"]
+        }
+
+    def save(self):
+        """
+        Combina los HyperLogLog que cambiaron con los del archivo y lo reescribe.
+
+        Devuelve:
+            bool: True si había cambios para guardar, False si no.
+        """
+        if self.path is None or not self._cambiadas:
+            return False
+        with self._bloqueo:
+            guardadas = self._read()
+            for id, hll in self._canciones.items():
+                if id in guardadas:
+                    hll.merge(guardadas[id])
+                guardadas[id] = hll
+            self._canciones = guardadas
+            write_json_atomic(self.path, {
+                "precision": self.precision,
+                "canciones": [[id, base64.b64encode(hll.to_bytes()).decode()] for id, hll in guardadas.items()],
+            })
+            self._cambiadas.clear()
+        return True
@@ -0,0 +1,166 @@
+"""
+Reportes de estadísticas sin interfaz, para servidores sin pantalla o cron.
+
+Cada reporte (el general, y opcionalmente uno por género y uno por artista)
+escribe sus rankings como CSV y JSON y un gráfico PNG en una carpeta propia.
+Los gráficos se dibujan con el backend Agg de matplotlib en un pool de
+procesos, así que varios reportes se construyen a la vez.
+
+La carpeta de salida guarda en 'indice.json' una clave de cada reporte, un
+hash de los datos de sus rankings. Si al volver a generarlo la clave no cambió
+y sus archivos siguen ahí, el reporte no se vuelve a escribir ni a dibujar.
+
+Uso (desde la raíz del proyecto):
+
+    python main.py --reporte reportes --por genero artista
+"""
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from .archivos import write_json_atomic
+from .estadisticas import compute_group_statistics, compute_statistics, load_frames
+from .repositorio import get_repositorio
+
+
+TITULOS = {
+    "top_musicians": "Top {n} Musicos con mas reproducciones",
+    "top_albums": "Top {n} Albums con mas reproducciones",
+    "top_songs": "Top {n} Songs mas escuchadas",
+    "top_genres": "Top {n} Generos con mas reproducciones",
+    "top_liked_songs": "Top {n} Songs con mas likes",
+}
+
+# Agrupación -> (columna de los álbumes, carpeta de sus reportes).
+AGRUPACIONES = {
+    "genero": ("genre", "generos"),
+    "artista": ("artist", "artistas"),
+}
+
+
+def _slug(texto):
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", texto.lower()).strip("-") or "sin-nombre"
+
+
+def _key(titulo, tablas):
+    datos = {"titulo": titulo}
+    datos.update({nombre: frame.to_dict(orient="split") for nombre, frame in sorted(tablas.items())})
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def render_chart(path, titulo, graficos):
+    """
+    Dibuja un gráfico de barras por ranking, uno debajo del otro, y lo guarda
+    como PNG. Se ejecuta en los procesos del pool, así que recibe solo datos.
+
+    Parámetros:
+        path (str): La ruta del PNG.
+        titulo (str): El título de la figura.
+        graficos (list): Tuplas (título, nombres, valores) de cada ranking.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 5 * len(graficos)))
+    axs = fig.subplots(len(graficos), 1, squeeze=False)[:, 0]
+    for ax, (subtitulo, nombres, valores) in zip(axs, graficos):
+        ax.bar(nombres, valores)
+        ax.set_title(subtitulo)
+        ax.tick_params(axis="x", labelrotation=20)
+    fig.suptitle(titulo)
+    fig.tight_layout()
+    fig.savefig(path, format="png")
+    return path
+
+
+def build_reports(n=5, agrupaciones=()):
+    """
+    Calcula los rankings de todos los reportes.
+
+    Parámetros:
+        n (int): La cantidad de filas de cada ranking.
+        agrupaciones (iterable): 'genero' y/o 'artista', para agregar un reporte
+            por cada género o cada artista.
+
+    Devuelve:
+        dict: carpeta del reporte -> (título, dict nombre del ranking -> DataFrame).
+    """
+    repo = get_repositorio()
+    usuarios = repo.all("usuarios")
+    frames = load_frames(usuarios, repo.track_rows(), repo.table("canciones"), repo.columnas)
+    reportes = {"general": ("Estadisticas generales", compute_statistics(frames, n))}
+    nombres = {user.id: user.name for user in usuarios}
+    for agrupacion in agrupaciones:
+        columna, carpeta = AGRUPACIONES[agrupacion]
+        for valor, tablas in compute_group_statistics(frames, columna, n).items():
+            if agrupacion == "artista":
+                # Dos artistas pueden tener el mismo nombre: la carpeta lleva también el id.
+                titulo = f"Artista: {nombres.get(valor, valor)}"
+                nombre = f"{_slug(nombres.get(valor, valor))}-{_slug(valor)[:8]}"
+            else:
+                titulo = f"Genero: {valor}"
+                nombre = _slug(valor)
+            reportes[f"{carpeta}/{nombre}"] = (titulo, tablas)
+    return reportes
+
+
+def write_reports(salida, n=5, agrupaciones=(), procesos=None):
+    """
+    Escribe los reportes que cambiaron desde la última vez: los rankings como CSV
+    y JSON, y los gráficos como PNG dibujados en paralelo.
+
+    Parámetros:
+        salida (str): La carpeta de salida.
+        n (int): La cantidad de filas de cada ranking.
+        agrupaciones (iterable): 'genero' y/o 'artista' (ver build_reports).
+        procesos (int): La cantidad de procesos para dibujar (por defecto, uno por CPU).
+
+    Devuelve:
+        dict: 'generados' y 'sin_cambios', las carpetas de los reportes de cada caso.
+    """
+    os.makedirs(salida, exist_ok=True)
+    path_indice = os.path.join(salida, "indice.json")
+    try:
+        with open(path_indice, "r") as file:
+            indice = json.load(file)
+    except FileNotFoundError:
+        indice = {}
+
+    pendientes = {}
+    sin_cambios = []
+    for carpeta, (titulo, tablas) in build_reports(n, agrupaciones).items():
+        clave = _key(titulo, tablas)
+        directorio = os.path.join(salida, carpeta)
+        grafico = os.path.join(directorio, "graficos.png")
+        if indice.get(carpeta) == clave and os.path.exists(grafico):
+            sin_cambios.append(carpeta)
+            continue
+        os.makedirs(directorio, exist_ok=True)
+        for nombre, frame in tablas.items():
+            frame.to_csv(os.path.join(directorio, f"{nombre}.csv"), index=False)
+            frame.to_json(os.path.join(directorio, f"{nombre}.json"), orient="records", force_ascii=False)
+        graficos = [
+            (TITULOS.get(nombre, nombre).format(n=n), [str(valor) for valor in frame["name"]], frame[frame.columns[1]].tolist())
+            for nombre, frame in tablas.items()
+        ]
+        pendientes[carpeta] = (clave, grafico, titulo, graficos)
+
+    if pendientes:
+        try:
+            with ProcessPoolExecutor(max_workers=procesos) as executor:
+                futuros = {
+                    carpeta: executor.submit(render_chart, grafico, titulo, graficos)
+                    for carpeta, (_, grafico, titulo, graficos) in pendientes.items()
+                }
+                for carpeta, futuro in futuros.items():
+                    futuro.result()
+                    indice[carpeta] = pendientes[carpeta][0]
+        finally:
+            # Los reportes que se llegaron a dibujar quedan en el índice aunque otro falle.
+            write_json_atomic(path_indice, indice)
+    return {"generados": list(pendientes), "sin_cambios": sin_cambios}
@@ -0,0 +1,736 @@
+import atexit
+import threading
+
+from . import modelos
+from .agregados import AgregadosReproducciones
+from .almacen import create_almacen
+from .columnas import ColumnasCanciones
+from .eventos import Compactador
+from .frecuentes import create_frecuentes
+from .historial import HistorialReproducciones
+from .indices import IndiceBM25, IndiceDifuso, IndiceHash, IndiceLista, IndiceTrie, IndiceTrigramas
+from .oyentes import OyentesUnicos
+
+
+TABLAS = {
+    "usuarios": "Usuario",
+    "albums": "Album",
+    "canciones": "Cancion",
+    "playlists": "Playlist",
+}
+
+# Campos con un IndiceHash en memoria, además del id.
+CAMPOS_INDEXADOS = {
+    "usuarios": ["username"],
+    "albums": ["artist"],
+    "playlists": ["creator"],
+}
+
+# Campos con un IndiceTrie, para autocompletar por prefijo.
+PREFIJOS_INDEXADOS = {
+    "usuarios": ["username"],
+}
+
+# Campos de tipo lista con un IndiceLista (elemento -> registros que lo contienen).
+LISTAS_INDEXADAS = {
+    "albums": ["tracklist"],
+    "usuarios": ["liked_albums", "songs_liked", "artists_liked"],
+}
+
+# Campos de texto con un IndiceTrigramas, para las búsquedas por subcadena.
+TEXTOS_INDEXADOS = {
+    "usuarios": ["name"],
+    "albums": ["name"],
+    "canciones": ["name"],
+    "playlists": ["name"],
+}
+
+# Campos de texto con un IndiceDifuso, para las búsquedas con errores de tipeo.
+TEXTOS_DIFUSOS = {
+    "usuarios": ["name"],
+    "albums": ["name"],
+    "canciones": ["name"],
+}
+
+# Campos de texto que forman el documento de cada registro en su IndiceBM25.
+DOCUMENTOS_INDEXADOS = {
+    "albums": ["name", "description"],
+    "playlists": ["name", "description"],
+}
+
+
+class Repositorio():
+    """
+    Repositorio en memoria sobre un almacén (los archivos JSON de 'db/' o SQLite).
+
+    Cada tabla se carga una sola vez (la primera vez que se usa) y se guarda en
+    un mapa de identidad, de modo que para cada id existe una única instancia
+    compartida por todo el programa. Los métodos de los modelos modifican esas
+    instancias y las marcan como sucias; los cambios se escriben en el almacén
+    por lotes con flush().
+
+    Los contadores de las canciones ('played' y 'liked') se guardan en el
+    almacén en columnas 'columnas', que se arma al cargar la tabla de canciones
+    y se descarta con ella. No marcan la tabla como sucia: cada cambio se entrega al almacén con record_event() (en JSON, al
+    registro de eventos, que se incorpora a los archivos de canciones en la
+    compactación).
+
+    El mapa de identidad de cada tabla es a la vez su índice por clave primaria.
+    Los índices secundarios registrados con add_index() se construyen al cargar
+    la tabla y se mantienen en cada add(), mark_dirty() y remove(). Los de
+    búsqueda de texto (trigramas, difusos y BM25) se registran recién en la
+    primera búsqueda que los usa, así que las pantallas que no buscan no pagan
+    su construcción.
+
+    Cada tabla tiene además un número de versión que aumenta con cada cambio de
+    sus registros (no con los contadores de las canciones); los modelos lo usan
+    para saber cuándo volver a resolver sus relaciones memoizadas.
+
+    Atributos
+    ----------
+    almacen : AlmacenJSON o AlmacenSQLite
+        el backend donde se guardan los datos
+    tamano_lote : int
+        cantidad de cambios pendientes que dispara un flush automático
+    columnas : ColumnasCanciones
+        los contadores de las canciones de la tabla cargada
+    historial : HistorialReproducciones
+        las reproducciones recientes por minuto y por hora
+    oyentes : OyentesUnicos
+        los HyperLogLog de oyentes de cada canción
+    frecuentes : FrecuentesAproximados
+        el conteo aproximado de reproducciones, o None si no está activado
+    """
+    def __init__(self, almacen, tamano_lote=50, frecuentes=None):
+        self.almacen = almacen
+        self.tamano_lote = tamano_lote
+        self.frecuentes = frecuentes
+        self._entidades = {}
+        self._parciales = {tabla: {} for tabla in TABLAS}
+        self._sucias = {tabla: set() for tabla in TABLAS}
+        self._pendientes = 0
+        self._versiones = {tabla: 0 for tabla in TABLAS}
+        self._agregados = AgregadosReproducciones()
+        self.columnas = ColumnasCanciones()
+        self.historial = HistorialReproducciones(f"{almacen.directorio}/historial.json")
+        self.oyentes = OyentesUnicos(f"{almacen.directorio}/oyentes.json")
+        self._lock = threading.RLock()
+        self._indices = {tabla: [] for tabla in TABLAS}
+        self._indices_hash = {}
+        for tabla, campos in CAMPOS_INDEXADOS.items():
+            for campo in campos:
+                self._indices_hash[tabla, campo] = self.add_index(tabla, IndiceHash(campo))
+        self._indices_trie = {}
+        for tabla, campos in PREFIJOS_INDEXADOS.items():
+            for campo in campos:
+                self._indices_trie[tabla, campo] = self.add_index(tabla, IndiceTrie(campo))
+        self._indices_lista = {}
+        for tabla, campos in LISTAS_INDEXADAS.items():
+            for campo in campos:
+                self._indices_lista[tabla, campo] = self.add_index(tabla, IndiceLista(campo))
+        # Los índices de búsqueda de texto son caros de construir: se registran en
+        # la primera búsqueda sobre su tabla (ver _search_index).
+        self._indices_texto = {}
+        self._indices_difusos = {}
+        self._indices_bm25 = {}
+
+    def _load(self, tabla):
+        clase = getattr(modelos, TABLAS[tabla])
+        parciales = self._parciales[tabla]
+        # Las canciones guardan sus contadores en las columnas del repositorio
+        # (las parciales ya tienen su fila, ver _materialize).
+        extra = {"columnas": self.columnas} if tabla == "canciones" else {}
+        entidades = {}
+        filas = self.almacen.load_rows(tabla) if hasattr(self.almacen, "load_rows") else None
+        if filas is not None:
+            # Las filas vienen en el orden de los parámetros del constructor.
+            for fila in filas:
+                entidad = parciales.get(fila[0])
+                entidades[fila[0]] = entidad if entidad is not None else clase(*fila, **extra)
+        else:
+            for registro in self.almacen.load(tabla):
+                entidad = parciales.get(registro["id"])
+                entidades[registro["id"]] = entidad if entidad is not None else clase(**registro, **extra)
+        parciales.clear()
+        for indice in self._indices[tabla]:
+            indice.build(entidades.values())
+        self._entidades[tabla] = entidades
+
+    def add_index(self, tabla, indice):
+        """
+        Registra un índice sobre una tabla. El índice debe tener los métodos
+        build(entidades), add(entidad) y remove(entidad).
+
+        Devuelve:
+            El mismo índice, ya construido si la tabla estaba cargada.
+        """
+        with self._lock:
+            self._indices[tabla].append(indice)
+            if tabla in self._entidades:
+                indice.build(self._entidades[tabla].values())
+        return indice
+
+    def _search_index(self, indices, clave, tabla, crear):
+        indice = indices.get(clave)
+        if indice is None:
+            with self._lock:
+                indice = indices.get(clave)
+                if indice is None:
+                    self.table(tabla)
+                    indice = indices[clave] = self.add_index(tabla, crear())
+        return indice
+
+    def _text_index(self, tabla, campo):
+        if campo not in TEXTOS_INDEXADOS.get(tabla, ()):
+            return None
+        return self._search_index(self._indices_texto, (tabla, campo), tabla, lambda: IndiceTrigramas(campo))
+
+    def table(self, tabla):
+        """
+        Devuelve el mapa id -> instancia de una tabla, cargándola si hace falta.
+        """
+        if tabla not in self._entidades:
+            with self._lock:
+                if tabla not in self._entidades:
+                    self._load(tabla)
+        return self._entidades[tabla]
+
+    def get(self, tabla, id):
+        """
+        Devuelve la instancia con el id dado, o None si no existe.
+        """
+        return self.table(tabla).get(id)
+
+    def _materialize(self, tabla, registro):
+        entidad = self._parciales[tabla].get(registro["id"])
+        if entidad is None:
+            extra = {"columnas": self.columnas} if tabla == "canciones" else {}
+            entidad = getattr(modelos, TABLAS[tabla])(**registro, **extra)
+            self._parciales[tabla][registro["id"]] = entidad
+        return entidad
+
+    def scan(self, tabla, campo, condicion):
+        """
+        Devuelve las instancias cuyo campo cumple la condición, en el orden de la tabla.
+
+        Si la tabla todavía no está cargada, los registros se leen uno por uno del
+        almacén y solo se crean instancias para los que coinciden (que pasan a ser
+        las instancias compartidas de esos ids).
+
+        Parámetros:
+            tabla (str): El nombre de la tabla.
+            campo (str): El campo a evaluar.
+            condicion (function): Recibe el valor del campo y devuelve True o False.
+        """
+        with self._lock:
+            if tabla in self._entidades:
+                return [entidad for entidad in self._entidades[tabla].values() if condicion(getattr(entidad, campo))]
+            return [
+                self._materialize(tabla, registro)
+                for registro in self.almacen.stream(tabla)
+                if condicion(registro[campo])
+            ]
+
+    def all(self, tabla):
+        """
+        Devuelve una lista con todas las instancias de una tabla, en el orden del archivo.
+        """
+        return list(self.table(tabla).values())
+
+    def find(self, tabla, campo, valor):
+        """
+        Devuelve las instancias cuyo campo es igual al valor, usando su IndiceHash
+        si lo tiene (ver CAMPOS_INDEXADOS) o recorriendo la tabla si no.
+        """
+        entidades = self.table(tabla)
+        indice = self._indices_hash.get((tabla, campo))
+        if indice is not None:
+            return [entidades[id] for id in indice.get(valor)]
+        return [entidad for entidad in entidades.values() if getattr(entidad, campo) == valor]
+
+    def complete(self, tabla, campo, prefijo, limite=10):
+        """
+        Devuelve hasta 'limite' instancias cuyo campo empieza con el prefijo, en
+        orden alfabético, usando su IndiceTrie.
+        """
+        entidades = self.table(tabla)
+        return [entidades[id] for id in self._indices_trie[tabla, campo].prefix(prefijo, limite)]
+
+    def search(self, tabla, campo, texto):
+        """
+        Devuelve las instancias cuyo campo contiene el texto, sin distinguir
+        mayúsculas (como texto.lower() in valor.lower()), en el orden de la tabla.
+        Usa el IndiceTrigramas del campo si lo tiene.
+        """
+        entidades = self.table(tabla)
+        indice = self._text_index(tabla, campo)
+        if indice is None:
+            consulta = texto.lower()
+            return [entidad for entidad in entidades.values() if consulta in getattr(entidad, campo).lower()]
+        return [entidades[id] for id in indice.search(texto)]
+
+    def search_many(self, tabla, campo, textos):
+        """
+        Busca varios textos a la vez con la semántica de search(): con una consulta
+        al IndiceTrigramas por texto distinto, o si el campo no tiene índice, con
+        una sola pasada por la tabla para todos los textos.
+
+        Devuelve:
+            list: Una lista de instancias por cada texto, en el mismo orden.
+        """
+        entidades = self.table(tabla)
+        consultas = {texto.lower() for texto in textos}
+        indice = self._text_index(tabla, campo)
+        if indice is not None:
+            resultados = {consulta: [entidades[id] for id in indice.search(consulta)] for consulta in consultas}
+        else:
+            resultados = {consulta: [] for consulta in consultas}
+            for entidad in entidades.values():
+                valor = getattr(entidad, campo).lower()
+                for consulta in consultas:
+                    if consulta in valor:
+                        resultados[consulta].append(entidad)
+        return [resultados[texto.lower()] for texto in textos]
+
+    def search_fuzzy(self, tabla, campo, texto, limite=None):
+        """
+        Devuelve las instancias cuyo campo tiene, para cada palabra del texto, una
+        palabra a lo sumo a dos ediciones, usando su IndiceDifuso. Las coincidencias
+        exactas y por prefijo van primero. Con 'limite', solo las primeras.
+        """
+        entidades = self.table(tabla)
+        indice = self._search_index(self._indices_difusos, (tabla, campo), tabla, lambda: IndiceDifuso(campo))
+        return [entidades[id] for id in indice.search(texto, limite)]
+
+    def rank(self, tabla, texto, k=10):
+        """
+        Devuelve los k registros de la tabla más relevantes para el texto según
+        BM25 sobre los campos de DOCUMENTOS_INDEXADOS.
+
+        Devuelve:
+            list: Tuplas (puntaje, instancia), de mayor a menor puntaje.
+        """
+        entidades = self.table(tabla)
+        indice = self._search_index(self._indices_bm25, tabla, tabla, lambda: IndiceBM25(DOCUMENTOS_INDEXADOS[tabla]))
+        return [(puntaje, entidades[id]) for puntaje, id in indice.top(texto, k)]
+
+    def find_containing(self, tabla, campo, elemento):
+        """
+        Devuelve las instancias cuya lista 'campo' contiene el elemento, usando su
+        IndiceLista (por ejemplo, los álbumes cuyo tracklist incluye una canción).
+        """
+        entidades = self.table(tabla)
+        return [entidades[id] for id in self._indices_lista[tabla, campo].get(elemento)]
+
+    def count_containing(self, tabla, campo, elemento):
+        """
+        Devuelve cuántas instancias contienen el elemento en su lista 'campo'
+        (por ejemplo, cuántos usuarios le dieron "me gusta" a un álbum).
+        """
+        self.table(tabla)
+        return self._indices_lista[tabla, campo].count(elemento)
+
+    def contains(self, tabla, campo, entidad, elemento):
+        """
+        Devuelve True si la lista 'campo' de la instancia contiene el elemento.
+        """
+        self.table(tabla)
+        return self._indices_lista[tabla, campo].contains(elemento, entidad.id)
+
+    def append_to(self, tabla, campo, entidad, elemento):
+        """
+        Agrega el elemento a la lista 'campo' de la instancia si todavía no está,
+        actualizando solo esa entrada de su IndiceLista.
+
+        Devuelve:
+            bool: True si el elemento se agregó, False si ya estaba.
+        """
+        with self._lock:
+            if self.contains(tabla, campo, entidad, elemento):
+                return False
+            getattr(entidad, campo).append(elemento)
+            self._indices_lista[tabla, campo].link(elemento, entidad.id)
+            self._sucias[tabla].add(entidad.id)
+            self._versiones[tabla] += 1
+            self._count_change()
+            return True
+
+    def remove_from(self, tabla, campo, entidad, elemento):
+        """
+        Quita el elemento de la lista 'campo' de la instancia si está,
+        actualizando solo esa entrada de su IndiceLista.
+
+        Devuelve:
+            bool: True si el elemento se quitó, False si no estaba.
+        """
+        with self._lock:
+            if not self.contains(tabla, campo, entidad, elemento):
+                return False
+            getattr(entidad, campo).remove(elemento)
+            self._indices_lista[tabla, campo].unlink(elemento, entidad.id)
+            self._sucias[tabla].add(entidad.id)
+            self._versiones[tabla] += 1
+            self._count_change()
+            return True
+
+    def add(self, tabla, entidad):
+        """
+        Registra una nueva instancia en la tabla y la marca como sucia.
+        """
+        with self._lock:
+            entidades = self.table(tabla)
+            if tabla == "canciones":
+                self.columnas.attach(entidad)
+            entidades[entidad.id] = entidad
+            self.mark_dirty(tabla, entidad)
+
+    def get_many(self, tabla, ids):
+        """
+        Devuelve las instancias de los ids dados, en el mismo orden, omitiendo los
+        que no existen.
+
+        Si la tabla todavía no está cargada, se lee el almacén registro por registro
+        y la lectura se detiene en cuanto aparecen todos los ids.
+        """
+        with self._lock:
+            if tabla in self._entidades:
+                entidades = self._entidades[tabla]
+            else:
+                entidades = self._parciales[tabla]
+                faltantes = {id for id in ids if id not in entidades}
+                if faltantes:
+                    for registro in self.almacen.stream(tabla):
+                        if registro["id"] in faltantes:
+                            self._materialize(tabla, registro)
+                            faltantes.discard(registro["id"])
+                            if not faltantes:
+                                break
+            return [entidades[id] for id in ids if id in entidades]
+
+    def remove(self, tabla, id):
+        """
+        Elimina la instancia con el id dado de la tabla.
+        """
+        with self._lock:
+            entidad = self.table(tabla).pop(id, None)
+            if entidad is not None:
+                for indice in self._indices[tabla]:
+                    indice.remove(entidad)
+                if tabla == "canciones" and entidad._columnas is self.columnas:
+                    self.columnas.release(entidad._fila)
+                self._sucias[tabla].add(id)
+                self._versiones[tabla] += 1
+                self._count_change()
+
+    def mark_dirty(self, tabla, entidad):
+        """
+        Marca una instancia como modificada para que se escriba en el próximo flush.
+        """
+        with self._lock:
+            self.table(tabla)
+            for indice in self._indices[tabla]:
+                indice.add(entidad)
+            self._sucias[tabla].add(entidad.id)
+            self._versiones[tabla] += 1
+            self._count_change()
+
+    def version(self, *tablas):
+        """
+        Devuelve la versión actual de las tablas dadas, que cambia cada vez que se
+        agrega, modifica o elimina un registro de alguna de ellas.
+
+        Devuelve:
+            tuple: Un número de versión por tabla.
+        """
+        return tuple(self._versiones[tabla] for tabla in tablas)
+
+    def total_played(self, tabla, id):
+        """
+        Devuelve el total de reproducciones de un álbum ('albums') o de todos los
+        álbumes de un artista ('usuarios'), desde los totales materializados. Si
+        los álbumes o las canciones cambiaron, primero se reconstruyen.
+        """
+        with self._lock:
+            agregados = self._aggregates()
+            totales = agregados.por_album if tabla == "albums" else agregados.por_artista
+            return totales.get(id, 0)
+
+    def track_rows(self):
+        """
+        Devuelve los álbumes y las canciones de sus tracklists como posiciones y
+        filas de las columnas (ver AgregadosReproducciones), para calcular totales
+        recorriendo arrays. Si los álbumes o las canciones cambiaron, primero se
+        reconstruyen.
+
+        Devuelve:
+            tuple: (albumes, pistas_album, pistas_fila).
+        """
+        with self._lock:
+            agregados = self._aggregates()
+            return agregados.albumes, agregados.pistas_album, agregados.pistas_fila
+
+    def top_played(self, tabla, n=5):
+        """
+        Devuelve las n canciones ('canciones'), álbumes ('albums') o artistas
+        ('usuarios') con más reproducciones, desde las clasificaciones en vivo,
+        sin ordenar toda la tabla.
+
+        Devuelve:
+            list: Tuplas (instancia, reproducciones), de mayor a menor.
+        """
+        with self._lock:
+            clasificacion = self._aggregates().clasificaciones[tabla]
+            entidades = self.table(tabla)
+            primeros = []
+            for id, conteo in clasificacion.descending():
+                if len(primeros) == n:
+                    break
+                if id in entidades:
+                    primeros.append((entidades[id], conteo))
+            return primeros
+
+    def top_artist_songs(self, artista_id, n=10):
+        """
+        Devuelve las n canciones de los álbumes de un artista con más
+        reproducciones, desde su clasificación en vivo, sin recorrer sus canciones.
+
+        Devuelve:
+            list: Tuplas (cancion, reproducciones), de mayor a menor.
+        """
+        with self._lock:
+            clasificacion = self._aggregates().canciones_de_artista.get(artista_id)
+            if clasificacion is None:
+                return []
+            entidades = self.table("canciones")
+            primeras = []
+            for id, conteo in clasificacion.descending():
+                if len(primeras) == n:
+                    break
+                if id in entidades:
+                    primeras.append((entidades[id], conteo))
+            return primeras
+
+    def unique_listeners(self, tabla, id):
+        """
+        Devuelve la cantidad aproximada de oyentes distintos de una canción
+        ('canciones'), de un álbum ('albums') o de todos los álbumes de un artista
+        ('usuarios'), combinando los HyperLogLog de sus canciones.
+        """
+        with self._lock:
+            if tabla == "canciones":
+                canciones = [id]
+            elif tabla == "albums":
+                album = self.get("albums", id)
+                canciones = album.tracklist if album else []
+            else:
+                canciones = [song_id for album in self.find("albums", "artist", id) for song_id in album.tracklist]
+            return self.oyentes.estimate(canciones)
+
+    def record_listener(self, cancion, usuario):
+        """
+        Registra que un usuario escuchó una canción, para contar oyentes únicos.
+        """
+        with self._lock:
+            self.oyentes.record(cancion.id, usuario.id)
+
+    def top_recent(self, segundos, n=10):
+        """
+        Devuelve las n canciones más escuchadas en los últimos segundos dados,
+        desde el historial de reproducciones por minuto y por hora.
+
+        Devuelve:
+            list: Tuplas (cancion, reproducciones), de mayor a menor.
+        """
+        with self._lock:
+            entidades = self.table("canciones")
+            return [(entidades[id], conteo) for id, conteo in self.historial.top(segundos, n) if id in entidades]
+
+    def trending(self, segundos, n=10):
+        """
+        Devuelve las n canciones cuyas reproducciones más crecieron en los últimos
+        segundos dados respecto de los segundos anteriores.
+
+        Devuelve:
+            list: Tuplas (cancion, reproducciones actuales, reproducciones
+            anteriores), de mayor a menor tendencia.
+        """
+        with self._lock:
+            entidades = self.table("canciones")
+            return [
+                (entidades[id], actuales, anteriores)
+                for id, actuales, anteriores in self.historial.trending(segundos, n)
+                if id in entidades
+            ]
+
+    def top_estimated(self, n=10):
+        """
+        Devuelve las canciones más escuchadas según el conteo aproximado, o una
+        lista vacía si no está activado.
+
+        Devuelve:
+            list: Tuplas (cancion, reproducciones estimadas), de mayor a menor.
+        """
+        with self._lock:
+            if self.frecuentes is None:
+                return []
+            entidades = self.table("canciones")
+            return [(entidades[id], conteo) for id, conteo in self._sketch().top(n) if id in entidades]
+
+    def reconcile_estimates(self):
+        """
+        Compara el conteo aproximado con los contadores 'played' exactos (ver
+        FrecuentesAproximados.reconcile), o devuelve None si no está activado.
+        """
+        with self._lock:
+            if self.frecuentes is None:
+                return None
+            frecuentes = self._sketch()
+            self.table("canciones")
+            return frecuentes.reconcile(dict(self.columnas.items("played")))
+
+    def _sketch(self):
+        version = self.version("canciones")
+        if self.frecuentes.version != version:
+            self.table("canciones")
+            self.frecuentes.rebuild(self.columnas.items("played"), version)
+        return self.frecuentes
+
+    def _aggregates(self):
+        version = self.version("albums", "canciones")
+        if self._agregados.version != version:
+            self._agregados.rebuild(self.table("albums").values(), self.table("canciones"), self.columnas, version)
+        return self._agregados
+
+    def record_event(self, cancion, campo, delta):
+        """
+        Suma delta a un contador de la canción y entrega el cambio al almacén.
+
+        Parámetros:
+            cancion (Cancion): La canción modificada.
+            campo (str): El contador a modificar ('played' o 'liked').
+            delta (int): La cantidad a sumar.
+        """
+        with self._lock:
+            setattr(cancion, campo, getattr(cancion, campo) + delta)
+            if campo == "played":
+                self.historial.record(cancion.id, delta)
+                if self.frecuentes is not None and self.frecuentes.version == self.version("canciones"):
+                    self.frecuentes.add(cancion.id, delta)
+                if self._agregados.version == self.version("albums", "canciones"):
+                    self._agregados.record_play(cancion.id, delta)
+        # Fuera del lock del repositorio, para que varios hilos puedan compartir
+        # el mismo commit del almacén.
+        self.almacen.record_event(cancion, campo, delta)
+
+    def _count_change(self):
+        self._pendientes += 1
+        if self._pendientes >= self.tamano_lote:
+            self.flush()
+
+    def flush(self):
+        """
+        Escribe a disco las tablas que tienen cambios pendientes.
+
+        Devuelve:
+            int: La cantidad de tablas escritas.
+        """
+        with self._lock:
+            escritas = 0
+            for tabla, sucias in self._sucias.items():
+                if not sucias or tabla not in self._entidades:
+                    continue
+                self._write(tabla)
+                escritas += 1
+            self._pendientes = 0
+            return escritas
+
+    def _write(self, tabla):
+        self.almacen.write(tabla, self._entidades.get(tabla, {}), self._sucias[tabla])
+        self._sucias[tabla].clear()
+
+    def compact(self):
+        """
+        Incorpora el registro de eventos a los archivos de canciones y lo vacía.
+        Solo se reescriben los fragmentos con canciones que tienen eventos.
+        También guarda el historial de reproducciones recientes y los oyentes
+        únicos.
+
+        Devuelve:
+            bool: True si había eventos para compactar, False si no.
+        """
+        with self._lock:
+            self.historial.save()
+            self.oyentes.save()
+            if not self.almacen.needs_compaction():
+                return False
+            self._write("canciones")
+            return True
+
+    def start_compaction(self, intervalo=30):
+        """
+        Inicia la compactación periódica del registro de eventos en segundo plano.
+
+        Devuelve:
+            Compactador: El hilo que realiza la compactación.
+        """
+        compactador = Compactador(self, intervalo)
+        compactador.start()
+        return compactador
+
+    def close(self):
+        """
+        Escribe los cambios pendientes y compacta el registro de eventos.
+        """
+        self.flush()
+        self.compact()
+
+    def reset(self):
+        """
+        Descarta las tablas cargadas y los cambios pendientes, y reinicia el almacén
+        a partir de los archivos JSON, para que los datos se vuelvan a leer en el
+        próximo acceso.
+        """
+        with self._lock:
+            self._discard()
+            self.almacen.reset()
+
+    def restore(self, datos):
+        """
+        Reemplaza el contenido de las tablas en el almacén y descarta las tablas
+        cargadas y los cambios pendientes, con el lock del repositorio tomado para
+        que la compactación no corra en el medio.
+
+        Parámetros:
+            datos (dict): tabla -> lista de registros (como los de los archivos JSON).
+        """
+        with self._lock:
+            self._discard()
+            self.almacen.restore(datos)
+
+    def _discard(self):
+        self._entidades.clear()
+        # Las instancias descartadas se quedan con sus columnas; la próxima carga
+        # arma unas nuevas.
+        self.columnas = ColumnasCanciones()
+        for parciales in self._parciales.values():
+            parciales.clear()
+        for sucias in self._sucias.values():
+            sucias.clear()
+        for tabla in self._versiones:
+            self._versiones[tabla] += 1
+        self._pendientes = 0
+
+
+_repositorio = None
+
+
+def get_repositorio():
+    """
+    Devuelve el repositorio compartido por toda la aplicación, creándolo si hace falta.
+    """
+    global _repositorio
+    if _repositorio is None:
+        _repositorio = Repositorio(create_almacen(), frecuentes=create_frecuentes())
+        _repositorio.start_compaction()
+        atexit.register(_repositorio.close)
+    return _repositorio
@@ -0,0 +1,161 @@
+"""
+Snapshot binario de un archivo JSON de una tabla, guardado a su lado (por
+ejemplo 'db/albums.snap' junto a 'db/albums.json', o uno por cada fragmento de
+'db/canciones/').
+
+El snapshot guarda las columnas por separado: los textos de la tabla se
+almacenan una sola vez (internados) en un bloque separado por '\\0', cada columna
+de texto es un array de índices a ese bloque, las columnas enteras son arrays
+de int64 y cada lista (tracklist, "me gusta", ...) es un array de offsets más un
+array plano de índices. Se lee con unas pocas llamadas a array.frombytes en vez
+de parsear el JSON carácter por carácter.
+
+El encabezado guarda la firma (mtime y tamaño) del JSON del que salió; si el
+JSON cambia, el snapshot se descarta y se regenera desde el JSON.
+"""
+import json
+import os
+import struct
+from array import array
+
+from .archivos import write_atomic
+
+
+MAGIA = b"MTFYSNAP"
+VERSION = 1
+
+
+def signature(path):
+    """
+    Devuelve la firma de un archivo (mtime en nanosegundos y tamaño).
+    """
+    info = os.stat(path)
+    return [info.st_mtime_ns, info.st_size]
+
+
+def write_snapshot(path, registros, firma, columnas, listas):
+    """
+    Escribe el snapshot de una tabla.
+
+    Parámetros:
+        path (str): La ruta del snapshot.
+        registros (list): Los registros de la tabla, como diccionarios.
+        firma (list): La firma del JSON del que salieron los registros.
+        columnas (list): Los nombres de los campos simples.
+        listas (list): Los nombres de los campos de tipo lista.
+
+    Lanza:
+        ValueError: Si algún texto contiene el carácter '\\0'.
+    """
+    enteras = [
+        columna for columna in columnas
+        if all(type(registro[columna]) is int for registro in registros)
+    ]
+    internadas = [
+        [registro[columna] for registro in registros]
+        for columna in columnas if columna not in enteras
+    ]
+    internadas += [
+        [valor for registro in registros for valor in registro[lista]]
+        for lista in listas
+    ]
+
+    # Los textos se numeran primero; los demás valores (por ejemplo, ids enteros)
+    # van en el encabezado y se numeran a continuación.
+    textos = {}
+    otros = {}
+    for valores in internadas:
+        for valor in valores:
+            if isinstance(valor, str):
+                textos.setdefault(valor, len(textos))
+            else:
+                otros.setdefault(json.dumps(valor), valor)
+    if any("\0" in texto for texto in textos):
+        raise ValueError("El texto no se puede guardar en el snapshot")
+    indices = dict(textos)
+    for numero, valor in enumerate(otros.values(), start=len(textos)):
+        indices[json.dumps(valor)] = numero
+
+    def intern(valor):
+        return indices[valor] if isinstance(valor, str) else indices[json.dumps(valor)]
+
+    secciones = []
+    encabezado = {
+        "firma": firma,
+        "cantidad": len(registros),
+        "columnas": [],
+        "listas": listas,
+        "textos": len(textos),
+        "otros": list(otros.values()),
+    }
+    for columna in columnas:
+        if columna in enteras:
+            secciones.append(array("q", [registro[columna] for registro in registros]))
+            encabezado["columnas"].append([columna, "q"])
+        else:
+            secciones.append(array("I", [intern(registro[columna]) for registro in registros]))
+            encabezado["columnas"].append([columna, "I"])
+    for lista in listas:
+        offsets = array("I", [0])
+        elementos = array("I")
+        for registro in registros:
+            elementos.extend(map(intern, registro[lista]))
+            offsets.append(len(elementos))
+        secciones.append(offsets)
+        secciones.append(elementos)
+
+    bloque = "\0".join(textos).encode()
+    encabezado["tamanos"] = [len(bloque)] + [len(seccion) for seccion in secciones]
+    datos = json.dumps(encabezado).encode()
+
+    partes = [MAGIA, struct.pack("<HI", VERSION, len(datos)), datos, bloque]
+    partes.extend(seccion.tobytes() for seccion in secciones)
+    write_atomic(path, b"".join(partes))
+
+
+def read_snapshot(path, firma):
+    """
+    Lee el snapshot de una tabla si existe y corresponde a la firma dada.
+
+    Devuelve:
+        dict: Un diccionario campo -> lista de valores (uno por registro), o None
+        si no hay un snapshot válido.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+    if not data.startswith(MAGIA):
+        return None
+    pos = len(MAGIA)
+    version, largo = struct.unpack_from("<HI", data, pos)
+    pos += struct.calcsize("<HI")
+    encabezado = json.loads(data[pos:pos + largo])
+    pos += largo
+    if version != VERSION or encabezado["firma"] != firma:
+        return None
+
+    tamanos = iter(encabezado["tamanos"])
+    largo = next(tamanos)
+    textos = data[pos:pos + largo].decode().split("\0") if encabezado["textos"] else []
+    textos += encabezado["otros"]
+    pos += largo
+
+    def read_array(tipo):
+        nonlocal pos
+        seccion = array(tipo)
+        fin = pos + next(tamanos) * seccion.itemsize
+        seccion.frombytes(data[pos:fin])
+        pos = fin
+        return seccion
+
+    columnas = {}
+    for columna, tipo in encabezado["columnas"]:
+        seccion = read_array(tipo)
+        columnas[columna] = seccion.tolist() if tipo == "q" else list(map(textos.__getitem__, seccion))
+    for lista in encabezado["listas"]:
+        offsets = read_array("I").tolist()
+        elementos = list(map(textos.__getitem__, read_array("I")))
+        columnas[lista] = [elementos[inicio:fin] for inicio, fin in zip(offsets, offsets[1:])]
+    return columnas
@@ -0,0 +1,106 @@
+"""
+Compara el tiempo de carga inicial de todas las tablas leyendo los JSON y
+leyendo los snapshots binarios, con los datos de 'db/' multiplicados 10 y 100
+veces. Se mide la lectura del almacén por separado y la carga completa del
+repositorio (lo que hace load_all_data: lectura, instancias e índices).
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/arranque_en_frio.py --escalas 1 10 100
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.almacen import ARCHIVOS, AlmacenJSON
+from app.cache import cache
+from app.repositorio import TABLAS, Repositorio
+
+
+def scale_data(origen, destino, escala):
+    """
+    Escribe en 'destino' los archivos de 'origen' repetidos 'escala' veces, con
+    ids distintos en cada copia y las referencias entre tablas ajustadas. Las
+    canciones se escriben en un solo archivo, que se reparte en fragmentos la
+    primera vez que se lee.
+    """
+    almacen = AlmacenJSON(origen)
+    datos = {tabla: almacen.load(tabla) for tabla in ARCHIVOS}
+
+    def renombrar(id, copia):
+        return id if copia == 0 else f"{id}-{copia}"
+
+    referencias = {
+        "usuarios": {"liked_albums", "songs_liked", "playlists", "artists_liked"},
+        "albums": {"artist", "tracklist"},
+        "canciones": set(),
+        "playlists": {"creator", "tracks"},
+    }
+    for tabla, registros in datos.items():
+        escalados = []
+        for copia in range(escala):
+            for registro in registros:
+                nuevo = dict(registro, id=renombrar(registro["id"], copia))
+                for campo in referencias[tabla]:
+                    valor = registro[campo]
+                    if isinstance(valor, list):
+                        nuevo[campo] = [renombrar(item, copia) for item in valor]
+                    else:
+                        nuevo[campo] = renombrar(valor, copia)
+                escalados.append(nuevo)
+        with open(os.path.join(destino, ARCHIVOS[tabla]), "w") as file:
+            json.dump(escalados, file)
+
+
+def read_everything(directorio, snapshot):
+    # Cada medición es un arranque en frío: sin archivos ya parseados en la cache.
+    cache.invalidate()
+    inicio = time.perf_counter()
+    almacen = AlmacenJSON(directorio, snapshot=snapshot)
+    for tabla in TABLAS:
+        almacen.load_rows(tabla) if snapshot else almacen.load(tabla)
+    return time.perf_counter() - inicio
+
+
+def load_everything(directorio, snapshot):
+    cache.invalidate()
+    inicio = time.perf_counter()
+    repo = Repositorio(AlmacenJSON(directorio, snapshot=snapshot))
+    for tabla in TABLAS:
+        repo.all(tabla)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'':17} {'Lectura del almacén':^32} {'Carga completa':^32}")
+    print(f"{'Escala':>6} {'Canciones':>10} " + f"{'JSON (s)':>10} {'Snapshot (s)':>13} {'Mejora':>7} " * 2)
+    for escala in args.escalas:
+        directorio = tempfile.mkdtemp()
+        try:
+            scale_data("db", directorio, escala)
+            # La primera carga con snapshot=True genera los archivos .snap.
+            load_everything(directorio, snapshot=True)
+            fila = f"{escala:>6} {len(AlmacenJSON(directorio).load('canciones')):>10} "
+            for medir in (read_everything, load_everything):
+                json_s = statistics.median(medir(directorio, False) for _ in range(args.repeticiones))
+                snap_s = statistics.median(medir(directorio, True) for _ in range(args.repeticiones))
+                fila += f"{json_s:>10.3f} {snap_s:>13.3f} {json_s / snap_s:>6.1f}x "
+            print(fila)
+        finally:
+            shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
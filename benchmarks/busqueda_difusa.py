@@ -0,0 +1,112 @@
+"""
+Mide el tiempo de construir un IndiceDifuso y de buscar con IndiceDifuso.search()
+(variantes, verificación con distancia de edición y ranking) consultas con
+errores de tipeo, sobre nombres generados combinando palabras de las canciones
+de 'db/' (por defecto, un millón de nombres), con el mismo límite de
+resultados que usan las búsquedas del menú. Algunas de las consultas se
+comparan con el recorrido de todos los nombres calculando la distancia de
+edición contra cada palabra, que tiene que devolver lo mismo.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/busqueda_difusa.py --cantidad 1000000 --limite 20 --recorridos 3
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.almacen import AlmacenJSON
+from app.indices import IndiceDifuso, _edit_distance, _words
+
+
+class Nombre():
+    __slots__ = ("id", "name")
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+def misspell(palabra, aleatorio):
+    letras = list(palabra)
+    posicion = aleatorio.randrange(len(letras))
+    if aleatorio.random() < 0.5 and len(letras) > 1:
+        letras[posicion], letras[posicion - 1] = letras[posicion - 1], letras[posicion]
+    else:
+        letras[posicion] = aleatorio.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(letras)
+
+
+def scan(nombres, consulta, distancia):
+    # Como una búsqueda sin índice: la distancia de cada palabra de la consulta
+    # contra cada palabra de cada nombre, y el mismo orden que search().
+    palabras = _words(consulta)
+    filas = []
+    for posicion, nombre in enumerate(nombres):
+        texto = nombre.name.lower()
+        palabras_nombre = set(_words(texto))
+        total = 0
+        for palabra in palabras:
+            mejor = min(_edit_distance(palabra, otra, distancia) for otra in palabras_nombre)
+            if mejor > distancia:
+                break
+            total += mejor
+        else:
+            prefijo = any(otra.startswith(palabra) for otra in palabras_nombre for palabra in palabras)
+            filas.append(((consulta not in texto, not prefijo, total, posicion), nombre.id))
+    return [id for _, id in sorted(filas)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cantidad", type=int, default=1000000)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--limite", type=int, default=20, help="0 para devolver todos los resultados")
+    parser.add_argument("--recorridos", type=int, default=3)
+    args = parser.parse_args()
+
+    aleatorio = random.Random(0)
+    vocabulario = sorted({palabra for registro in AlmacenJSON("db").load("canciones") for palabra in registro["name"].split()})
+    nombres = [
+        Nombre(numero, " ".join(aleatorio.choices(vocabulario, k=aleatorio.randint(1, 4))))
+        for numero in range(args.cantidad)
+    ]
+
+    indice = IndiceDifuso("name")
+    inicio = time.perf_counter()
+    indice.build(nombres)
+    print(f"Nombres: {args.cantidad}  Vocabulario: {len(vocabulario)}  Construcción: {time.perf_counter() - inicio:.1f} s")
+
+    largas = [palabra for palabra in vocabulario if len(palabra) > 3]
+    consultas = [
+        " ".join(misspell(aleatorio.choice(largas), aleatorio) for _ in range(aleatorio.randint(1, 2)))
+        for _ in range(args.consultas)
+    ]
+    tiempos = []
+    resultados = {}
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        resultados[consulta] = indice.search(consulta, args.limite or None)
+        tiempos.append(time.perf_counter() - inicio)
+    print(f"search(): mediana {statistics.median(tiempos) * 1000:.2f} ms, "
+          f"percentil 95 {statistics.quantiles(tiempos, n=20)[-1] * 1000:.2f} ms, máximo {max(tiempos) * 1000:.2f} ms "
+          f"({statistics.mean(len(ids) for ids in resultados.values()):.0f} resultados por consulta)")
+
+    tiempos_recorrido = []
+    for consulta in consultas[:args.recorridos]:
+        inicio = time.perf_counter()
+        esperado = scan(nombres, consulta, indice.distancia)[:args.limite or None]
+        tiempos_recorrido.append(time.perf_counter() - inicio)
+        assert esperado == resultados[consulta], consulta
+    if tiempos_recorrido:
+        print(f"Recorrido con distancia de edición: mediana {statistics.median(tiempos_recorrido):.1f} s "
+              f"en {len(tiempos_recorrido)} consultas (mismos resultados)")
+
+
+if __name__ == "__main__":
+    main()
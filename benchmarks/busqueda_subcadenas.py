@@ -0,0 +1,73 @@
+"""
+Compara la búsqueda de canciones por subcadena recorriendo todos los nombres
+(como hacían las funciones de búsqueda) con el IndiceTrigramas del repositorio,
+con los datos de 'db/' multiplicados varias veces.
+
+El índice vive en memoria y no se guarda en disco: el repositorio lo construye
+en la primera búsqueda de cada proceso. Por eso se mide aparte esa
+construcción, el tiempo por consulta con el índice ya construido, y el total
+de las consultas contando la construcción, que es lo que paga un proceso que
+hace pocas búsquedas.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/busqueda_subcadenas.py --escala 100
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.almacen import AlmacenJSON
+from app.repositorio import Repositorio
+
+from arranque_en_frio import scale_data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=100)
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    try:
+        scale_data("db", directorio, args.escala)
+        repo = Repositorio(AlmacenJSON(directorio))
+        canciones = repo.all("canciones")
+        aleatorio = random.Random(0)
+        consultas = []
+        for cancion in aleatorio.sample(canciones, args.consultas):
+            inicio = aleatorio.randrange(max(1, len(cancion.name) - 4))
+            consultas.append(cancion.name[inicio:inicio + aleatorio.randint(4, 8)].upper())
+
+        inicio = time.perf_counter()
+        esperados = [[cancion for cancion in canciones if consulta.lower() in cancion.name.lower()] for consulta in consultas]
+        recorrido = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        repo.search("canciones", "name", consultas[0])
+        construccion = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        encontrados = [repo.search("canciones", "name", consulta) for consulta in consultas]
+        indice = time.perf_counter() - inicio
+
+        assert esperados == encontrados
+        print(f"Canciones: {len(canciones)}  Consultas: {len(consultas)}")
+        print(f"Recorrido: {recorrido / len(consultas) * 1000:.2f} ms por consulta")
+        print(f"Trigramas: {indice / len(consultas) * 1000:.2f} ms por consulta ({recorrido / indice:.0f}x), "
+              f"construcción en la primera búsqueda {construccion:.2f} s")
+        print(f"Total de las {len(consultas)} consultas: recorrido {recorrido:.2f} s, "
+              f"trigramas con la construcción {construccion + indice:.2f} s ({recorrido / (construccion + indice):.1f}x)")
+    finally:
+        shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Mide el efecto de la cache de archivos parseados (app/cache.py) en una serie de
+acciones del menú: cada acción busca canciones por nombre sin cargar la tabla,
+modifica un usuario y escribe los cambios, como hace user_menu. Se compara con
+la cache vaciada antes de cada acción, que equivale a volver a leer todo de disco.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/cache_archivos.py --escala 10 --acciones 50
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.almacen import AlmacenJSON
+from app.cache import cache
+from app.repositorio import Repositorio
+
+from arranque_en_frio import scale_data
+
+
+def run_actions(directorio, acciones, con_cache):
+    cache.invalidate()
+    cache.hits = cache.misses = 0
+    repo = Repositorio(AlmacenJSON(directorio))
+    usuario = repo.all("usuarios")[0]
+
+    inicio = time.perf_counter()
+    for numero in range(acciones):
+        if not con_cache:
+            cache.invalidate()
+        repo.scan("canciones", "name", lambda name: "love" in name.lower())
+        usuario.name = f"Usuario {numero}"
+        repo.mark_dirty("usuarios", usuario)
+        repo.flush()
+    return time.perf_counter() - inicio, cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=10)
+    parser.add_argument("--acciones", type=int, default=50)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    try:
+        scale_data("db", directorio, args.escala)
+        print(f"{'':10} {'Tiempo (s)':>10} {'Aciertos':>9} {'Lecturas':>9}")
+        for nombre, con_cache in (("Sin cache", False), ("Con cache", True)):
+            segundos, stats = run_actions(directorio, args.acciones, con_cache)
+            print(f"{nombre:10} {segundos:>10.3f} {stats['hits']:>9} {stats['misses']:>9}")
+    finally:
+        shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
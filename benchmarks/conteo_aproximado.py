@@ -0,0 +1,53 @@
+"""
+Mide el error del conteo aproximado de reproducciones (app/frecuentes.py)
+frente a contadores exactos, con un flujo de reproducciones con distribución de
+Zipf (pocas canciones muy escuchadas) sobre un catálogo generado, para varios
+anchos y profundidades.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/conteo_aproximado.py --canciones 100000 --reproducciones 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.frecuentes import FrecuentesAproximados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--canciones", type=int, default=100000)
+    parser.add_argument("--reproducciones", type=int, default=1000000)
+    parser.add_argument("--anchos", type=int, nargs="+", default=[512, 2048, 8192])
+    parser.add_argument("--profundidades", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    aleatorio = random.Random(0)
+    pesos = list(itertools.accumulate(1 / rango for rango in range(1, args.canciones + 1)))
+    flujo = aleatorio.choices(range(args.canciones), cum_weights=pesos, k=args.reproducciones)
+    exactos = dict.fromkeys(range(args.canciones), 0)
+    for id in flujo:
+        exactos[id] += 1
+
+    print(f"Canciones: {args.canciones}  Reproducciones: {args.reproducciones}")
+    print(f"{'Ancho':>6} {'Prof.':>5} {'KiB':>6} {'us/rep.':>8} {'Error medio':>12} {'Error máx.':>11} {'Cota':>8} {'Top 10':>7}")
+    for ancho, profundidad in itertools.product(args.anchos, args.profundidades):
+        frecuentes = FrecuentesAproximados(ancho, profundidad)
+        inicio = time.perf_counter()
+        for id in flujo:
+            frecuentes.add(id)
+        tiempo = time.perf_counter() - inicio
+        errores = frecuentes.reconcile(exactos)
+        print(f"{ancho:>6} {profundidad:>5} {ancho * profundidad * 8 / 1024:>6.0f} "
+              f"{tiempo / len(flujo) * 1e6:>8.2f} {errores['error_medio']:>12.1f} {errores['error_maximo']:>11} "
+              f"{errores['cota']:>8.0f} {errores['aciertos_primeros']:>7}")
+
+
+if __name__ == "__main__":
+    main()
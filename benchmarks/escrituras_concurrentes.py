@@ -0,0 +1,89 @@
+"""
+Mide cuántas reproducciones por segundo se registran con varios procesos (y
+hilos) escribiendo a la vez sobre la misma carpeta de datos, y verifica que no se
+pierda ninguna.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/escrituras_concurrentes.py --procesos 4 --hilos 4 --reproducciones 500
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.almacen import AlmacenJSON
+from app.repositorio import Repositorio, get_repositorio
+
+
+def play_songs(directorio, hilos, reproducciones, semilla):
+    # Los modelos usan el repositorio compartido, que lee 'db/' desde la carpeta actual.
+    os.chdir(directorio)
+    repo = get_repositorio()
+    compactador = repo.start_compaction(intervalo=0.5)
+    canciones = repo.all("canciones")
+
+    def trabajar(numero):
+        aleatorio = random.Random(semilla * 1000 + numero)
+        for _ in range(reproducciones):
+            aleatorio.choice(canciones).play()
+
+    trabajadores = [threading.Thread(target=trabajar, args=(numero,)) for numero in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    compactador.stop()
+    repo.close()
+
+
+def total_played(directorio):
+    repo = Repositorio(AlmacenJSON(os.path.join(directorio, "db")))
+    return sum(cancion.played for cancion in repo.all("canciones"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--hilos", type=int, default=1)
+    parser.add_argument("--reproducciones", type=int, default=500, help="por hilo")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    try:
+        shutil.copytree(
+            "db",
+            os.path.join(directorio, "db"),
+            ignore=shutil.ignore_patterns(".lock", ".tmp-*", "eventos.log", "*.snap", "metrotify.sqlite3*"),
+        )
+        antes = total_played(directorio)
+
+        inicio = time.perf_counter()
+        procesos = [
+            multiprocessing.Process(target=play_songs, args=(directorio, args.hilos, args.reproducciones, semilla))
+            for semilla in range(args.procesos)
+        ]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        segundos = time.perf_counter() - inicio
+
+        esperadas = args.procesos * args.hilos * args.reproducciones
+        registradas = total_played(directorio) - antes
+        print(f"Procesos: {args.procesos}  Hilos por proceso: {args.hilos}")
+        print(f"Reproducciones: {esperadas} en {segundos:.2f} s ({esperadas / segundos:.0f}/s)")
+        print(f"Registradas: {registradas}  Perdidas: {esperadas - registradas}")
+    finally:
+        shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compara el cálculo de los rankings de show_statistics con un recorrido por
+instancia (sumar las canciones de cada álbum y los álbumes de cada artista) y
+con app/estadisticas.py, que arma los DataFrames desde las columnas de las
+canciones y las pistas como filas, sobre un catálogo generado de 10^5 y 10^6
+canciones (10 canciones por álbum y 10 álbumes por artista).
+
+Las pistas como filas las arma AgregadosReproducciones.rebuild(), que el
+repositorio ya mantiene para los totales en vivo; su tiempo se muestra aparte y
+no entra en el vectorizado.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/estadisticas.py --cantidades 100000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agregados import AgregadosReproducciones
+from app.columnas import ColumnasCanciones
+from app.estadisticas import compute_statistics, load_frames
+from app.modelos import Album, Cancion, Usuario
+
+
+GENEROS = ["rock", "pop", "jazz", "salsa", "reggaeton", "clásica"]
+
+
+def generate_catalog(cantidad, aleatorio):
+    columnas = ColumnasCanciones()
+    canciones = [
+        Cancion(f"c{numero}", f"Canción {numero}", "3:00", "", aleatorio.randrange(10000), aleatorio.randrange(100), columnas)
+        for numero in range(cantidad)
+    ]
+    albumes = [
+        Album(
+            f"a{numero}", f"Álbum {numero}", "", "", "", aleatorio.choice(GENEROS), f"u{numero // 10}",
+            [cancion.id for cancion in canciones[numero * 10:numero * 10 + 10]],
+        )
+        for numero in range(cantidad // 10)
+    ]
+    usuarios = [Usuario(f"u{numero}", f"Artista {numero}", "", f"artista{numero}", "musician") for numero in range(cantidad // 100)]
+    usuarios += [Usuario(f"o{numero}", f"Oyente {numero}", "", f"oyente{numero}", "listener") for numero in range(cantidad // 100)]
+    return usuarios, albumes, canciones, columnas
+
+
+def per_object(usuarios, albumes, canciones):
+    por_id = {cancion.id: cancion for cancion in canciones}
+    albumes_por_artista = {}
+    for album in albumes:
+        albumes_por_artista.setdefault(album.artist, []).append(album)
+
+    def album_streams(album):
+        return sum(por_id[song_id].played for song_id in album.tracklist if song_id in por_id)
+
+    musicians = pd.DataFrame([
+        {'name': user.name, 'streams': sum(album_streams(album) for album in albumes_por_artista.get(user.id, []))}
+        for user in usuarios if user.type == "musician"
+    ])
+    albums = pd.DataFrame([{'name': album.name, 'streams': album_streams(album)} for album in albumes])
+    songs = pd.DataFrame([{'name': song.name, 'streams': song.played} for song in canciones])
+    return {
+        "top_musicians": musicians.nlargest(5, 'streams'),
+        "top_albums": albums.nlargest(5, 'streams'),
+        "top_songs": songs.nlargest(5, 'streams'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cantidades", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'Canciones':>10} {'Agregados (s)':>14} {'Por objeto (s)':>15} {'Vectorizado (s)':>16} {'Mejora':>7}")
+    for cantidad in args.cantidades:
+        usuarios, albumes, canciones, columnas = generate_catalog(cantidad, random.Random(0))
+        # El mapa de identidad del repositorio ya existe; no se mide su construcción.
+        por_id = {cancion.id: cancion for cancion in canciones}
+        inicio = time.perf_counter()
+        agregados = AgregadosReproducciones()
+        agregados.rebuild(albumes, por_id, columnas, None)
+        construccion = time.perf_counter() - inicio
+        pistas = (agregados.albumes, agregados.pistas_album, agregados.pistas_fila)
+
+        inicio = time.perf_counter()
+        esperado = per_object(usuarios, albumes, canciones)
+        objeto = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        obtenido = compute_statistics(load_frames(usuarios, pistas, por_id, columnas))
+        vectorizado = time.perf_counter() - inicio
+
+        for tabla, frame in esperado.items():
+            assert frame["streams"].tolist() == obtenido[tabla]["streams"].tolist(), tabla
+        print(f"{cantidad:>10} {construccion:>14.2f} {objeto:>15.2f} {vectorizado:>16.2f} {objeto / vectorizado:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
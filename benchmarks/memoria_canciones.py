@@ -0,0 +1,106 @@
+"""
+Compara la memoria por canción y el tiempo de sumar las reproducciones entre
+una clase con __dict__ (como era Cancion), una con __slots__ y los contadores
+como atributos, y la Cancion actual, con __slots__ y los contadores en un
+ColumnasCanciones compartido (como el del repositorio).
+
+La memoria incluye las instancias, los ids y, para la Cancion actual, las
+columnas. Las sumas son la del catálogo completo y la de cada álbum (de a 10
+canciones, como al reconstruir los totales por álbum); con las columnas se
+miden recorriendo el array y envolviéndolo con NumPy sin copiarlo.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/memoria_canciones.py --cantidad 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.columnas import ColumnasCanciones
+from app.modelos import Cancion
+
+
+class CancionConDict():
+    def __init__(self, id, name, duration, link, played=0, liked=0):
+        self.id = id
+        self.name = name
+        self.duration = duration
+        self.link = link
+        self.played = played
+        self.liked = liked
+
+
+class CancionConSlots():
+    __slots__ = ("id", "name", "duration", "link", "played", "liked")
+
+    def __init__(self, id, name, duration, link, played=0, liked=0):
+        self.id = id
+        self.name = name
+        self.duration = duration
+        self.link = link
+        self.played = played
+        self.liked = liked
+
+
+def build(crear, cantidad):
+    # Los textos se comparten entre canciones; solo el id es distinto en cada una.
+    gc.collect()
+    tracemalloc.start()
+    canciones = [crear(f"id-{numero}", "Canción", "3:30", "https://", numero % 1000, numero % 7) for numero in range(cantidad)]
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return canciones, memoria
+
+
+def measure(sumar):
+    inicio = time.perf_counter()
+    resultado = sumar()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cantidad", type=int, default=1000000)
+    args = parser.parse_args()
+
+    albumes = [range(inicio, min(inicio + 10, args.cantidad)) for inicio in range(0, args.cantidad, 10)]
+    print(f"{'':12} {'Bytes por canción':>18} {'Suma total (s)':>15} {'Por álbum (s)':>14}")
+
+    esperados = None
+    for nombre, clase in (("__dict__", CancionConDict), ("__slots__", CancionConSlots)):
+        canciones, memoria = build(clase, args.cantidad)
+        total, segundos = measure(lambda: sum(cancion.played for cancion in canciones))
+        por_album, segundos_album = measure(lambda: [sum(canciones[numero].played for numero in album) for album in albumes])
+        print(f"{nombre:12} {memoria / args.cantidad:>18.0f} {segundos:>15.3f} {segundos_album:>14.3f}")
+        assert esperados is None or esperados == (total, por_album)
+        esperados = (total, por_album)
+        del canciones
+
+    columnas = ColumnasCanciones()
+    canciones, memoria = build(lambda *campos: Cancion(*campos, columnas=columnas), args.cantidad)
+    reproducciones = columnas.column("played")
+    total, segundos = measure(lambda: sum(reproducciones))
+    filas = [[canciones[numero]._fila for numero in album] for album in albumes]
+    por_album, segundos_album = measure(lambda: [sum(reproducciones[fila] for fila in album) for album in filas])
+    print(f"{'Columnas':12} {memoria / args.cantidad:>18.0f} {segundos:>15.3f} {segundos_album:>14.3f}")
+    assert esperados == (total, por_album)
+
+    matriz = np.frombuffer(reproducciones, dtype="int64")
+    indices = np.array([fila for album in filas for fila in album], dtype="int64")
+    inicios = np.cumsum([0] + [len(album) for album in filas[:-1]])
+    total, segundos = measure(lambda: int(matriz.sum()))
+    por_album, segundos_album = measure(lambda: np.add.reduceat(matriz[indices], inicios).tolist())
+    print(f"{'NumPy':12} {'':>18} {segundos:>15.4f} {segundos_album:>14.4f}")
+    assert esperados == (total, por_album)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from app import funciones
+from app import funciones, reportes
+import argparse
 import os
 
 
@@ -31,7 +32,7 @@ def main():
                 print("Operación cancelada.")
          
         elif opc == 4:
-            funciones.show_statistics()
+            funciones.statistics_menu()
         elif opc == 5:
             print("Saliendo de la aplicación...")
             break
@@ -43,5 +44,19 @@ def main():
         
 
 
+def generate_report(args):
+    resultado = reportes.write_reports(args.reporte, args.top, args.por, args.procesos)
+    print(f"Reportes generados: {len(resultado['generados'])}  Sin cambios: {len(resultado['sin_cambios'])}")
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Aplicación de música Metrotify.")
+    parser.add_argument("--reporte", metavar="CARPETA", help="genera los reportes de estadísticas en CARPETA, sin interfaz")
+    parser.add_argument("--por", nargs="*", choices=["genero", "artista"], default=[], help="agrega un reporte por género y/o por artista")
+    parser.add_argument("--top", type=int, default=5, help="cantidad de filas de cada ranking")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos para dibujar los gráficos")
+    args = parser.parse_args()
+    if args.reporte:
+        generate_report(args)
+    else:
+        main()
@@ -0,0 +1,337 @@
+"""
+Pruebas de los índices y las estructuras en memoria contra el cálculo directo
+sobre todos los datos: cada caso genera pocos registros con una semilla fija,
+hace altas, bajas y cambios entre consultas, y compara con recorrer todo.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest -q tests
+"""
+import heapq
+import itertools
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agregados import AgregadosReproducciones, Clasificacion
+from app.columnas import ColumnasCanciones
+from app.frecuentes import FrecuentesAproximados
+from app.indices import IndiceBM25, IndiceDifuso, IndiceTrigramas, _words
+from app.modelos import Album, Cancion
+
+
+PALABRAS = [
+    "amor", "noche", "luna", "sol", "mar", "fuego", "corazón", "camino", "ciudad", "lluvia",
+    "viento", "tierra", "cielo", "sombra", "luz", "tiempo", "vida", "sueño", "canción", "baile",
+    "río", "montaña", "estrella", "silencio", "recuerdo", "verano", "invierno", "ola", "flor", "piedra",
+]
+
+
+class Registro():
+    __slots__ = ("id", "name", "description")
+
+    def __init__(self, id, name, description=""):
+        self.id = id
+        self.name = name
+        self.description = description
+
+
+def names(aleatorio, cantidad):
+    # El modelo: id -> nombre, en orden de inserción (un cambio de nombre conserva el lugar).
+    return {
+        f"id-{numero}": " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 4))).title()
+        for numero in range(cantidad)
+    }
+
+
+def change(aleatorio, modelo, indice, numero, cambiar):
+    # Una baja, un cambio o un alta al azar, en el modelo y en el índice.
+    id = aleatorio.choice(list(modelo))
+    cambio = aleatorio.random()
+    if cambio < 0.3:
+        indice.remove(Registro(id, modelo.pop(id)))
+        return
+    if cambio > 0.6:
+        id = f"nuevo-{numero}"
+    modelo[id] = cambiar(modelo[aleatorio.choice(list(modelo))])
+    indice.add(Registro(id, modelo[id]))
+
+
+def test_trigramas_find_the_same_names_as_a_substring_scan():
+    aleatorio = random.Random(0)
+    modelo = names(aleatorio, 300)
+    indice = IndiceTrigramas("name")
+    indice.build(Registro(id, nombre) for id, nombre in modelo.items())
+    for numero in range(300):
+        if numero % 10 == 0:
+            change(aleatorio, modelo, indice, numero, lambda nombre: f"{nombre} Remix")
+        nombre = aleatorio.choice(list(modelo.values()))
+        inicio = aleatorio.randrange(len(nombre))
+        consulta = nombre[inicio:inicio + aleatorio.randint(1, 8)]
+        consulta = consulta.upper() if aleatorio.random() < 0.3 else consulta
+        esperado = [id for id, nombre in modelo.items() if consulta.lower() in nombre.lower()]
+        assert indice.search(consulta) == esperado, consulta
+
+
+def test_trigramas_short_and_missing_queries():
+    indice = IndiceTrigramas("name")
+    indice.build([Registro("a", "Luna Llena"), Registro("b", "Sol"), Registro("c", "Lunar")])
+    assert indice.search("lun") == ["a", "c"]
+    assert indice.search("L") == ["a", "b", "c"]
+    assert indice.search("SOL") == ["b"]
+    assert indice.search("marte") == []
+
+
+def bm25(documentos, texto, k1, b):
+    # Puntaje BM25 de cada documento, sin índice: recorre las palabras de todos.
+    palabras = {id: _words(f"{documento.name} {documento.description}") for id, documento in documentos.items()}
+    promedio = sum(map(len, palabras.values())) / len(palabras) or 1
+    puntajes = {}
+    for termino in set(_words(texto)):
+        frecuencias = {id: lista.count(termino) for id, lista in palabras.items() if termino in lista}
+        if not frecuencias:
+            continue
+        idf = math.log(1 + (len(palabras) - len(frecuencias) + 0.5) / (len(frecuencias) + 0.5))
+        for id, frecuencia in frecuencias.items():
+            normalizacion = k1 * (1 - b + b * len(palabras[id]) / promedio)
+            puntajes[id] = puntajes.get(id, 0.0) + idf * frecuencia * (k1 + 1) / (frecuencia + normalizacion)
+    return puntajes
+
+
+def test_bm25_top_matches_scoring_every_document():
+    aleatorio = random.Random(0)
+    k = 10
+
+    def generate(id):
+        return Registro(id, " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 4))),
+                        " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(0, 30))))
+
+    documentos = {f"id-{numero}": generate(f"id-{numero}") for numero in range(200)}
+    indice = IndiceBM25(["name", "description"])
+    indice.build(documentos.values())
+    for numero in range(200):
+        if numero % 5 == 0:
+            id = aleatorio.choice(list(documentos))
+            if aleatorio.random() < 0.5:
+                indice.remove(documentos.pop(id))
+            else:
+                documentos[id] = generate(id)
+                indice.add(documentos[id])
+        texto = " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 5)))
+        if aleatorio.random() < 0.2:
+            texto += " palabrainexistente"
+        puntajes = bm25(documentos, texto, indice.k1, indice.b)
+        ordenados = sorted(puntajes.values(), reverse=True)
+        obtenido = indice.top(texto, k)
+        assert len(obtenido) == min(k, len(ordenados)), texto
+        for posicion, (puntaje, id) in enumerate(obtenido):
+            assert math.isclose(puntaje, puntajes[id]), (texto, id)
+            assert math.isclose(puntaje, ordenados[posicion]), (texto, posicion)
+
+
+def test_bm25_ranks_repeated_and_rare_terms_higher():
+    indice = IndiceBM25(["name", "description"])
+    indice.build([
+        Registro("a", "Luna", "luna luna sobre el mar"),
+        Registro("b", "Mar", "el mar de noche"),
+        Registro("c", "Noche", "una noche sin luna"),
+    ])
+    assert [id for _, id in indice.top("luna", 10)] == ["a", "c"]
+    assert [id for _, id in indice.top("mar noche", 1)] == ["b"]
+    assert indice.top("sol", 10) == []
+
+
+def osa(a, b):
+    # La distancia completa, sin cortes, para no depender de _edit_distance.
+    filas = [list(range(len(b) + 1))] + [[i] + [0] * len(b) for i in range(1, len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            filas[i][j] = min(filas[i - 1][j] + 1, filas[i][j - 1] + 1, filas[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                filas[i][j] = min(filas[i][j], filas[i - 2][j - 2] + 1)
+    return filas[len(a)][len(b)]
+
+
+def misspell(palabra, aleatorio):
+    letras = list(palabra)
+    for _ in range(aleatorio.randint(1, 3)):
+        posicion = aleatorio.randrange(len(letras))
+        cambio = aleatorio.random()
+        if cambio < 0.3 and len(letras) > 1:
+            letras[posicion], letras[posicion - 1] = letras[posicion - 1], letras[posicion]
+        elif cambio < 0.5 and len(letras) > 1:
+            del letras[posicion]
+        elif cambio < 0.7:
+            letras.insert(posicion, aleatorio.choice("abcdefghijklmnopqrstuvwxyz"))
+        else:
+            letras[posicion] = aleatorio.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(letras)
+
+
+def fuzzy_scan(modelo, consulta, maximo):
+    # Mismo criterio que IndiceDifuso.search, recorriendo todos los registros.
+    palabras = _words(consulta.lower())
+    filas = []
+    for posicion, (id, nombre) in enumerate(modelo.items()):
+        texto = nombre.lower()
+        palabras_registro = set(_words(texto))
+        distancias = [min(osa(palabra, otra) for otra in palabras_registro) for palabra in palabras]
+        if max(distancias) > maximo:
+            continue
+        prefijo = any(otra.startswith(palabra) for otra in palabras_registro for palabra in palabras)
+        filas.append(((consulta.lower() not in texto, not prefijo, sum(distancias), posicion), id))
+    return [id for _, id in sorted(filas)]
+
+
+def test_difuso_finds_every_word_and_name_within_the_distance():
+    aleatorio = random.Random(0)
+    modelo = names(aleatorio, 150)
+    indice = IndiceDifuso("name")
+    indice.build(Registro(id, nombre) for id, nombre in modelo.items())
+    for numero in range(100):
+        if numero % 5 == 0:
+            change(aleatorio, modelo, indice, numero, lambda nombre: misspell(nombre, aleatorio))
+        vocabulario = {palabra for nombre in modelo.values() for palabra in _words(nombre.lower())}
+        palabras = [misspell(aleatorio.choice(sorted(vocabulario)), aleatorio) for _ in range(aleatorio.randint(1, 2))]
+        for palabra in palabras:
+            esperado = {otra: osa(palabra, otra) for otra in vocabulario if osa(palabra, otra) <= indice.distancia}
+            assert indice.similar_words(palabra) == esperado, palabra
+        consulta = " ".join(palabras)
+        esperado = fuzzy_scan(modelo, consulta, indice.distancia)
+        assert indice.search(consulta) == esperado, consulta
+        assert indice.search(consulta, 3) == esperado[:3], consulta
+
+
+def test_difuso_ranks_exact_then_prefix_then_distance():
+    indice = IndiceDifuso("name")
+    indice.build([
+        Registro("a", "Lunes de Lluvia"),
+        Registro("b", "Lunar"),
+        Registro("c", "Luna Nueva"),
+        Registro("d", "Duna"),
+        Registro("e", "Sol"),
+    ])
+    assert indice.search("luna") == ["c", "b", "d", "a"]
+    assert indice.search("lnua") == ["c", "b", "d"]
+    assert indice.search("marte") == []
+
+
+def test_clasificacion_matches_sorting_every_count():
+    aleatorio = random.Random(0)
+    clasificacion = Clasificacion()
+    conteos = {f"id-{numero}": aleatorio.randint(0, 20) for numero in range(100)}
+    clasificacion.build(conteos.items())
+    # Cuándo llegó cada id a su valor actual: desempata dentro de una cubeta.
+    reloj = itertools.count()
+    llegadas = {id: next(reloj) for id in conteos}
+    for numero in range(2000):
+        id = f"id-{aleatorio.randrange(120)}"
+        delta = aleatorio.choice((1, 1, 1, 2, 5, 0, -1))
+        clasificacion.increment(id, delta)
+        conteos[id] = conteos.get(id, 0) + delta
+        llegadas[id] = next(reloj)
+        if numero % 50 == 0:
+            esperado = sorted(conteos.items(), key=lambda par: (-par[1], llegadas[par[0]]))
+            assert list(itertools.islice(clasificacion.descending(), 10)) == esperado[:10], numero
+    assert list(clasificacion.descending()) == sorted(conteos.items(), key=lambda par: (-par[1], llegadas[par[0]]))
+
+
+def top(conteos, n=10):
+    return sorted(conteos.values(), reverse=True)[:n]
+
+
+def test_agregados_match_totals_summed_from_scratch():
+    aleatorio = random.Random(0)
+    columnas = ColumnasCanciones()
+    canciones = {f"c-{numero}": Cancion(f"c-{numero}", "Canción", "3:30", "https://", aleatorio.randint(0, 5), columnas=columnas)
+                 for numero in range(120)}
+    ids = list(canciones)
+    # Canciones repetidas en un tracklist, compartidas entre álbumes y artistas, y
+    # un id que no está en la tabla.
+    albums = [
+        Album(f"a-{numero}", "Álbum", "", "", "2024", "pop", f"artista-{numero % 5}",
+              aleatorio.choices(ids, k=10) + (["c-inexistente"] if numero == 0 else []))
+        for numero in range(20)
+    ]
+    agregados = AgregadosReproducciones()
+    agregados.rebuild(albums, canciones, columnas, None)
+    for numero in range(1000):
+        id = aleatorio.choice(ids)
+        canciones[id].played += 1
+        agregados.record_play(id, 1)
+        if numero % 100 != 0 and numero != 999:
+            continue
+        por_album = {album.id: sum(canciones[id].played for id in album.tracklist if id in canciones) for album in albums}
+        por_artista = {}
+        for album in albums:
+            por_artista[album.artist] = por_artista.get(album.artist, 0) + por_album[album.id]
+        assert agregados.por_album == por_album
+        assert agregados.por_artista == por_artista
+        esperados = {
+            ("canciones", None): {id: cancion.played for id, cancion in canciones.items()},
+            ("albums", None): por_album,
+            ("usuarios", None): por_artista,
+        }
+        for artista in por_artista:
+            esperados["artista", artista] = {id: canciones[id].played for album in albums if album.artist == artista
+                                             for id in album.tracklist if id in canciones}
+        for (tabla, artista), conteos in esperados.items():
+            clasificacion = agregados.clasificaciones[tabla] if artista is None else agregados.canciones_de_artista[artista]
+            obtenido = list(itertools.islice(clasificacion.descending(), 10))
+            assert [conteo for _, conteo in obtenido] == top(conteos), (numero, tabla, artista)
+            assert all(conteos[id] == conteo for id, conteo in obtenido), (numero, tabla, artista)
+            # Cada canción está una vez en la clasificación de su artista.
+            assert len(list(clasificacion.descending())) == len(conteos), (numero, tabla, artista)
+
+
+def zipf_plays(cantidad, reproducciones):
+    aleatorio = random.Random(0)
+    pesos = list(itertools.accumulate(1 / rango for rango in range(1, cantidad + 1)))
+    flujo = aleatorio.choices(range(cantidad), cum_weights=pesos, k=reproducciones)
+    exactos = dict.fromkeys(range(cantidad), 0)
+    for id in flujo:
+        exactos[id] += 1
+    return flujo, exactos
+
+
+def check_sketch(frecuentes, flujo, exactos):
+    for id in flujo:
+        frecuentes.add(id)
+    conteo = frecuentes.conteo
+    errores = {id: conteo.estimate(id) - exacto for id, exacto in exactos.items()}
+    assert min(errores.values()) >= 0, "el sketch estimó de menos"
+
+    cota = conteo.error_bound()
+    fuera = sum(error > cota for error in errores.values())
+    # Cada canción supera la cota con probabilidad e^-profundidad a lo sumo.
+    assert fuera <= 2 * math.exp(-conteo.profundidad) * len(exactos)
+
+    primeros = heapq.nlargest(frecuentes.k + 1, exactos.items(), key=lambda par: par[1])
+    candidatos = {id for id, _ in frecuentes.top()}
+    seguros = {id for id, exacto in primeros[:-1] if exacto > primeros[-1][1] + 2 * cota}
+    assert seguros <= candidatos
+
+    reconciliado = frecuentes.reconcile(exactos)
+    assert reconciliado["error_maximo"] == max(errores.values())
+    assert math.isclose(reconciliado["error_medio"], sum(errores.values()) / len(errores))
+    assert reconciliado["fuera_de_cota"] == fuera
+    assert reconciliado["aciertos_primeros"] == len(candidatos & {id for id, _ in primeros[:-1]})
+    return reconciliado
+
+
+def test_frecuentes_stay_within_the_error_bound():
+    flujo, exactos = zipf_plays(2000, 20000)
+    for ancho, profundidad in ((128, 2), (512, 4), (2048, 4)):
+        check_sketch(FrecuentesAproximados(ancho, profundidad), flujo, exactos)
+
+
+def test_frecuentes_are_exact_without_collisions():
+    # Con muchas más columnas que canciones no hay colisiones en todas las filas:
+    # las estimaciones son exactas y las frecuentes son las más escuchadas.
+    flujo, exactos = zipf_plays(2000, 20000)
+    frecuentes = FrecuentesAproximados(1 << 16, 4)
+    assert check_sketch(frecuentes, flujo, exactos)["error_maximo"] == 0
+    assert [conteo for _, conteo in frecuentes.top()] == top(exactos, frecuentes.k)